@@ -1,17 +1,25 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import asyncio
-from fastapi import APIRouter, Depends
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
 from app.models.responses import HealthResponse, StatusResponse, AppStatusResponse
 from app.models.requests import OCRRequest
 from app.models.dev_requests import OCRDevRequest
 from app.models.local_requests import OCRLocalRequest
+from app.models.admin_requests import WebhookReplayRequest
 from app.core.config import settings
 from app.core.logger import setup_logger
 from app.core.queue import task_queue, queue_add, queue_clear, queue_task_check
 from app.core.ocr_processor import process_ocr
 from app.core.ocr_processor_local import process_ocr_local
+from app.core.inference_scheduler import get_scheduler
 from app.core.auth import verify_api_key
 from app.api.status import get_app_status
+from app.core.warmup import get_readiness
+from app.core import metrics
+from app.core.webhooks import webhook_dispatcher
+from app.core.admission import AdmissionRejected, ADMISSION_MIN_RETRY_AFTER
 
 logger = setup_logger(__name__)
 router = APIRouter()
@@ -44,30 +52,59 @@ async def status():
         version=settings.APP_VERSION
     )
 
+@router.get("/ready")
+async def ready():
+    """Readiness probe: 503 until the OCR model is loaded and warmed up"""
+    readiness = get_readiness()
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content=readiness)
+    return readiness
+
+@router.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
 @router.get("/app-status", response_model=AppStatusResponse)
-async def app_status():
+async def app_status(queue_offset: int = Query(0, ge=0), queue_limit: int = Query(5, ge=0, le=200),
+                     queue_state: Optional[str] = Query(None, pattern="^(waiting|processing|done|failed)$")):
     """Comprehensive application status with OCR, queue, and worker information"""
-    return get_app_status(start_time)
+    return get_app_status(start_time, queue_offset, queue_limit, queue_state)
+
+def busy_response(message: str, retry_after: int, reason: str) -> JSONResponse:
+    """503 with Retry-After so the caller paces its retries"""
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(retry_after)},
+        content={"error": reason, "message": message, "retry_after_seconds": retry_after}
+    )
 
-@router.post("/api/v1/ocr-ecosteps", dependencies=[Depends(verify_api_key)])
+@router.post("/api/v1/ocr-ecosteps", status_code=202, dependencies=[Depends(verify_api_key)])
 async def submit_ocr_queue(data: OCRRequest):
-    """Submit OCR document to processing queue"""
+    """Submit OCR document to processing queue; 202 with the estimated completion time, or 503 + Retry-After"""
     try:
         if await queue_task_check(data):
-            return {"message": "Laporan Anda telah diterima dan sedang dalam antrean verifikasi."}
-        await queue_add(data)
+            return {"message": "Laporan Anda telah diterima dan sedang dalam antrean verifikasi.", "report_id": data.report_id}
+        wait = await queue_add(data)
         await task_queue.put(data)
-        return {"message": "Laporan Anda telah diterima dan dimasukkan ke dalam antrean verifikasi."}
+        return {
+            "message": "Laporan Anda telah diterima dan dimasukkan ke dalam antrean verifikasi.",
+            "report_id": data.report_id,
+            "estimated_wait_seconds": round(wait),
+            "estimated_completion_at": (datetime.now() + timedelta(seconds=wait)).isoformat(timespec="seconds")
+        }
+    except AdmissionRejected as e:
+        logger.error(f"✘ Not admitted ({e.reason}), Retry-After {e.retry_after}s: {e.message}")
+        return busy_response("Sistem sedang sibuk. Silakan coba lagi dalam beberapa saat.", e.retry_after, e.reason)
     except Exception as e:
         logger.error(f"✘ Failed to add to queue: {e}")
-        return {"error": "Queue is full", "message": "Sistem sedang sibuk. Silakan coba lagi dalam beberapa saat."}, 503
+        return busy_response("Sistem sedang sibuk. Silakan coba lagi dalam beberapa saat.", ADMISSION_MIN_RETRY_AFTER, "queue_unavailable")
 
 @router.post("/api/v1/ocr-ecosteps/dev", dependencies=[Depends(verify_api_key)])
 async def process_ocr_dev(data: OCRDevRequest):
     """Direct OCR processing for testing/development (no queue)"""
     logger.info(f"⚙ Dev mode: Processing OCR for {data.img_url}")
     try:
-        result = await asyncio.to_thread(process_ocr, data.img_url)
+        result = await asyncio.to_thread(process_ocr, data.img_url, ocr_reader=get_scheduler())
         logger.info(f"✓ Dev mode: OCR completed")
         return result
     except Exception as e:
@@ -92,3 +129,15 @@ async def clear_queue():
     cleared_count = await queue_clear()
     logger.info(f"✓ Admin: Cleared {cleared_count} items from queue")
     return {"message": f"Queue cleared. Removed {cleared_count} items."}
+
+@router.get("/admin/webhooks/dead-letter", dependencies=[Depends(verify_api_key)])
+async def webhook_dead_letters(env: Optional[str] = None, limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0)):
+    """Webhook results that exhausted their retries (or were rejected by the API)"""
+    return {"items": webhook_dispatcher.dead_letters(env, limit, offset)}
+
+@router.post("/admin/webhooks/replay", dependencies=[Depends(verify_api_key)])
+async def webhook_replay(data: WebhookReplayRequest):
+    """Requeue dead-lettered webhook results: the given ids, one environment, or all of them"""
+    replayed = webhook_dispatcher.replay(data.ids, data.env)
+    logger.info(f"✓ Admin: replaying {replayed} dead-lettered webhook results")
+    return {"message": f"Replaying {replayed} webhook results.", "replayed": replayed}
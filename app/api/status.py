@@ -4,11 +4,22 @@ import psutil
 from decouple import config
 from app.models.responses import AppStatusResponse
 from app.core.config import settings
-from app.core.queue import task_queue, get_queue_list
-from app.core.ocr_processor import get_reader
+from app.core.pipeline import get_pipeline_stats
+from app.core.autoscaler import get_autoscaler_stats
+from app.core.queue import task_queue, get_queue_page, get_queue_stats, MAX_QUEUE_SIZE
+from app.core.warmup import get_readiness
+from app.core.model_bundle import describe_bundle
+from app.core.engine_registry import get_engine_stats
+from app.core.result_cache import get_cache_stats
+from app.core.preprocess import describe_preprocessing
+from app.core.step_patterns import get_pattern_stats
+from app.core.inference_scheduler import get_scheduler_stats
+from app.core.ocr_pool import get_executor_stats
+from app.core.webhooks import get_webhook_stats
 
-def get_app_status(start_time: datetime) -> AppStatusResponse:
-    """Get comprehensive application status"""
+def get_app_status(start_time: datetime, queue_offset: int = 0, queue_limit: int = 5,
+                   queue_state: str = None) -> AppStatusResponse:
+    """Get comprehensive application status; queue_* select the page of tracked reports"""
     uptime = datetime.now() - start_time
     worker_count = config("WORKER_COUNT", cast=int, default=3)
     
@@ -20,34 +31,46 @@ def get_app_status(start_time: datetime) -> AppStatusResponse:
         gpu_available = False
         gpu_name = None
     
+    # Never touch the reader here: a status probe must not trigger a model load
+    readiness = get_readiness()
     ocr_engine = {
         "engine": "EasyOCR",
         "gpu_enabled": gpu_available,
         "gpu_device": gpu_name,
         "languages": ["en"],
-        "status": "ready" if get_reader() else "loading"
+        "engines": get_engine_stats(),
+        "status": readiness["status"],
+        "model_load_seconds": readiness["model_load_seconds"],
+        "warmup_seconds": readiness["warmup_seconds"],
+        "model_bundle": describe_bundle()
     }
     
     # Queue Information
-    current_queue_list = get_queue_list()
+    queue_stats = get_queue_stats()
     waiting_count = task_queue.qsize()
-    tracked_count = len(current_queue_list)
-    processing_count = max(0, tracked_count - waiting_count)
+    processing_count = queue_stats["processing"]
     
     queue_info = {
         "waiting_in_queue": waiting_count,
-        "total_reports_tracked": tracked_count,
+        "total_reports_tracked": queue_stats["tracked"],
         "currently_processing": processing_count,
-        "queue_capacity": "unlimited",
-        "reports_in_queue": [{
-            "report_id": item.report_id,
-            "user_id": item.user_id,
-            "img_url": item.s3_url
-        } for item in current_queue_list[:5]]
+        "completed": queue_stats["done"],
+        "failed": queue_stats["failed"],
+        "queue_capacity": MAX_QUEUE_SIZE,
+        "storage": queue_stats["storage"],
+        "admission": queue_stats["admission"],
+        "page": {"offset": queue_offset, "limit": queue_limit, "state": queue_state},
+        "reports_in_queue": get_queue_page(queue_offset, queue_limit, queue_state)
     }
     
     # Worker Information
-    busy_workers = min(worker_count, processing_count)
+    # With the pipeline running, "workers" are the inference slots; the other stages are listed under pipeline
+    pipeline_stats = get_pipeline_stats()
+    if pipeline_stats["running"]:
+        worker_count = pipeline_stats["stages"]["infer"]["concurrency"]
+        busy_workers = pipeline_stats["stages"]["infer"]["busy"]
+    else:
+        busy_workers = min(worker_count, processing_count)
     idle_workers = max(0, worker_count - busy_workers)
     
     workers_info = {
@@ -55,14 +78,20 @@ def get_app_status(start_time: datetime) -> AppStatusResponse:
         "busy_workers": busy_workers,
         "idle_workers": idle_workers,
         "worker_type": "async",
-        "processing_mode": "concurrent"
+        "ocr_executor": get_executor_stats(),
+        "processing_mode": "pipelined",
+        "pipeline": pipeline_stats,
+        "autoscaler": get_autoscaler_stats(),
+        "inference_scheduler": get_scheduler_stats(),
+        "webhook_dispatcher": get_webhook_stats()
     }
     
     # Processing Statistics
     processing_info = {
         "supported_apps": ["Google Fit", "Samsung Health", "Huawei Health", "Apple Health", "Garmin Connect", "Other"],
         "extraction_fields": ["steps", "distance", "duration", "calories", "heart_rate", "pace", "speed"],
-        "image_preprocessing": "resize_2x + color_conversion",
+        "image_preprocessing": describe_preprocessing(),
+        "step_patterns": get_pattern_stats(),
     }
     
     # System Information
@@ -82,5 +111,6 @@ def get_app_status(start_time: datetime) -> AppStatusResponse:
         queue=queue_info,
         workers=workers_info,
         processing=processing_info,
+        cache=get_cache_stats(),
         system=system_info
     )
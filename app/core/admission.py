@@ -0,0 +1,109 @@
+import math
+import threading
+import time
+from collections import deque
+from decouple import config
+from app.core import metrics
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Reject new reports whose estimated wait is longer than this (0 = only reject when the queue is full)
+ADMISSION_MAX_WAIT_SECONDS = config("ADMISSION_MAX_WAIT_SECONDS", cast=float, default=900.0)
+# Completions within this many seconds make up the processing-time estimate
+ADMISSION_THROUGHPUT_WINDOW = config("ADMISSION_THROUGHPUT_WINDOW", cast=float, default=300.0)
+# Per-worker seconds per report assumed until enough reports have finished
+ADMISSION_DEFAULT_REPORT_SECONDS = config("ADMISSION_DEFAULT_REPORT_SECONDS", cast=float, default=8.0)
+# Bounds of the Retry-After header on 503
+ADMISSION_MIN_RETRY_AFTER = config("ADMISSION_MIN_RETRY_AFTER", cast=int, default=5)
+ADMISSION_MAX_RETRY_AFTER = config("ADMISSION_MAX_RETRY_AFTER", cast=int, default=600)
+# Completions needed before the measured processing time replaces the default
+MIN_SAMPLES = 5
+# Floor for the mean processing time, so a run of cache hits doesn't promise unlimited capacity
+MIN_REPORT_SECONDS = 0.1
+
+class AdmissionRejected(Exception):
+    """Report not accepted now; retry_after is the suggested wait in seconds"""
+
+    def __init__(self, reason: str, message: str, retry_after: int):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Estimates how long a new report would wait from recent throughput and decides
+    whether to take it.
+
+    Throughput is capacity, not arrival rate: workers / mean processing seconds of the
+    reports finished within ADMISSION_THROUGHPUT_WINDOW (before MIN_SAMPLES completions,
+    ADMISSION_DEFAULT_REPORT_SECONDS), so a quiet period doesn't make the service look
+    slow when a burst arrives. Processing seconds are the time a report held an
+    inference worker; reports answered by another's computation count as 0. The reports
+    ahead of a new one are those in its lane, scaled by the lane's weight share, but
+    never more than everything waiting, plus those already in the pipeline.
+    """
+
+    def __init__(self, max_wait: float = ADMISSION_MAX_WAIT_SECONDS, window: float = ADMISSION_THROUGHPUT_WINDOW):
+        self.max_wait = max_wait
+        self.window = window
+        self.completions = deque()
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = {}
+
+    def record_completion(self, seconds: float = 0.0, at: float = None):
+        """A report finished after holding an inference worker for `seconds`"""
+        now = time.time() if at is None else at
+        with self.lock:
+            self.completions.append((now, seconds))
+            self._trim(now)
+
+    def _trim(self, now: float):
+        while self.completions and self.completions[0][0] < now - self.window:
+            self.completions.popleft()
+
+    def throughput(self, workers: int) -> float:
+        """Reports per second"""
+        now = time.time()
+        with self.lock:
+            self._trim(now)
+            count = len(self.completions)
+            busy = sum(seconds for _, seconds in self.completions)
+        if count < MIN_SAMPLES:
+            return max(1, workers) / ADMISSION_DEFAULT_REPORT_SECONDS
+        return max(1, workers) / max(busy / count, MIN_REPORT_SECONDS)
+
+    def estimate(self, ahead_in_lane: int, lane_share: float, waiting: int, in_flight: int, workers: int) -> float:
+        """Seconds until a report submitted now would be finished"""
+        ahead = min(ahead_in_lane / max(lane_share, 0.01), waiting) + in_flight
+        return (ahead + 1) / self.throughput(workers)
+
+    def retry_after(self, seconds: float) -> int:
+        return int(min(ADMISSION_MAX_RETRY_AFTER, max(ADMISSION_MIN_RETRY_AFTER, math.ceil(seconds))))
+
+    def reject(self, reason: str, message: str, retry_after: float):
+        retry = self.retry_after(retry_after)
+        with self.lock:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        metrics.inc("admission_total", outcome="rejected", reason=reason)
+        raise AdmissionRejected(reason, message, retry)
+
+    def admit(self, wait: float):
+        with self.lock:
+            self.accepted += 1
+        metrics.inc("admission_total", outcome="accepted", reason="ok")
+        metrics.set_gauge("admission_estimated_wait_seconds", round(wait, 1))
+
+    def stats(self, workers: int = 1) -> dict:
+        return {
+            "max_wait_seconds": self.max_wait,
+            "throughput_per_minute": round(self.throughput(workers) * 60, 2),
+            "measured": len(self.completions) >= MIN_SAMPLES,
+            "accepted": self.accepted,
+            "rejected": dict(self.rejected),
+            "last_estimated_wait_seconds": metrics.get_gauge("admission_estimated_wait_seconds")
+        }
+
+admission = AdmissionController()
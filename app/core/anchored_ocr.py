@@ -0,0 +1,92 @@
+import numpy as np
+from decouple import config
+from easyocr.utils import reformat_input
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# full:     readtext() recognizes every detected box
+# anchored: recognize likely label boxes first, then only the numbers around matched anchors
+OCR_RECOGNITION_MODE = config("OCR_RECOGNITION_MODE", default="full").lower()
+# Box width/height range treated as a possible label ("Today" .. "Goal progress");
+# narrower boxes are lone numbers/icons, wider ones are sentences
+ANCHOR_MIN_ASPECT = config("ANCHOR_MIN_ASPECT", cast=float, default=1.5)
+ANCHOR_MAX_ASPECT = config("ANCHOR_MAX_ASPECT", cast=float, default=9.0)
+# Neighbourhood of an anchor, in anchor heights above/below its centre
+ANCHOR_NEIGHBOUR_RADIUS = config("ANCHOR_NEIGHBOUR_RADIUS", cast=float, default=4.0)
+
+NUMERIC_ALLOWLIST = '0123456789.,/ '
+
+# Labels the step extractors key on (layout rules and regex patterns)
+STEP_ANCHORS = (
+    'heart pts', 'hcart', 'kcart', 'poin kardio', 'today', 'hari ini', 'of goal', 'stress', 'wake',
+    'ingkh', 'steps', 'langkah', 'total', 'target', 'goal progress', 'kemajuan', 'add record',
+    'distance', 'jarak', 'edit', 'november', 'active time', 'waktu aktif'
+)
+
+def _box_geometry(box, free: bool):
+    """(cx, cy, width, height) for a horizontal [x_min, x_max, y_min, y_max] or free 4-point box"""
+    if free:
+        pts = np.asarray(box, dtype=np.float32)
+        x_min, y_min = pts.min(axis=0)
+        x_max, y_max = pts.max(axis=0)
+    else:
+        x_min, x_max, y_min, y_max = box
+    return (x_min + x_max) / 2, (y_min + y_max) / 2, max(x_max - x_min, 1), max(y_max - y_min, 1)
+
+def _recognize(reader, img_grey, boxes: list, indices: list, allowlist: str = None) -> dict:
+    """Recognize the given box indices; returns {index: (bbox, text, conf)}"""
+    recognized = {}
+    # One box per call, like readtext() with batch_size=1; degenerate boxes yield nothing
+    for i in indices:
+        box, free = boxes[i]
+        result = reader.recognize(
+            img_grey,
+            horizontal_list=[] if free else [box],
+            free_list=[box] if free else [],
+            allowlist=allowlist,
+            reformat=False
+        )
+        if result:
+            recognized[i] = result[0]
+    return recognized
+
+def readtext_anchored(reader, img_rgb: np.ndarray, accept) -> list:
+    """
+    readtext() equivalent that skips recognition of boxes far from step anchors.
+
+    accept(results) decides whether the partial results are good enough (steps found);
+    otherwise the remaining boxes are recognized and the full result is returned.
+    """
+    img, img_grey = reformat_input(img_rgb)
+    horizontal_lists, free_lists = reader.detect(img, reformat=False)
+    boxes = [(b, False) for b in horizontal_lists[0]] + [(b, True) for b in free_lists[0]]
+    geometry = [_box_geometry(b, free) for b, free in boxes]
+
+    # Round 1: label-shaped boxes
+    label_idx = [i for i, (_, _, w, h) in enumerate(geometry) if ANCHOR_MIN_ASPECT <= w / h <= ANCHOR_MAX_ASPECT]
+    recognized = _recognize(reader, img_grey, boxes, label_idx)
+    anchors = [i for i, (_, text, _) in recognized.items() if any(a in text.lower() for a in STEP_ANCHORS)]
+
+    # Round 2: numbers around the anchors
+    numeric_idx = []
+    if anchors:
+        for i, (_, cy, _, _) in enumerate(geometry):
+            if i in recognized:
+                continue
+            for a in anchors:
+                if abs(cy - geometry[a][1]) <= ANCHOR_NEIGHBOUR_RADIUS * geometry[a][3]:
+                    numeric_idx.append(i)
+                    break
+        recognized.update(_recognize(reader, img_grey, boxes, numeric_idx, allowlist=NUMERIC_ALLOWLIST))
+
+        partial = [recognized[i] for i in sorted(recognized)]
+        if accept(partial):
+            logger.info(f"⚓ Anchored OCR: recognized {len(recognized)}/{len(boxes)} boxes ({len(anchors)} anchors)")
+            return partial
+
+    # Fallback: full recognition; allowlisted boxes are redone with the full charset
+    remaining = [i for i in range(len(boxes)) if i not in recognized or i in numeric_idx]
+    recognized.update(_recognize(reader, img_grey, boxes, remaining))
+    logger.info(f"⚓ Anchored OCR: {'no anchors' if not anchors else 'no steps near anchors'}, recognized all {len(boxes)} boxes")
+    return [recognized[i] for i in sorted(recognized)]
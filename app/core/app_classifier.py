@@ -0,0 +1,151 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+# Keyword -> {app: weight}. Weights only feed the score vector; the label itself comes
+# from the priority rules in _label() so it stays identical to the old if-cascade.
+APP_KEYWORDS = {
+    'Fitbit': {'fitbit': 3},
+    'Samsung Health': {'samsung health': 3, 'daily activity': 2, 'aktivitas harian': 2, 'ingkh': 2},
+    'Google Fit': {'heart pts': 3, 'kcart pis': 2, 'hcart pts': 2, 'move min': 2, 'poin kardio': 3, 'menit bergerak': 2},
+    'Huawei Health': {'huawei': 3, 'health+': 3, 'kemajuan target': 2, 'goal progress': 2, "today's steps": 1,
+                      'todays steps': 1, 'stress': 1, 'wake': 1, 'rekaman data aktivitas': 1, 'activity records': 1},
+    'Garmin Connect': {'garmin': 3, '% of goal': 1, 'daily timeline': 1},
+    'Apple Health': {'fitness+': 1, 'show all health data': 2, 'step count': 1, 'step distance': 1, 'ringkasan': 1, 'summary': 1},
+}
+# Only used as conditions inside the rules
+RULE_KEYWORDS = ('/', 'bergerak', 'move', 'kcal')
+DEFAULT_APP = 'Apple Health'
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over lowercase keywords, compiled to a DFA once"""
+
+    def __init__(self, keywords):
+        goto, fail, output = [{}], [0], [set()]
+        for keyword in keywords:
+            state = 0
+            for ch in keyword:
+                if ch not in goto[state]:
+                    goto.append({})
+                    fail.append(0)
+                    output.append(set())
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            output[state].add(keyword)
+
+        # BFS: failure links, then fill in every transition so scanning never backtracks
+        order = deque(goto[0].values())
+        while order:
+            state = order.popleft()
+            for ch, nxt in goto[state].items():
+                order.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f][ch] if ch in goto[f] and goto[f][ch] != nxt else 0
+                output[nxt] |= output[fail[nxt]]
+        alphabet = {ch for keyword in keywords for ch in keyword}
+        delta = [dict() for _ in goto]
+        for state in self._bfs_order(goto):
+            for ch in alphabet:
+                if ch in goto[state]:
+                    delta[state][ch] = goto[state][ch]
+                elif state:
+                    target = delta[fail[state]].get(ch, 0)
+                    if target:
+                        delta[state][ch] = target
+        self.delta = delta
+        self.output = [frozenset(o) for o in output]
+
+    @staticmethod
+    def _bfs_order(goto):
+        order, queue = [], deque([0])
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            queue.extend(goto[state].values())
+        return order
+
+    def scan(self, text_lower: str) -> set:
+        """Every keyword occurring in the text, in one pass"""
+        delta, output = self.delta, self.output
+        found = set()
+        state = 0
+        for ch in text_lower:
+            state = delta[state].get(ch, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+    def scan_many(self, texts_lower: List[str]) -> List[set]:
+        """One pass over a batch; '\\0' between texts is outside the alphabet and resets the state"""
+        delta, output = self.delta, self.output
+        results, found = [], set()
+        state = 0
+        for ch in '\0'.join(texts_lower) + '\0':
+            if ch == '\0':
+                results.append(found)
+                found, state = set(), 0
+                continue
+            state = delta[state].get(ch, 0)
+            if output[state]:
+                found |= output[state]
+        return results
+
+automaton = KeywordAutomaton({kw for weights in APP_KEYWORDS.values() for kw in weights} | set(RULE_KEYWORDS))
+
+@dataclass
+class AppClassification:
+    label: str
+    confidence: float
+    scores: Dict[str, float] = field(default_factory=dict)
+    keywords: List[str] = field(default_factory=list)
+
+    def candidates(self, min_share: float = 0.2) -> List[str]:
+        """Apps worth running extractors for: the label plus any app holding min_share of the score"""
+        total = sum(self.scores.values())
+        others = [app for app, score in self.scores.items()
+                  if app != self.label and total and score / total >= min_share]
+        return [self.label] + sorted(others, key=lambda app: -self.scores[app])
+
+def _label(found: set) -> str:
+    """Same priority order as the original substring cascade"""
+    if 'fitbit' in found:
+        return 'Fitbit'
+    if found & {'samsung health', 'daily activity', 'aktivitas harian'}:
+        return 'Samsung Health'
+    if found & {'heart pts', 'kcart pis', 'hcart pts', 'move min', 'poin kardio', 'menit bergerak'}:
+        return 'Google Fit'
+    if found & {'huawei', 'health+', 'kemajuan target', 'goal progress'}:
+        return 'Huawei Health'
+    if found & {"today's steps", 'todays steps'} and '/' in found:
+        return 'Huawei Health'
+    if 'stress' in found and 'wake' in found:
+        return 'Huawei Health'
+    if 'ingkh' in found:
+        return 'Samsung Health'
+    if 'garmin' in found and 'fitness+' not in found:
+        return 'Garmin Connect'
+    if '% of goal' in found and 'daily timeline' in found:
+        return 'Garmin Connect'
+    if found & {'rekaman data aktivitas', 'activity records'}:
+        if 'bergerak' in found or ('move' in found and 'kcal' in found):
+            return 'Huawei Health'
+    return DEFAULT_APP
+
+def _classification(found: set) -> AppClassification:
+    scores = {app: float(sum(w for kw, w in weights.items() if kw in found)) for app, weights in APP_KEYWORDS.items()}
+    label = _label(found)
+    total = sum(scores.values())
+    return AppClassification(
+        label=label,
+        confidence=round(scores[label] / total, 3) if total else 0.0,
+        scores=scores,
+        keywords=sorted(found)
+    )
+
+def classify(text: str) -> AppClassification:
+    return _classification(automaton.scan(text.lower()))
+
+def classify_batch(texts: List[str]) -> List[AppClassification]:
+    return [_classification(found) for found in automaton.scan_many([t.lower().replace('\0', ' ') for t in texts])]
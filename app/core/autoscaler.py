@@ -0,0 +1,173 @@
+import asyncio
+import time
+from collections import deque
+import psutil
+from decouple import config
+from app.core import metrics
+from app.core.ocr_pool import ocr_pool
+from app.core.inference_scheduler import INFERENCE_BATCHING
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Grow/shrink the inference workers between MIN and MAX from queue depth, latency and CPU
+AUTOSCALE_ENABLED = config("AUTOSCALE_ENABLED", cast=bool, default=True)
+AUTOSCALE_MIN_WORKERS = config("AUTOSCALE_MIN_WORKERS", cast=int, default=1)
+AUTOSCALE_MAX_WORKERS = config("AUTOSCALE_MAX_WORKERS", cast=int, default=config("WORKER_COUNT", cast=int, default=3) * 2)
+# Seconds between decisions
+AUTOSCALE_INTERVAL = config("AUTOSCALE_INTERVAL", cast=float, default=5.0)
+# Scale up when more than this many reports wait per worker
+AUTOSCALE_BACKLOG_PER_WORKER = config("AUTOSCALE_BACKLOG_PER_WORKER", cast=float, default=2.0)
+# Scale up when recent download-to-delivery time exceeds this while reports wait
+AUTOSCALE_TARGET_LATENCY = config("AUTOSCALE_TARGET_LATENCY", cast=float, default=20.0)
+# No scale-up while system CPU is above this; extra workers would only add contention
+AUTOSCALE_MAX_CPU = config("AUTOSCALE_MAX_CPU", cast=float, default=85.0)
+# Hysteresis: consecutive agreeing decisions needed, and quiet time after any change
+AUTOSCALE_UP_AFTER = config("AUTOSCALE_UP_AFTER", cast=int, default=2)
+AUTOSCALE_DOWN_AFTER = config("AUTOSCALE_DOWN_AFTER", cast=int, default=6)
+AUTOSCALE_COOLDOWN = config("AUTOSCALE_COOLDOWN", cast=float, default=30.0)
+
+UP = "up"
+DOWN = "down"
+HOLD = "hold"
+
+class Autoscaler:
+    """
+    Periodically resizes the pipeline's infer stage (the former ocr_worker tasks).
+
+    Each tick yields a wish: up (backlog per worker or latency over target), down
+    (nothing waiting and at least one worker idle) or hold. A wish must repeat
+    AUTOSCALE_UP_AFTER / AUTOSCALE_DOWN_AFTER ticks in a row and the last change must
+    be AUTOSCALE_COOLDOWN seconds old before the worker count moves by one; scale-up
+    is also held back while CPU is above AUTOSCALE_MAX_CPU. Scale-up needs parallel
+    inference behind the workers: the process pool, or INFERENCE_BATCHING (bigger
+    batches); with plain threads the maximum is the starting worker count.
+    Every tick is counted in autoscale_decisions_total{action,reason}.
+    """
+
+    def __init__(self, pipeline, queued, min_workers: int = AUTOSCALE_MIN_WORKERS,
+                 max_workers: int = AUTOSCALE_MAX_WORKERS, interval: float = AUTOSCALE_INTERVAL):
+        self.pipeline = pipeline
+        self.stage = pipeline.by_name["infer"]
+        self.queued = queued
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        if ocr_pool is not None:
+            # More infer workers than pool processes would only queue inside the pool
+            self.max_workers = max(self.min_workers, min(self.max_workers, ocr_pool.processes))
+        elif not INFERENCE_BATCHING:
+            # Thread mode: extra workers share one reader and torch's thread pool, adding latency
+            # rather than throughput (and that latency would ask for more workers), so only scale down
+            self.max_workers = max(self.min_workers, min(self.max_workers, self.stage.concurrency))
+        self.interval = interval
+        self.streak_action = HOLD
+        self.streak = 0
+        self.last_change = 0.0
+        self.history = deque(maxlen=20)
+        self.task = None
+        self.last = {}
+
+    def start(self):
+        workers = min(self.max_workers, max(self.min_workers, self.stage.concurrency))
+        if workers != self.stage.concurrency:
+            self.stage.resize(workers)
+        metrics.set_gauge("autoscale_workers", workers)
+        psutil.cpu_percent(interval=None)  # first call only primes the counter
+        self.task = asyncio.create_task(self._loop())
+        logger.info(f"🔁 Autoscaler on: {self.min_workers}-{self.max_workers} inference workers, every {self.interval:.0f}s")
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"❌ Autoscaler tick failed: {e}")
+
+    def observe(self) -> dict:
+        return {
+            "backlog": self.queued() + self.pipeline.backlog(),
+            "workers": self.stage.concurrency,
+            "busy": self.stage.busy,
+            "latency": self.pipeline.recent_latency(),
+            "cpu": psutil.cpu_percent(interval=None)
+        }
+
+    def wish(self, signals: dict) -> tuple:
+        """(action, reason) for one set of signals, before hysteresis"""
+        backlog, workers = signals["backlog"], signals["workers"]
+        if backlog > workers * AUTOSCALE_BACKLOG_PER_WORKER:
+            action, reason = UP, "backlog"
+        elif backlog > 0 and signals["latency"] > AUTOSCALE_TARGET_LATENCY:
+            action, reason = UP, "latency"
+        elif backlog == 0 and signals["busy"] < workers:
+            action, reason = DOWN, "idle"
+        else:
+            return HOLD, "steady"
+        if action == UP and workers >= self.max_workers:
+            return HOLD, "at_max"
+        if action == UP and signals["cpu"] > AUTOSCALE_MAX_CPU:
+            return HOLD, "cpu"
+        if action == DOWN and workers <= self.min_workers:
+            return HOLD, "at_min"
+        return action, reason
+
+    def tick(self) -> str:
+        signals = self.observe()
+        action, reason = self.wish(signals)
+        self.streak = self.streak + 1 if action == self.streak_action else 1
+        self.streak_action = action
+        needed = AUTOSCALE_UP_AFTER if action == UP else AUTOSCALE_DOWN_AFTER
+        if action != HOLD and self.streak < needed:
+            action, reason = HOLD, f"pending_{action}"
+        elif action != HOLD and time.time() - self.last_change < AUTOSCALE_COOLDOWN:
+            action, reason = HOLD, "cooldown"
+        if action != HOLD:
+            workers = signals["workers"] + (1 if action == UP else -1)
+            self.stage.resize(workers)
+            self.last_change = time.time()
+            self.streak = 0
+            self.history.append({"at": round(self.last_change, 1), "action": action, "reason": reason, "workers": workers})
+            logger.info(f"🔁 Autoscale {action} to {workers} inference workers ({reason}: backlog={signals['backlog']}, "
+                        f"latency={signals['latency']:.1f}s, cpu={signals['cpu']:.0f}%)")
+        metrics.inc("autoscale_decisions_total", action=action, reason=reason)
+        metrics.set_gauge("autoscale_workers", self.stage.concurrency)
+        metrics.set_gauge("autoscale_backlog", signals["backlog"])
+        metrics.set_gauge("autoscale_cpu_percent", signals["cpu"])
+        self.last = {**signals, "latency": round(signals["latency"], 2), "action": action, "reason": reason}
+        return action
+
+    def stats(self) -> dict:
+        return {
+            "enabled": True,
+            "workers": self.stage.concurrency,
+            "min_workers": self.min_workers,
+            "max_workers": self.max_workers,
+            "last_decision": self.last,
+            "recent_changes": list(self.history)
+        }
+
+autoscaler = None
+
+def start_autoscaler(pipeline, queued):
+    """queued() is the number of reports waiting in the job queue"""
+    global autoscaler
+    if not AUTOSCALE_ENABLED:
+        return None
+    autoscaler = Autoscaler(pipeline, queued)
+    autoscaler.start()
+    return autoscaler
+
+def stop_autoscaler():
+    if autoscaler is not None:
+        autoscaler.stop()
+
+def get_autoscaler_stats() -> dict:
+    if autoscaler is None:
+        return {"enabled": AUTOSCALE_ENABLED}
+    return autoscaler.stats()
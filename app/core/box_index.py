@@ -0,0 +1,104 @@
+import numpy as np
+
+class BoxIndex:
+    """
+    EasyOCR (bbox, text, conf) results as NumPy arrays plus a y-sorted index.
+
+    Geometry is kept as float32 columns (x0, y0, x1, y1, cx, cy, h); numeric boxes are
+    parsed once (3-5 digits after dropping separators). Boxes are sorted by centre y,
+    so a vertical band is found with two binary searches and only the boxes inside it
+    are filtered, instead of walking the whole result list per anchor.
+    """
+
+    def __init__(self, results: list):
+        self.texts = [r[1] for r in results]
+        self.lower = [t.lower() for t in self.texts]
+        n = len(results)
+        if n:
+            pts = np.array([np.asarray(r[0], dtype=np.float32).reshape(-1, 2)[:4] for r in results], dtype=np.float32)
+        else:
+            pts = np.zeros((0, 4, 2), dtype=np.float32)
+        self.x0, self.y0 = pts[:, :, 0].min(axis=1), pts[:, :, 1].min(axis=1)
+        self.x1, self.y1 = pts[:, :, 0].max(axis=1), pts[:, :, 1].max(axis=1)
+        self.cx, self.cy = (self.x0 + self.x1) / 2, (self.y0 + self.y1) / 2
+        self.h = np.maximum(self.y1 - self.y0, 1)
+        self.line_height = float(np.median(self.h)) if n else 1.0
+
+        # Numeric boxes: value (-1 if not a number), digit count, thousands separator present
+        self.values = np.full(n, -1, dtype=np.int64)
+        self.digits = np.zeros(n, dtype=np.int8)
+        self.separated = np.zeros(n, dtype=bool)
+        for i, text in enumerate(self.texts):
+            num_text = text.replace(',', '').replace('.', '').replace(' ', '')
+            if num_text.isdigit() and 3 <= len(num_text) <= 5:
+                self.values[i] = int(num_text)
+                self.digits[i] = len(num_text)
+                self.separated[i] = ',' in text or (text.count('.') == 1 and len(text) > 3)
+
+        self.by_y = np.argsort(self.cy, kind='stable')
+        self.sorted_cy = self.cy[self.by_y]
+
+    def __len__(self):
+        return len(self.texts)
+
+    def reading_order(self, indices) -> list:
+        """Top-to-bottom, then left-to-right, treating boxes within half a line as one row"""
+        return sorted(indices, key=lambda i: (int(self.cy[i] / self.line_height + 0.5), float(self.cx[i])))
+
+    def find(self, predicate) -> list:
+        """Indices whose lowercase text satisfies predicate, in reading order"""
+        return self.reading_order([i for i, text in enumerate(self.lower) if predicate(text)])
+
+    def band(self, y_lo: float, y_hi: float) -> np.ndarray:
+        """Indices with centre y in [y_lo, y_hi], via binary search on the y-sorted order"""
+        lo = np.searchsorted(self.sorted_cy, y_lo, side='left')
+        hi = np.searchsorted(self.sorted_cy, y_hi, side='right')
+        return self.by_y[lo:hi]
+
+    def numbers(self, indices, min_digits: int = 3, max_digits: int = 5, min_value: int = 100,
+                separated: bool = None) -> np.ndarray:
+        indices = np.asarray(indices, dtype=np.int64)
+        if not len(indices):
+            return indices
+        keep = (self.values[indices] >= min_value) & (self.digits[indices] >= min_digits) & (self.digits[indices] <= max_digits)
+        if separated is not None:
+            keep &= self.separated[indices] == separated
+        return indices[keep]
+
+    def _distance(self, anchor: int, indices: np.ndarray) -> np.ndarray:
+        return np.hypot(self.cx[indices] - self.cx[anchor], self.cy[indices] - self.cy[anchor])
+
+    def _same_row(self, anchor: int, indices: np.ndarray) -> np.ndarray:
+        return np.abs(self.cy[indices] - self.cy[anchor]) < 0.5 * np.maximum(self.h[indices], self.h[anchor])
+
+    def above_or_left(self, anchor: int, max_lines: float, **number_filters) -> list:
+        """Numeric boxes above the anchor (within max_lines anchor heights) or left of it on its row, nearest first"""
+        h = self.h[anchor]
+        near = self.numbers(self.band(self.cy[anchor] - max_lines * h, self.cy[anchor] + h), **number_filters)
+        near = near[near != anchor]
+        above = self.cy[near] < self.y0[anchor]
+        left = self._same_row(anchor, near) & (self.cx[near] < self.x0[anchor])
+        near = near[above | left]
+        return [int(i) for i in near[np.argsort(self._distance(anchor, near), kind='stable')]]
+
+    def below(self, anchor: int, max_lines: float, **number_filters) -> list:
+        """Numeric boxes below the anchor that overlap it horizontally, nearest first"""
+        h = self.h[anchor]
+        near = self.numbers(self.band(self.y1[anchor], self.cy[anchor] + max_lines * h), **number_filters)
+        near = near[(near != anchor) & (self.x1[near] > self.x0[anchor]) & (self.x0[near] < self.x1[anchor])]
+        return [int(i) for i in near[np.argsort(self._distance(anchor, near), kind='stable')]]
+
+    def left_of(self, anchor: int, **number_filters) -> list:
+        """Numeric boxes on the anchor's row to its left, nearest first"""
+        h = self.h[anchor]
+        near = self.numbers(self.band(self.cy[anchor] - h, self.cy[anchor] + h), **number_filters)
+        near = near[(near != anchor) & self._same_row(anchor, near) & (self.cx[near] < self.x0[anchor])]
+        return [int(i) for i in near[np.argsort(self._distance(anchor, near), kind='stable')]]
+
+    def between(self, first: int, second: int, **number_filters) -> list:
+        """Numeric boxes inside the rectangle spanned by two anchors, in reading order"""
+        x_lo, x_hi = min(self.x0[first], self.x0[second]), max(self.x1[first], self.x1[second])
+        y_lo, y_hi = min(self.y0[first], self.y0[second]), max(self.y1[first], self.y1[second])
+        near = self.numbers(self.band(y_lo, y_hi), **number_filters)
+        near = near[(near != first) & (near != second) & (self.cx[near] >= x_lo) & (self.cx[near] <= x_hi)]
+        return self.reading_order([int(i) for i in near])
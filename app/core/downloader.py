@@ -0,0 +1,86 @@
+import asyncio
+import cv2
+import httpx
+import numpy as np
+from urllib.parse import urlsplit
+from decouple import config
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Shared HTTP client configuration
+DOWNLOAD_TIMEOUT = config("DOWNLOAD_TIMEOUT", cast=float, default=30.0)
+DOWNLOAD_MAX_CONNECTIONS = config("DOWNLOAD_MAX_CONNECTIONS", cast=int, default=50)
+DOWNLOAD_MAX_KEEPALIVE = config("DOWNLOAD_MAX_KEEPALIVE", cast=int, default=20)
+DOWNLOAD_KEEPALIVE_EXPIRY = config("DOWNLOAD_KEEPALIVE_EXPIRY", cast=float, default=60.0)
+DOWNLOAD_MAX_PER_HOST = config("DOWNLOAD_MAX_PER_HOST", cast=int, default=8)
+DOWNLOAD_HTTP2 = config("DOWNLOAD_HTTP2", cast=bool, default=True)
+
+client = None
+host_limits = {}
+
+def _http2_supported() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("⚠ h2 package not found, image downloads use HTTP/1.1")
+        return False
+
+def get_client() -> httpx.AsyncClient:
+    """Get the long-lived download client, creating it on first use"""
+    global client
+    if client is None or client.is_closed:
+        http2 = DOWNLOAD_HTTP2 and _http2_supported()
+        client = httpx.AsyncClient(
+            timeout=DOWNLOAD_TIMEOUT,
+            http2=http2,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=DOWNLOAD_MAX_CONNECTIONS,
+                max_keepalive_connections=DOWNLOAD_MAX_KEEPALIVE,
+                keepalive_expiry=DOWNLOAD_KEEPALIVE_EXPIRY
+            )
+        )
+        logger.info(f"✓ Download client ready (HTTP/2: {http2}, per-host limit: {DOWNLOAD_MAX_PER_HOST})")
+    return client
+
+async def close_client():
+    global client
+    if client is not None and not client.is_closed:
+        await client.aclose()
+        logger.info("✓ Download client closed")
+    client = None
+    host_limits.clear()
+
+def _host_limit(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc
+    if host not in host_limits:
+        host_limits[host] = asyncio.Semaphore(DOWNLOAD_MAX_PER_HOST)
+    return host_limits[host]
+
+def decode_image(content: bytes, source: str) -> np.ndarray:
+    img_array = np.frombuffer(content, np.uint8)
+    img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Failed to decode image from {source}")
+    return img
+
+def load_file_image(file_path: str) -> np.ndarray:
+    img = cv2.imread(file_path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Failed to load image from {file_path}")
+    return img
+
+async def fetch_image_bytes(url: str) -> bytes:
+    async with _host_limit(url):
+        response = await get_client().get(url)
+        response.raise_for_status()
+        return response.content
+
+async def fetch_image(url: str) -> np.ndarray:
+    """Download and decode an image without blocking the event loop"""
+    if url.startswith('file://'):
+        return await asyncio.to_thread(load_file_image, url[7:])
+    content = await fetch_image_bytes(url)
+    return await asyncio.to_thread(decode_image, content, url)
@@ -0,0 +1,122 @@
+import functools
+import gc
+import threading
+import time
+import psutil
+from app.core.logger import setup_logger
+from app.core.model_bundle import OCR_MODEL_BUNDLE_DIR, create_reader
+
+logger = setup_logger(__name__)
+
+DEFAULT_LANGUAGES = ("en",)
+
+@functools.lru_cache(maxsize=1)
+def default_backend() -> str:
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        logger.warning("⚠ PyTorch not found, using CPU")
+        return "cpu"
+
+def _parameter_bytes(module) -> int:
+    if module is None:
+        return 0
+    module = getattr(module, "module", module)
+    return sum(p.numel() * p.element_size() for p in module.parameters())
+
+class _Engine:
+    __slots__ = ("reader", "holders", "loaded_at", "load_seconds", "weight_bytes", "rss_delta_bytes")
+
+    def __init__(self, reader, load_seconds: float, rss_delta_bytes: int):
+        self.reader = reader
+        self.holders = set()
+        self.loaded_at = time.time()
+        self.load_seconds = load_seconds
+        self.weight_bytes = _parameter_bytes(getattr(reader, "detector", None)) + _parameter_bytes(getattr(reader, "recognizer", None))
+        self.rss_delta_bytes = rss_delta_bytes
+
+class EngineRegistry:
+    """
+    One OCR model per (languages, backend) per process.
+
+    Consumers acquire an engine under a holder name ("url_pipeline", "local_pipeline",
+    a script name, ...); the same holder acquiring twice is a no-op, so get_reader()
+    can call acquire() on every request. The model is unloaded once the last holder
+    releases it.
+    """
+
+    def __init__(self):
+        self.engines = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(languages, backend) -> tuple:
+        return (tuple(sorted(languages)), backend or default_backend())
+
+    def acquire(self, holder: str, languages=DEFAULT_LANGUAGES, backend: str = None):
+        key = self._key(languages, backend)
+        engine = self.engines.get(key)
+        if engine is not None and holder in engine.holders:
+            return engine.reader
+        with self.lock:
+            engine = self.engines.get(key)
+            if engine is None:
+                engine = self.engines[key] = self._load(key)
+            engine.holders.add(holder)
+            return engine.reader
+
+    def release(self, holder: str, languages=DEFAULT_LANGUAGES, backend: str = None):
+        key = self._key(languages, backend)
+        with self.lock:
+            engine = self.engines.get(key)
+            if engine is None:
+                return
+            engine.holders.discard(holder)
+            if engine.holders:
+                return
+            del self.engines[key]
+        logger.info(f"🗑 Unloading OCR engine {key}")
+        del engine
+        gc.collect()
+        if key[1] == "cuda":
+            import torch
+            torch.cuda.empty_cache()
+
+    def loaded(self, languages=DEFAULT_LANGUAGES, backend: str = None) -> bool:
+        return self._key(languages, backend) in self.engines
+
+    def _load(self, key: tuple) -> _Engine:
+        languages, backend = key
+        logger.info(f"📦 Loading EasyOCR {list(languages)} (GPU: {backend == 'cuda'})...")
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        started = time.perf_counter()
+        reader = create_reader(list(languages), gpu=backend == "cuda")
+        engine = _Engine(reader, time.perf_counter() - started, process.memory_info().rss - rss_before)
+        logger.info(f"✓ EasyOCR loaded with {'GPU' if backend == 'cuda' else 'CPU'} in {engine.load_seconds:.1f}s "
+                    f"({engine.weight_bytes / 1e6:.0f} MB weights)")
+        return engine
+
+    def stats(self) -> dict:
+        with self.lock:
+            engines = [{
+                "languages": list(key[0]),
+                "backend": key[1],
+                "holders": sorted(engine.holders),
+                "refcount": len(engine.holders),
+                "load_seconds": round(engine.load_seconds, 3),
+                "weights_mb": round(engine.weight_bytes / 1e6, 1),
+                "rss_delta_mb": round(engine.rss_delta_bytes / 1e6, 1),
+                "memory_mapped": bool(OCR_MODEL_BUNDLE_DIR)
+            } for key, engine in self.engines.items()]
+        return {
+            "loaded": len(engines),
+            "total_weights_mb": round(sum(e["weights_mb"] for e in engines), 1),
+            "engines": engines
+        }
+
+engine_registry = EngineRegistry()
+
+def get_engine_stats() -> dict:
+    return engine_registry.stats()
@@ -0,0 +1,214 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import cv2
+import numpy as np
+from decouple import config
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+INFERENCE_BATCHING = config("INFERENCE_BATCHING", cast=bool, default=False)
+INFERENCE_MAX_BATCH = config("INFERENCE_MAX_BATCH", cast=int, default=4)
+INFERENCE_MAX_WAIT_MS = config("INFERENCE_MAX_WAIT_MS", cast=float, default=25.0)
+# Images are padded to the largest one in their batch; don't pad beyond this area ratio
+INFERENCE_PAD_TOLERANCE = config("INFERENCE_PAD_TOLERANCE", cast=float, default=1.3)
+
+class _Job:
+    __slots__ = ("kind", "args", "kwargs", "future")
+
+    def __init__(self, kind: str, args: tuple, kwargs: dict):
+        self.kind = kind
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+def _pad_to(img: np.ndarray, height: int, width: int) -> np.ndarray:
+    # Bottom/right padding keeps box coordinates of the original content unchanged
+    pad_bottom, pad_right = height - img.shape[0], width - img.shape[1]
+    if pad_bottom == 0 and pad_right == 0:
+        return img
+    fill = img[-1, -1].tolist()
+    return cv2.copyMakeBorder(img, 0, pad_bottom, 0, pad_right, cv2.BORDER_CONSTANT, value=fill)
+
+def _group_by_size(jobs: list) -> list:
+    """Split a batch so padding never grows an image by more than INFERENCE_PAD_TOLERANCE"""
+    groups = []
+    for job in sorted(jobs, key=lambda j: j.args[0].shape[0] * j.args[0].shape[1]):
+        img = job.args[0]
+        if groups:
+            group = groups[-1]
+            height = max(img.shape[0], max(j.args[0].shape[0] for j in group))
+            width = max(img.shape[1], max(j.args[0].shape[1] for j in group))
+            smallest = group[0].args[0]
+            if (img.shape[2:] == smallest.shape[2:]
+                    and height * width <= INFERENCE_PAD_TOLERANCE * smallest.shape[0] * smallest.shape[1]):
+                group.append(job)
+                continue
+        groups.append([job])
+    return groups
+
+class InferenceScheduler:
+    """
+    Owns the OCR reader on one inference thread.
+
+    readtext() calls from any number of worker threads are collected for up to
+    max_wait_ms (or until max_batch images) and run as one readtext_batched() call,
+    so the detector sees a single batched forward pass instead of N threads competing
+    for torch's intra-op pool. Other reader calls (detect/recognize) are serialized on
+    the same thread.
+    """
+
+    def __init__(self, reader, max_batch: int = INFERENCE_MAX_BATCH, max_wait_ms: float = INFERENCE_MAX_WAIT_MS):
+        self.reader = reader
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.images = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.started_at = time.time()
+                self.thread = threading.Thread(target=self._loop, name="ocr-inference", daemon=True)
+                self.thread.start()
+                logger.info(f"🚀 Inference scheduler started (max batch {self.max_batch}, max wait {self.max_wait * 1000:.0f}ms)")
+
+    def stop(self):
+        with self.lock:
+            if self.thread is not None:
+                self.jobs.put(None)
+                self.thread.join(timeout=30)
+                self.thread = None
+                logger.info("✓ Inference scheduler stopped")
+
+    # Reader-compatible API (blocking, safe to call from any thread)
+    def readtext(self, image, **kwargs):
+        return self._submit("readtext", (image,), kwargs)
+
+    def detect(self, *args, **kwargs):
+        return self._submit("detect", args, kwargs)
+
+    def recognize(self, *args, **kwargs):
+        return self._submit("recognize", args, kwargs)
+
+    def stats(self) -> dict:
+        elapsed = time.time() - self.started_at if self.started_at else 0
+        return {
+            "enabled": True,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": self.jobs.qsize(),
+            "batches": self.batches,
+            "images": self.images,
+            "avg_batch_size": round(self.images / self.batches, 2) if self.batches else 0,
+            "images_per_second": round(self.images / elapsed, 3) if elapsed else 0,
+            "utilization": f"{self.busy_seconds / elapsed * 100:.1f}%" if elapsed else "0.0%"
+        }
+
+    def _submit(self, kind: str, args: tuple, kwargs: dict):
+        if self.thread is None:
+            self.start()
+        job = _Job(kind, args, kwargs)
+        self.jobs.put(job)
+        return job.future.result()
+
+    def _batchable(self, job) -> bool:
+        return job.kind == "readtext" and not job.kwargs and isinstance(job.args[0], np.ndarray)
+
+    def _loop(self):
+        deferred = deque()
+        while True:
+            job = deferred.popleft() if deferred else self.jobs.get()
+            if job is None:
+                break
+            if not self._batchable(job):
+                self._run(job)
+                continue
+
+            batch = [job]
+            deadline = time.monotonic() + self.max_wait
+            stopping = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    nxt = self.jobs.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stopping = True
+                    break
+                if self._batchable(nxt):
+                    batch.append(nxt)
+                else:
+                    deferred.append(nxt)
+            for group in _group_by_size(batch):
+                self._run_batch(group)
+            if stopping:
+                deferred.append(None)
+
+    def _run(self, job):
+        started = time.perf_counter()
+        try:
+            job.future.set_result(getattr(self.reader, job.kind)(*job.args, **job.kwargs))
+        except Exception as e:
+            job.future.set_exception(e)
+        self.busy_seconds += time.perf_counter() - started
+        if job.kind == "readtext":
+            self.batches += 1
+            self.images += 1
+
+    def _run_batch(self, group: list):
+        if len(group) == 1:
+            self._run(group[0])
+            return
+        started = time.perf_counter()
+        height = max(j.args[0].shape[0] for j in group)
+        width = max(j.args[0].shape[1] for j in group)
+        try:
+            images = [_pad_to(j.args[0], height, width) for j in group]
+            results = self.reader.readtext_batched(images, batch_size=len(group))
+        except Exception as e:
+            # One bad image must not fail the others
+            logger.warning(f"⚠ Batched inference failed ({e}), retrying {len(group)} images one by one")
+            for job in group:
+                self._run(job)
+            return
+        for job, result in zip(group, results):
+            job.future.set_result(result)
+        self.busy_seconds += time.perf_counter() - started
+        self.batches += 1
+        self.images += len(group)
+
+scheduler = None
+scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """Shared scheduler when INFERENCE_BATCHING is on, otherwise None (callers use the reader directly)"""
+    global scheduler
+    if not INFERENCE_BATCHING:
+        return None
+    if scheduler is None:
+        with scheduler_lock:
+            if scheduler is None:
+                from app.core.ocr_processor import get_reader
+                scheduler = InferenceScheduler(get_reader())
+    return scheduler
+
+def stop_scheduler():
+    if scheduler is not None:
+        scheduler.stop()
+
+def get_scheduler_stats() -> dict:
+    if scheduler is None:
+        return {"enabled": INFERENCE_BATCHING}
+    return scheduler.stats()
@@ -0,0 +1,326 @@
+import asyncio
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from decouple import config
+from app.core.lanes import FairScheduler
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Empty = in-memory queue (jobs are lost on restart); a path = SQLite (WAL) backed queue
+QUEUE_DB_PATH = config("QUEUE_DB_PATH", default="")
+# A claimed job not acked within this many seconds is handed out again (at-least-once)
+QUEUE_VISIBILITY_TIMEOUT = config("QUEUE_VISIBILITY_TIMEOUT", cast=float, default=600.0)
+# How often an idle get() re-checks for jobs whose visibility timeout expired
+QUEUE_POLL_SECONDS = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    report_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    visible_at REAL NOT NULL,
+    claimed_by TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lane TEXT NOT NULL DEFAULT 'staging',
+    tag REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_report ON jobs (report_id);
+"""
+# Added after the first release of the table
+MIGRATIONS = {
+    "lane": "ALTER TABLE jobs ADD COLUMN lane TEXT NOT NULL DEFAULT 'staging'",
+    "tag": "ALTER TABLE jobs ADD COLUMN tag REAL NOT NULL DEFAULT 0",
+}
+INDEXES = """
+DROP INDEX IF EXISTS jobs_visible;
+CREATE INDEX IF NOT EXISTS jobs_lane ON jobs (lane, tag, id);
+CREATE INDEX IF NOT EXISTS jobs_visible_at ON jobs (visible_at);
+"""
+
+class SQLiteJobStore:
+    """
+    Jobs table in a WAL-mode SQLite file.
+
+    A job is visible when visible_at <= now. Claiming pushes visible_at forward by the
+    visibility timeout and acking deletes the row, so a worker that dies mid-job (or a
+    process that is killed) leaves the job to reappear once the timeout passes. One
+    connection, serialized by a lock: every call is a single indexed statement or two.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = QUEUE_VISIBILITY_TIMEOUT):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives a process crash / OOM kill; only power loss can drop the last commits
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                self.conn.execute(statement)
+        self.conn.executescript(INDEXES)
+        self.enqueued = 0
+        self.redelivered = 0
+
+    def put(self, report_id: str, payload: str, lane: str = "staging", tag: float = 0.0) -> int:
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO jobs (report_id, payload, enqueued_at, visible_at, lane, tag) VALUES (?, ?, ?, ?, ?, ?)",
+                (report_id, payload, now, now, lane, tag)
+            )
+            self.enqueued += 1
+            return cursor.lastrowid
+
+    def claim(self, claimed_by: str, lane: str = None):
+        """
+        Lowest-tag visible job of a lane (any lane if None), now invisible for the timeout.
+        Returns (id, payload, lane, tag, redelivered) or None; redelivered means an earlier
+        claim expired without an ack.
+        """
+        now = time.time()
+        if lane is None:
+            query, params = "SELECT id, payload, lane, tag, claimed_by FROM jobs WHERE visible_at <= ? ORDER BY tag, id LIMIT 1", (now,)
+        else:
+            query, params = ("SELECT id, payload, lane, tag, claimed_by FROM jobs WHERE lane = ? AND visible_at <= ? "
+                             "ORDER BY tag, id LIMIT 1"), (lane, now)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(query, params).fetchone()
+                if row is not None:
+                    self.conn.execute(
+                        "UPDATE jobs SET visible_at = ?, claimed_by = ?, attempts = attempts + 1 WHERE id = ?",
+                        (now + self.visibility_timeout, claimed_by, row[0])
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        redelivered = row[4] is not None
+        if redelivered:
+            self.redelivered += 1
+        return row[0], row[1], row[2], row[3], redelivered
+
+    def ack(self, job_id: int):
+        with self.lock:
+            self.conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def update_payload(self, report_id: str, payload: str) -> int:
+        """Rewrite the payload of a report's unclaimed job(s); returns rows changed"""
+        with self.lock:
+            return self.conn.execute(
+                "UPDATE jobs SET payload = ? WHERE report_id = ? AND claimed_by IS NULL", (payload, report_id)
+            ).rowcount
+
+    def requeue_unfinished(self) -> int:
+        """Make every claimed job visible again; called once at startup, before any worker runs"""
+        with self.lock:
+            return self.conn.execute(
+                "UPDATE jobs SET visible_at = enqueued_at, claimed_by = NULL WHERE claimed_by IS NOT NULL"
+            ).rowcount
+
+    def pending(self) -> list:
+        """All (payload, lane, tag) in queue order"""
+        with self.lock:
+            return self.conn.execute("SELECT payload, lane, tag FROM jobs ORDER BY lane, tag, id").fetchall()
+
+    def count(self, visible_only: bool = False) -> int:
+        with self.lock:
+            if visible_only:
+                return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE visible_at <= ?", (time.time(),)).fetchone()[0]
+            return self.conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def clear(self) -> int:
+        with self.lock:
+            return self.conn.execute("DELETE FROM jobs").rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class MemoryTaskQueue:
+    """
+    In-memory queue (lost on restart) with one tag-ordered heap per lane; the
+    FairScheduler picks the lane. Same put/get/qsize/task_done surface as asyncio.Queue.
+    """
+    durable = False
+
+    def __init__(self, scheduler: FairScheduler, maxsize: int = 0):
+        self.scheduler = scheduler
+        self.maxsize = maxsize
+        self.heaps = {lane: [] for lane in scheduler.weights}
+        self.counter = itertools.count()
+        self.available = asyncio.Event()
+        self.waiting = 0
+
+    def qsize(self) -> int:
+        return self.waiting
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= self.waiting
+
+    async def put(self, data):
+        self.put_nowait(data)
+
+    def put_nowait(self, data):
+        if self.full():
+            raise asyncio.QueueFull
+        lane, tag = self.scheduler.enqueued(data)
+        heapq.heappush(self.heaps[lane], (tag, next(self.counter), data))
+        self.waiting += 1
+        self.available.set()
+
+    async def get(self):
+        while True:
+            for lane in self.scheduler.lane_order():
+                if self.heaps[lane]:
+                    tag, _, data = heapq.heappop(self.heaps[lane])
+                    self.scheduler.on_dispatch(data, lane, tag)
+                    self.waiting -= 1
+                    return data
+            self.available.clear()
+            await self.available.wait()
+
+    def task_done(self):
+        pass
+
+    def ack(self, data):
+        pass
+
+    def update(self, data):
+        pass
+
+    def recover(self) -> list:
+        return []
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "waiting": self.waiting, "scheduler": self.scheduler.stats()}
+
+    def close(self):
+        pass
+
+class DurableTaskQueue:
+    """
+    asyncio.Queue-compatible front for SQLiteJobStore, claiming from lanes in the
+    FairScheduler's order.
+
+    get() returns the request model; the job id is remembered per returned object (a
+    resubmitted report can have two jobs in flight) so the worker acks with ack(data)
+    once the report is finished (success or handled failure). Anything not acked is
+    redelivered after QUEUE_VISIBILITY_TIMEOUT.
+    """
+    durable = True
+
+    def __init__(self, store: SQLiteJobStore, model, scheduler: FairScheduler, maxsize: int = 0):
+        self.store = store
+        self.model = model
+        self.scheduler = scheduler
+        self.maxsize = maxsize
+        self.claimed = {}
+        self.available = asyncio.Event()
+        self.waiting = store.count()
+
+    def qsize(self) -> int:
+        return self.waiting
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= self.waiting
+
+    async def put(self, data):
+        self.put_nowait(data)
+
+    def put_nowait(self, data):
+        if self.full():
+            raise asyncio.QueueFull
+        lane, tag = self.scheduler.enqueued(data)
+        self.store.put(str(data.report_id), data.model_dump_json(), lane, tag)
+        self.waiting += 1
+        self.available.set()
+
+    async def get(self):
+        claimed_by = f"pid-{os.getpid()}"
+        while True:
+            # Scheduler's lane order first; then any lane, for jobs whose visibility timeout expired
+            for lane in self.scheduler.lane_order() + [None]:
+                job = self.store.claim(claimed_by, lane)
+                if job is not None:
+                    break
+            if job is not None:
+                job_id, payload, lane, tag, redelivered = job
+                data = self.model.model_validate_json(payload)
+                if redelivered:
+                    self.scheduler.on_redelivery(data, lane)
+                self.scheduler.on_dispatch(data, lane, tag)
+                self.claimed[id(data)] = job_id
+                self.waiting = max(0, self.waiting - 1)
+                return data
+            self.available.clear()
+            try:
+                await asyncio.wait_for(self.available.wait(), timeout=QUEUE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                # Visibility timeouts may have expired; recount so qsize() picks them up
+                self.waiting = self.store.count(visible_only=True)
+
+    def task_done(self):
+        pass
+
+    def ack(self, data):
+        job_id = self.claimed.pop(id(data), None)
+        if job_id is not None:
+            self.store.ack(job_id)
+
+    def update(self, data):
+        """Persist a resubmission's new payload for a job that hasn't been claimed yet"""
+        self.store.update_payload(str(data.report_id), data.model_dump_json())
+
+    def recover(self) -> list:
+        """Requeue jobs claimed by a previous process; returns every pending request"""
+        requeued = self.store.requeue_unfinished()
+        self.scheduler.reset()
+        pending = []
+        for payload, lane, tag in self.store.pending():
+            data = self.model.model_validate_json(payload)
+            self.scheduler.restored(data, lane, tag)
+            pending.append(data)
+        self.waiting = len(pending)
+        if pending:
+            logger.info(f"📦 Recovered {len(pending)} queued reports from {self.store.path} ({requeued} were in flight)")
+            self.available.set()
+        return pending
+
+    def stats(self) -> dict:
+        return {
+            "backend": "sqlite",
+            "path": self.store.path,
+            "waiting": self.waiting,
+            "stored": self.store.count(),
+            "in_flight": len(self.claimed),
+            "enqueued": self.store.enqueued,
+            "redelivered": self.store.redelivered,
+            "visibility_timeout": self.store.visibility_timeout,
+            "scheduler": self.scheduler.stats()
+        }
+
+    def close(self):
+        self.store.close()
+
+def create_task_queue(model, maxsize: int, scheduler: FairScheduler = None):
+    scheduler = scheduler or FairScheduler()
+    if not QUEUE_DB_PATH:
+        return MemoryTaskQueue(scheduler, maxsize=maxsize)
+    logger.info(f"📦 Durable job queue at {QUEUE_DB_PATH} (visibility timeout {QUEUE_VISIBILITY_TIMEOUT:.0f}s)")
+    return DurableTaskQueue(SQLiteJobStore(QUEUE_DB_PATH), model, scheduler, maxsize=maxsize)
@@ -0,0 +1,168 @@
+import threading
+from collections import defaultdict
+from decouple import config
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# lane:weight -- when several lanes have work, each gets dispatches in proportion to its weight
+LANE_WEIGHTS = config("LANE_WEIGHTS", default="production:4,staging:1")
+# Requests whose environment is missing or unknown
+DEFAULT_LANE = config("DEFAULT_LANE", default="staging").lower()
+# Round-robin between users inside a lane instead of plain FIFO
+USER_FAIR_QUEUING = config("USER_FAIR_QUEUING", cast=bool, default=True)
+# Waiting reports one user_id may hold across all lanes (0 = no cap)
+MAX_QUEUED_PER_USER = config("MAX_QUEUED_PER_USER", cast=int, default=0)
+
+def parse_weights(spec: str) -> dict:
+    weights = {}
+    for part in spec.split(","):
+        if ":" not in part:
+            continue
+        lane, weight = part.split(":", 1)
+        try:
+            weights[lane.strip().lower()] = max(float(weight), 0.01)
+        except ValueError:
+            logger.warning(f"⚠ Ignoring bad LANE_WEIGHTS entry: {part!r}")
+    return weights or {DEFAULT_LANE: 1.0}
+
+class FairScheduler:
+    """
+    Decides which lane (environment) the next job comes from and in which order jobs
+    inside a lane are served. Holds no jobs itself; the queue backends store them.
+
+    Lanes: stride scheduling. Each dispatch advances the lane's pass by 1/weight and
+    the busy lane with the lowest pass goes next, so under contention production gets
+    weight_p / sum(weights) of the dispatches; an idle lane's capacity goes to the rest.
+    A lane that was idle rejoins at the current minimum pass instead of cashing in
+    the turns it skipped.
+
+    Users: every job gets a virtual tag, max(lane clock, user's last tag) + 1, and a
+    lane is served in tag order (start-time fair queuing). A user who queues 100
+    reports gets tags 1..100 while another user's single report gets the next free
+    one, so it is served after one of theirs rather than after all of them.
+    """
+
+    def __init__(self, weights: dict = None, default_lane: str = DEFAULT_LANE,
+                 user_fair: bool = USER_FAIR_QUEUING, max_per_user: int = MAX_QUEUED_PER_USER):
+        self.weights = dict(weights or parse_weights(LANE_WEIGHTS))
+        self.default_lane = default_lane if default_lane in self.weights else next(iter(self.weights))
+        self.user_fair = user_fair
+        self.max_per_user = max_per_user
+        self.passes = {lane: 0.0 for lane in self.weights}
+        self.clock = {lane: 0.0 for lane in self.weights}
+        self.last_tag = {}
+        self.sequence = 0
+        # lane -> lowest tag restored since reset(); the lane clock starts just below it
+        self.restored_floor = {}
+        self.pending = defaultdict(int)
+        self.user_pending = defaultdict(int)
+        self.dispatched = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def lane_for(self, data) -> str:
+        lane = (getattr(data, "environment", None) or self.default_lane).lower()
+        return lane if lane in self.weights else self.default_lane
+
+    def lane_share(self, lane: str) -> float:
+        """Fraction of dispatches `lane` gets while the currently busy lanes stay busy"""
+        with self.lock:
+            active = [l for l in self.weights if self.pending[l] or l == lane]
+            return self.weights[lane] / sum(self.weights[l] for l in active)
+
+    def admits(self, data) -> bool:
+        """Whether the user may queue another report (MAX_QUEUED_PER_USER)"""
+        return not self.max_per_user or self.user_pending.get(str(data.user_id), 0) < self.max_per_user
+
+    def enqueued(self, data) -> tuple:
+        """Register a new job; returns (lane, tag) for the backend to store"""
+        lane = self.lane_for(data)
+        with self.lock:
+            if self.pending[lane] == 0:
+                busy = [self.passes[l] for l in self.weights if self.pending[l]]
+                if busy:
+                    self.passes[lane] = max(self.passes[lane], min(busy))
+            self.pending[lane] += 1
+            self.user_pending[str(data.user_id)] += 1
+            if self.user_fair:
+                key = (lane, str(data.user_id))
+                tag = max(self.clock[lane], self.last_tag.get(key, 0.0)) + 1
+                self.last_tag[key] = tag
+            else:
+                self.sequence += 1
+                tag = float(self.sequence)
+        return lane, tag
+
+    def known(self, lane: str) -> str:
+        """Stored lanes that are no longer configured are served as the default lane"""
+        return lane if lane in self.weights else self.default_lane
+
+    def restored(self, data, lane: str, tag: float):
+        """
+        Register a job recovered from storage with its stored tag. The lane clock moves up
+        to just below the oldest recovered tag, so new users are tagged after the jobs
+        that were already waiting instead of ahead of all of them.
+        """
+        lane = self.known(lane)
+        with self.lock:
+            floor = min(self.restored_floor.get(lane, tag), tag)
+            self.restored_floor[lane] = floor
+            self.clock[lane] = max(0.0, floor - 1)
+            self.pending[lane] += 1
+            self.user_pending[str(data.user_id)] += 1
+            key = (lane, str(data.user_id))
+            self.last_tag[key] = max(self.last_tag.get(key, 0.0), tag)
+            self.sequence = max(self.sequence, int(tag))
+
+    def lane_order(self) -> list:
+        """Lanes with waiting work, next to serve first"""
+        with self.lock:
+            busy = [lane for lane in self.weights if self.pending[lane] > 0]
+            return sorted(busy, key=lambda lane: (self.passes[lane], -self.weights[lane]))
+
+    def on_dispatch(self, data, lane: str, tag: float):
+        lane = self.known(lane)
+        with self.lock:
+            self.passes[lane] += 1.0 / self.weights[lane]
+            self.clock[lane] = max(self.clock[lane], tag)
+            self.pending[lane] = max(0, self.pending[lane] - 1)
+            user = str(data.user_id)
+            # Once the clock has passed the user's last tag, max() with the clock gives the
+            # same next tag without the entry, so drop it instead of keeping every user ever seen
+            key = (lane, user)
+            if self.last_tag.get(key, 0.0) <= self.clock[lane]:
+                self.last_tag.pop(key, None)
+            self.user_pending[user] = max(0, self.user_pending[user] - 1)
+            if not self.user_pending[user]:
+                del self.user_pending[user]
+            self.dispatched[lane] += 1
+
+    def on_redelivery(self, data, lane: str):
+        """A job became visible again (visibility timeout); count it as waiting before it is dispatched again"""
+        with self.lock:
+            self.pending[self.known(lane)] += 1
+            self.user_pending[str(data.user_id)] += 1
+
+    def reset(self):
+        with self.lock:
+            self.pending.clear()
+            self.user_pending.clear()
+            self.restored_floor.clear()
+            self.clock = {lane: 0.0 for lane in self.weights}
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = sum(self.dispatched.values())
+            return {
+                "user_fair_queuing": self.user_fair,
+                "max_queued_per_user": self.max_per_user,
+                "users_waiting": len(self.user_pending),
+                "lanes": {
+                    lane: {
+                        "weight": weight,
+                        "waiting": self.pending[lane],
+                        "dispatched": self.dispatched[lane],
+                        "share": round(self.dispatched[lane] / total, 3) if total else 0.0
+                    } for lane, weight in self.weights.items()
+                }
+            }
@@ -0,0 +1,113 @@
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+import cv2
+import numpy as np
+from decouple import config
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Off by default: the templates file is not shipped, build it first (see research/build_layout_templates.py)
+LAYOUT_ROI_ENABLED = config("LAYOUT_ROI_ENABLED", cast=bool, default=False)
+LAYOUT_TEMPLATES_PATH = config("LAYOUT_TEMPLATES_PATH", default="app/data/layout_templates.json")
+# Allowed screen aspect-ratio difference between an image and a template
+LAYOUT_ASPECT_TOLERANCE = config("LAYOUT_ASPECT_TOLERANCE", cast=float, default=0.08)
+
+# Thumbnail size (width, height) used as the layout fingerprint
+FINGERPRINT_SIZE = (8, 16)
+
+# Labels that sit next to the step counter; the builder keeps them inside the crop
+ANCHOR_KEYWORDS = {
+    'Google Fit': ['heart pts', 'poin kardio', 'steps', 'langkah', 'kcart', 'hcart'],
+    'Apple Health': ['today', 'hari ini', 'steps', 'langkah', 'total', 'distance', 'jarak'],
+    'Huawei Health': ['steps', 'langkah', 'stress', 'wake', 'goal progress', 'kemajuan target', 'add record'],
+    'Samsung Health': ['steps', 'langkah', 'ingkh', 'target', 'active time', 'waktu aktif'],
+    'Fitbit': ['steps', 'langkah', 'today', 'fitbit'],
+    'Garmin Connect': ['of goal', 'steps', 'november']
+}
+
+@dataclass
+class LayoutTemplate:
+    app: str
+    variant: str
+    aspect: float
+    fingerprint: np.ndarray
+    max_distance: float
+    regions: list  # [(x0, y0, x1, y1)] normalized to 0..1
+
+templates = None
+templates_lock = threading.Lock()
+
+def fingerprint(img: np.ndarray) -> np.ndarray:
+    """Tiny color thumbnail, mean-centred and L2-normalized; compared by cosine distance"""
+    thumb = cv2.resize(img, FINGERPRINT_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    thumb -= thumb.mean()
+    norm = np.linalg.norm(thumb)
+    return thumb / norm if norm > 0 else thumb
+
+def aspect_ratio(img: np.ndarray) -> float:
+    return img.shape[0] / img.shape[1]
+
+def load_templates() -> list:
+    global templates
+    if templates is None:
+        with templates_lock:
+            if templates is None:
+                path = Path(LAYOUT_TEMPLATES_PATH)
+                if not path.exists():
+                    logger.info(f"ℹ No layout templates at {path}, ROI OCR disabled (run research/build_layout_templates.py)")
+                    templates = []
+                else:
+                    with open(path, "r", encoding="utf-8") as f:
+                        raw = json.load(f)
+                    templates = [LayoutTemplate(
+                        app=t["app"],
+                        variant=t["variant"],
+                        aspect=t["aspect"],
+                        fingerprint=np.asarray(t["fingerprint"], dtype=np.float32),
+                        max_distance=t["max_distance"],
+                        regions=[tuple(r) for r in t["regions"]]
+                    ) for t in raw["templates"]]
+                    logger.info(f"✓ Loaded {len(templates)} layout templates from {path}")
+    return templates
+
+def match_template(img: np.ndarray):
+    """Cheap first-stage classification: nearest layout fingerprint within its radius, or None"""
+    if not LAYOUT_ROI_ENABLED:
+        return None
+    candidates = load_templates()
+    if not candidates:
+        return None
+
+    aspect = aspect_ratio(img)
+    fp = fingerprint(img)
+    best, best_distance = None, None
+    for template in candidates:
+        if abs(template.aspect - aspect) / template.aspect > LAYOUT_ASPECT_TOLERANCE:
+            continue
+        distance = 1.0 - float(np.dot(fp, template.fingerprint))
+        if distance <= template.max_distance and (best is None or distance < best_distance):
+            best, best_distance = template, distance
+    if best is not None:
+        logger.info(f"🧩 Layout match: {best.app}/{best.variant} (distance {best_distance:.3f})")
+    return best
+
+def crop_regions(img: np.ndarray, template: LayoutTemplate) -> list:
+    """[(crop, x_offset, y_offset)] for every template region, top to bottom"""
+    height, width = img.shape[:2]
+    crops = []
+    for x0, y0, x1, y1 in sorted(template.regions, key=lambda r: r[1]):
+        left, top = int(x0 * width), int(y0 * height)
+        right, bottom = int(np.ceil(x1 * width)), int(np.ceil(y1 * height))
+        if right - left > 1 and bottom - top > 1:
+            crops.append((img[top:bottom, left:right], left, top))
+    return crops
+
+def offset_results(results: list, x_offset: int, y_offset: int) -> list:
+    """Move readtext boxes from crop coordinates back to full-image coordinates"""
+    return [
+        ([[x + x_offset, y + y_offset] for x, y in bbox], text, conf)
+        for bbox, text, conf in results
+    ]
@@ -0,0 +1,51 @@
+import threading
+import time
+from collections import defaultdict
+
+# In-process metrics, exposed as JSON on /metrics
+metrics_lock = threading.Lock()
+counters = defaultdict(float)
+gauges = {}
+timings = {}
+started_at = time.time()
+
+def _key(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+def inc(name: str, value: float = 1, **labels):
+    with metrics_lock:
+        counters[_key(name, labels)] += value
+
+def set_gauge(name: str, value: float, **labels):
+    with metrics_lock:
+        gauges[_key(name, labels)] = value
+
+def observe(name: str, seconds: float, **labels):
+    """Record a duration; keeps count/sum/max/last per series"""
+    key = _key(name, labels)
+    with metrics_lock:
+        t = timings.get(key)
+        if t is None:
+            t = timings[key] = {"count": 0, "sum": 0.0, "max": 0.0, "last": 0.0}
+        t["count"] += 1
+        t["sum"] += seconds
+        t["max"] = max(t["max"], seconds)
+        t["last"] = seconds
+
+def get_gauge(name: str, default=None, **labels):
+    with metrics_lock:
+        return gauges.get(_key(name, labels), default)
+
+def snapshot() -> dict:
+    with metrics_lock:
+        return {
+            "uptime_seconds": round(time.time() - started_at, 1),
+            "counters": dict(counters),
+            "gauges": dict(gauges),
+            "timings": {
+                k: {**v, "avg": round(v["sum"] / v["count"], 4) if v["count"] else 0}
+                for k, v in timings.items()
+            }
+        }
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from decouple import config
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Versioned weights directory shipped in the image (built by research/build_model_bundle.py).
+# Empty = stock EasyOCR behaviour: weights resolved from ~/.EasyOCR, downloaded if missing.
+OCR_MODEL_BUNDLE_DIR = config("OCR_MODEL_BUNDLE_DIR", default="")
+# Hash every weight file against the manifest on load (reads the whole bundle once)
+OCR_MODEL_BUNDLE_VERIFY = config("OCR_MODEL_BUNDLE_VERIFY", cast=bool, default=False)
+
+MANIFEST_NAME = "manifest.json"
+DETECTOR_FILE = "detector.pt"
+RECOGNIZER_FILE = "recognizer.pt"
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_manifest(bundle_dir: Path) -> dict:
+    manifest_path = bundle_dir / MANIFEST_NAME
+    if not manifest_path.is_file():
+        raise FileNotFoundError(f"Model bundle manifest not found: {manifest_path}")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    for name in (DETECTOR_FILE, RECOGNIZER_FILE):
+        path = bundle_dir / name
+        if not path.is_file():
+            raise FileNotFoundError(f"Model bundle file missing: {path}")
+        if OCR_MODEL_BUNDLE_VERIFY and sha256_file(path) != manifest["files"][name]:
+            raise ValueError(f"Model bundle file corrupt (sha256 mismatch): {path}")
+    return manifest
+
+def _load_state_dict(path: Path):
+    import torch
+    # mmap=True keeps the tensors backed by the file's page cache, so every worker
+    # process maps the same physical pages instead of holding a private copy
+    return torch.load(str(path), map_location="cpu", mmap=True, weights_only=True)
+
+def load_bundled_reader(bundle_dir: str, languages: list, gpu: bool):
+    """
+    Build an easyocr.Reader from a bundle without touching ~/.EasyOCR or the network.
+
+    The Reader is created with detector/recognizer disabled (so it only sets up the
+    character set and dictionaries), then both networks are constructed empty and
+    their weights assigned straight from the memory-mapped state dicts. Dynamic
+    quantization is skipped on purpose: it would rewrite the weights into private
+    memory and undo the sharing.
+    """
+    import easyocr
+    import torch
+    from easyocr.craft import CRAFT
+    from easyocr.config import BASE_PATH
+    from easyocr.detection import get_textbox
+
+    path = Path(bundle_dir)
+    manifest = read_manifest(path)
+    if manifest.get("languages") != languages:
+        raise ValueError(f"Model bundle {path} is for {manifest.get('languages')}, not {languages}")
+    if manifest.get("easyocr_version") != easyocr.__version__:
+        logger.warning(f"⚠ Model bundle built with EasyOCR {manifest.get('easyocr_version')}, running {easyocr.__version__}")
+
+    ocr_reader = easyocr.Reader(
+        languages, gpu=gpu, model_storage_directory=str(path),
+        download_enabled=False, detector=False, recognizer=False, verbose=False
+    )
+    device = ocr_reader.device
+
+    detector = CRAFT()
+    detector.load_state_dict(_load_state_dict(path / DETECTOR_FILE), assign=True)
+    detector.eval()
+    if device != "cpu":
+        detector = torch.nn.DataParallel(detector).to(device)
+
+    dict_list = {lang: os.path.join(BASE_PATH, "dict", f"{lang}.txt") for lang in languages}
+    recognizer, converter = _build_recognizer(manifest, ocr_reader.character, dict_list)
+    recognizer.load_state_dict(_load_state_dict(path / RECOGNIZER_FILE), assign=True)
+    recognizer.eval()
+    if device != "cpu":
+        recognizer = torch.nn.DataParallel(recognizer).to(device)
+
+    ocr_reader.detect_network = "craft"
+    ocr_reader.get_textbox = get_textbox
+    ocr_reader.detector = detector
+    ocr_reader.recognizer = recognizer
+    ocr_reader.converter = converter
+    logger.info(f"✓ Model bundle {manifest.get('version')} loaded from {path} (mmap, device {device})")
+    return ocr_reader
+
+def _build_recognizer(manifest: dict, character: str, dict_list: dict):
+    """Same network/converter easyocr.recognition.get_recognizer builds, minus the weight load"""
+    import importlib
+    from easyocr.utils import CTCLabelConverter
+    converter = CTCLabelConverter(character, {}, dict_list)
+    model = importlib.import_module(manifest["recog_module"]).Model(num_class=len(converter.character), **manifest["network_params"])
+    return model, converter
+
+def create_reader(languages: list, gpu: bool):
+    """easyocr.Reader from the configured bundle, or the stock loader when no bundle is set"""
+    if OCR_MODEL_BUNDLE_DIR:
+        return load_bundled_reader(OCR_MODEL_BUNDLE_DIR, languages, gpu)
+    import easyocr
+    return easyocr.Reader(languages, gpu=gpu)
+
+def describe_bundle() -> dict:
+    if not OCR_MODEL_BUNDLE_DIR:
+        return {"enabled": False}
+    try:
+        with open(Path(OCR_MODEL_BUNDLE_DIR) / MANIFEST_NAME) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"enabled": True, "path": OCR_MODEL_BUNDLE_DIR, "version": None}
+    return {"enabled": True, "path": OCR_MODEL_BUNDLE_DIR, "version": manifest.get("version")}
@@ -0,0 +1,176 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from decouple import config
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# thread:  process_ocr runs in a thread of this process (one shared reader)
+# process: K worker processes, each with its own reader and CPU slice
+OCR_EXECUTOR = config("OCR_EXECUTOR", default="thread").lower()
+OCR_PROCESS_COUNT = config("OCR_PROCESS_COUNT", cast=int, default=max(1, (os.cpu_count() or 1) // 4))
+# Torch intra-op threads per process; 0 = split the available cores evenly
+OCR_THREADS_PER_PROCESS = config("OCR_THREADS_PER_PROCESS", cast=int, default=0)
+OCR_PIN_CPUS = config("OCR_PIN_CPUS", cast=bool, default=True)
+# Seconds warm_up() waits for every process to load its reader
+OCR_POOL_READY_TIMEOUT = config("OCR_POOL_READY_TIMEOUT", cast=float, default=600.0)
+
+def _available_cpus() -> list:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+# --- runs inside the worker processes ---
+
+def _init_worker(slots, cpus: list, threads: int, pin: bool):
+    slot = slots.get()
+    if pin and hasattr(os, "sched_setaffinity"):
+        start = (slot * threads) % len(cpus)
+        mine = [cpus[(start + i) % len(cpus)] for i in range(threads)]
+        os.sched_setaffinity(0, mine)
+    else:
+        mine = None
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from app.core.ocr_processor import get_reader
+    from app.core.warmup import WARMUP_ENABLED, warm_up_reader
+    ocr_reader = get_reader()
+    if WARMUP_ENABLED:
+        warm_up_reader(ocr_reader)
+    logger.info(f"✓ OCR process {slot} ready (pid {os.getpid()}, threads {threads}, cpus {mine or 'all'})")
+
+def _attach(name: str) -> SharedMemory:
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: the parent owns the block, keep the tracker from unlinking it here
+        shm = SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+def _wait_ready(barrier) -> int:
+    # Only runs after _init_worker, so this process's reader is loaded (and warmed up).
+    # Holding the process at the barrier until all K have arrived makes the K calls land
+    # on K different processes.
+    barrier.wait()
+    return os.getpid()
+
+def _run_in_worker(shm_name: str, shape: tuple, dtype: str, image_url: str) -> dict:
+    from app.core.ocr_processor import process_ocr
+    shm = _attach(shm_name)
+    try:
+        img = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        result = process_ocr(image_url, img=img, use_cache=False)
+        result["worker_pid"] = os.getpid()
+        del img
+        return result
+    finally:
+        shm.close()
+
+# --- parent side ---
+
+class OCRProcessPool:
+    """K OCR processes; images are handed over through shared memory instead of pickling"""
+
+    def __init__(self, processes: int, threads_per_process: int = 0, pin_cpus: bool = True):
+        self.processes = max(1, processes)
+        self.cpus = _available_cpus()
+        self.threads = threads_per_process or max(1, len(self.cpus) // self.processes)
+        self.pin_cpus = pin_cpus
+        self.executor = None
+        self.lock = threading.Lock()
+        self.completed = 0
+        self.restarts = 0
+
+    def start(self):
+        with self.lock:
+            if self.executor is None:
+                ctx = multiprocessing.get_context("spawn")
+                slots = ctx.Queue()
+                for slot in range(self.processes):
+                    slots.put(slot)
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=ctx,
+                    initializer=_init_worker,
+                    initargs=(slots, self.cpus, self.threads, self.pin_cpus)
+                )
+                logger.info(f"🚀 Starting {self.processes} OCR processes ({self.threads} threads each)")
+        return self.executor
+
+    def warm_up(self):
+        """Block until every process has loaded (and warmed up) its reader"""
+        executor = self.start()
+        with multiprocessing.get_context("spawn").Manager() as manager:
+            barrier = manager.Barrier(self.processes, timeout=OCR_POOL_READY_TIMEOUT)
+            futures = [executor.submit(_wait_ready, barrier) for _ in range(self.processes)]
+            pids = {f.result() for f in futures}
+        if len(pids) != self.processes:
+            raise RuntimeError(f"OCR process pool: only {len(pids)} of {self.processes} processes ready")
+        logger.info(f"✓ OCR process pool ready: {len(pids)} processes")
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+                logger.info("✓ OCR process pool stopped")
+
+    async def run(self, image_url: str, img: np.ndarray) -> dict:
+        from app.core.ocr_processor import lookup_cached_result, store_result
+        start_time = time.time()
+        # The result cache lives in this process so all OCR processes share it
+        cache_key, cached = await asyncio.to_thread(lookup_cached_result, img, start_time)
+        if cached is not None:
+            return cached
+
+        img = np.ascontiguousarray(img)
+        shm = SharedMemory(create=True, size=max(img.nbytes, 1))
+        try:
+            np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[:] = img
+            try:
+                future = self.start().submit(_run_in_worker, shm.name, img.shape, img.dtype.str, image_url)
+                result = await asyncio.wrap_future(future)
+            except BrokenProcessPool:
+                # A process died (OOM kill, segfault); rebuild the pool for the next job
+                logger.error("❌ OCR process pool broken, restarting")
+                self.shutdown()
+                self.restarts += 1
+                raise
+        finally:
+            shm.close()
+            shm.unlink()
+
+        self.completed += 1
+        result["processing_time_ms"] = int((time.time() - start_time) * 1000)
+        store_result(cache_key, result)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "executor": "process",
+            "processes": self.processes,
+            "threads_per_process": self.threads,
+            "cpu_pinning": self.pin_cpus and hasattr(os, "sched_setaffinity"),
+            "completed": self.completed,
+            "restarts": self.restarts
+        }
+
+ocr_pool = OCRProcessPool(OCR_PROCESS_COUNT, OCR_THREADS_PER_PROCESS, OCR_PIN_CPUS) if OCR_EXECUTOR == "process" else None
+
+def get_executor_stats() -> dict:
+    if ocr_pool is None:
+        return {"executor": "thread"}
+    return ocr_pool.stats()
@@ -1,656 +1,315 @@
-import cv2
 import re
-import easyocr
 import numpy as np
 import httpx
 import time
-import threading
+from dataclasses import dataclass
+from typing import NamedTuple
 from app.core.logger import setup_logger
+from app.core import metrics
+from app.core.preprocess import OCR_STAGES, prepare_stage
+from app.core.secondary_fields import extract_secondary_fields
+from app.core.engine_registry import engine_registry
+from app.core.layout_templates import match_template, crop_regions, offset_results
+from app.core.anchored_ocr import OCR_RECOGNITION_MODE, readtext_anchored
+from app.core.downloader import decode_image, load_file_image
+from app.core.result_cache import result_cache
+from app.core.step_patterns import normalize_number, extract_steps, is_plausible
+from app.core.app_classifier import classify
+from app.core.box_index import BoxIndex
+from app.core.step_refine import refine_step_box
 
 logger = setup_logger(__name__)
-reader = None
-reader_lock = threading.Lock()
 
 def get_reader():
-    global reader
-    if reader is None:
-        with reader_lock:
-            if reader is None:
-                try:
-                    import torch
-                    gpu_available = torch.cuda.is_available()
-                    logger.info(f"📦 Loading EasyOCR (GPU: {gpu_available})...")
-                    reader = easyocr.Reader(['en'], gpu=gpu_available)
-                    logger.info(f"✓ EasyOCR loaded with {'GPU' if gpu_available else 'CPU'}")
-                except ImportError:
-                    logger.warning("⚠ PyTorch not found, using CPU")
-                    reader = easyocr.Reader(['en'], gpu=False)
-    return reader
+    """Shared EasyOCR model from the engine registry (one per process, whichever pipeline asks first)"""
+    return engine_registry.acquire("url_pipeline")
+
+def release_reader():
+    """Drop this pipeline's hold on the shared model; it is unloaded once no pipeline holds it"""
+    engine_registry.release("url_pipeline")
 
 def download_image(url: str) -> np.ndarray:
+    """Blocking download for scripts and the dev endpoint; queue workers use downloader.fetch_image"""
     if url.startswith('file://'):
-        file_path = url[7:]
-        img = cv2.imread(file_path, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError(f"Failed to load image from {file_path}")
-        return img
+        return load_file_image(url[7:])
     else:
         response = httpx.get(url, timeout=30.0)
         response.raise_for_status()
-        img_array = np.frombuffer(response.content, np.uint8)
-        img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError(f"Failed to decode image from {url}")
-        return img
-
-def normalize_number(num_str: str) -> int:
-    """Convert string number to int"""
-    return int(num_str.replace('.', '').replace(',', '').replace(' ', ''))
+        return decode_image(response.content, url)
 
 def classify_app(text: str) -> str:
-    """Rule-based app classification"""
-    text_lower = text.lower()
-    
-    # Fitbit - paling spesifik
-    if 'fitbit' in text_lower:
-        return 'Fitbit'
-    
-    # Samsung Health - cek dulu sebelum Apple Health
-    if 'samsung health' in text_lower or 'daily activity' in text_lower or 'aktivitas harian' in text_lower:
-        return 'Samsung Health'
-    
-    # Google Fit - keyword unik (cek "Kcart Pis" untuk OCR error)
-    if 'heart pts' in text_lower or 'kcart pis' in text_lower or 'hcart pts' in text_lower or 'move min' in text_lower or 'poin kardio' in text_lower or 'menit bergerak' in text_lower:
-        return 'Google Fit'
-    
-    # Huawei Health - keyword unik
-    if 'huawei' in text_lower or 'health+' in text_lower:
-        return 'Huawei Health'
-    
-    # Huawei Health step page - "Kemajuan target" atau "Goal progress"
-    if 'kemajuan target' in text_lower or 'goal progress' in text_lower:
-        return 'Huawei Health'
-    
-    # Cek "today's steps X/Y" untuk Huawei (sebelum Apple Health)
-    if "today's steps" in text_lower or 'todays steps' in text_lower:
-        if '/' in text_lower:
-            return 'Huawei Health'
-    
-    # Cek "Stress" + "Wake" pattern (Huawei specific)
-    if 'stress' in text_lower and 'wake' in text_lower:
-        return 'Huawei Health'
-    
-    # Cek "Ingkh" keyword (Samsung specific)
-    if 'ingkh' in text_lower:
-        return 'Samsung Health'
-    
-    # Garmin Connect - keyword unik (tapi jangan salah deteksi jika ada "fitness+")
-    if 'garmin' in text_lower and 'fitness+' not in text_lower:
-        return 'Garmin Connect'
-    
-    if '% of goal' in text_lower and 'daily timeline' in text_lower:
-        return 'Garmin Connect'
-    
-    # Huawei Health detail page - "Rekaman data aktivitas" + "Bergerak/Move" pattern
-    if 'rekaman data aktivitas' in text_lower or 'activity records' in text_lower:
-        if 'bergerak' in text_lower or ('move' in text_lower and 'kcal' in text_lower):
-            return 'Huawei Health'
-    
-    # Apple Health - default
-    return 'Apple Health'
+    """Rule-based app classification (label only; see app_classifier.classify for scores)"""
+    return classify(text).label
 
 def extract_steps_from_layout(results: list, app: str) -> int:
-    """Extract steps using layout/position matching"""
+    """Extract steps using layout/position matching on the OCR boxes"""
+    if not results:
+        return None
+    boxes = BoxIndex(results)
+    
     if app == 'Google Fit':
-        # Find "Heart Pts" keyword position (handle GHeart, CHeart, etc)
-        heart_idx = -1
-        for i, (bbox, text, conf) in enumerate(results):
-            text_lower = text.lower()
-            if 'heart' in text_lower and ('pts' in text_lower or 'poin' in text_lower):
-                heart_idx = i
-                break
-        
-        if heart_idx > 0:
-            # First, look for numbers WITH separators (more reliable for large numbers)
-            candidates_with_sep = []
-            for j in range(max(0, heart_idx-5), heart_idx):
-                text = results[j][1]
-                if ',' in text or ('.' in text and text.count('.') == 1 and len(text) > 3):
-                    num_text = text.replace(',', '').replace('.', '').replace(' ', '')
-                    if num_text.isdigit() and 3 <= len(num_text) <= 5:
-                        num_val = int(num_text)
-                        if num_val >= 100:
-                            candidates_with_sep.append((j, num_val))
-            
-            # If found numbers with separators, return the closest one to Heart Pts
-            if candidates_with_sep:
-                # Sort by distance to heart_idx (closest first)
-                candidates_with_sep.sort(key=lambda x: heart_idx - x[0])
-                return candidates_with_sep[0][1]
+        # Find "Heart Pts" label (handle GHeart, CHeart, etc); the step count sits above it
+        anchors = boxes.find(lambda t: 'heart' in t and ('pts' in t or 'poin' in t))
+        if anchors:
+            anchor = anchors[0]
+            # First, numbers WITH separators (more reliable for large numbers), nearest first
+            candidates = boxes.above_or_left(anchor, max_lines=8, separated=True)
+            if candidates:
+                return int(boxes.values[candidates[0]])
             
-            # Fallback: look for number immediately before "Heart Pts" (within 2 items)
-            for j in range(max(0, heart_idx-2), heart_idx):
-                text = results[j][1]
-                num_text = text.replace(',', '').replace('.', '').replace(' ', '')
-                if num_text.isdigit() and 3 <= len(num_text) <= 5:
-                    num_val = int(num_text)
-                    if num_val >= 100:
-                        return num_val
+            # Fallback: plain number right above / before the label
+            candidates = boxes.above_or_left(anchor, max_lines=5)
+            if candidates:
+                return int(boxes.values[candidates[0]])
     
     elif app == 'Huawei Health':
         # Check if "steps XXX /X.XXX steps" in single item
-        for i, (bbox, text, conf) in enumerate(results):
+        for text in boxes.texts:
             if 'steps' in text.lower() and '/' in text:
-                # Extract number before /
-                import re
                 m = re.search(r'steps\s+(\d{3,5})\s*/', text, re.I)
                 if m:
                     num_val = int(m.group(1))
                     if num_val >= 100:
                         return num_val
         
-        # Find "Stress" then "Wake", number is between them
-        stress_idx = wake_idx = -1
-        for i, (bbox, text, conf) in enumerate(results):
-            if 'stress' in text.lower():
-                stress_idx = i
-            if 'wake' in text.lower():
-                wake_idx = i
-                if stress_idx >= 0:
-                    break
-        
-        if stress_idx >= 0 and wake_idx > stress_idx:
-            for j in range(stress_idx+1, wake_idx):
-                num_text = results[j][1].replace(',', '').replace('.', '').replace(' ', '')
-                if num_text.isdigit() and 3 <= len(num_text) <= 5:
-                    num_val = int(num_text)
-                    if num_val >= 100:
-                        return num_val
+        # Number between the "Stress" and "Wake" labels
+        stress = boxes.find(lambda t: 'stress' in t)
+        wake = boxes.find(lambda t: 'wake' in t)
+        if stress and wake:
+            candidates = boxes.between(stress[0], wake[0])
+            if candidates:
+                return int(boxes.values[candidates[0]])
     
     elif app == 'Apple Health':
-        # Find "Today" keyword appearing twice
-        today_indices = []
-        for i, (bbox, text, conf) in enumerate(results):
-            if 'today' in text.lower():
-                today_indices.append(i)
-        
-        if len(today_indices) >= 2:
-            # Look for number after second "Today"
-            start_idx = today_indices[1]
-            for j in range(start_idx+1, min(len(results), start_idx+4)):
-                text = results[j][1]
-                # Check for number with separator
-                if ',' in text or '.' in text:
-                    num_text = text.replace(',', '').replace('.', '').replace(' ', '')
-                    if num_text.isdigit() and 3 <= len(num_text) <= 5:
-                        num_val = int(num_text)
-                        if num_val >= 100:
-                            return num_val
+        # "Today" appears twice (Step Count / Step Distance columns); steps sit under one of them
+        today = boxes.find(lambda t: 'today' in t)
+        if len(today) >= 2:
+            for anchor in today:
+                candidates = boxes.below(anchor, max_lines=4, separated=True)
+                if candidates:
+                    return int(boxes.values[candidates[0]])
     
     elif app == 'Samsung Health':
-        # Check if "X.XXX Ingkh" in single item
-        for i, (bbox, text, conf) in enumerate(results):
-            if 'ingkh' in text.lower():
-                # Extract number before Ingkh
-                import re
-                m = re.search(r'(\d[\., ]\d{3})\s*ingkh', text, re.I)
-                if m:
-                    num_text = m.group(1).replace(',', '').replace('.', '').replace(' ', '')
-                    num_val = int(num_text)
-                    if num_val >= 100:
-                        return num_val
-    
-    elif app == 'Garmin Connect':
-        # Find "% of Goal" keyword
-        goal_idx = -1
-        for i, (bbox, text, conf) in enumerate(results):
-            if '% of goal' in text.lower() or 'of goal' in text.lower():
-                goal_idx = i
-                break
-        
-        if goal_idx > 0:
-            # Look for TWO numbers before "% of Goal"
-            # First number = steps, Second number = goal
-            candidates = []
-            for j in range(max(0, goal_idx-5), goal_idx):
-                text = results[j][1]
-                # Check for number with separator (comma or dot)
-                if ',' in text or ('.' in text and text.count('.') == 1 and len(text) > 3):
-                    num_text = text.replace(',', '').replace('.', '').replace(' ', '')
-                    if num_text.isdigit() and 4 <= len(num_text) <= 5:
-                        num_val = int(num_text)
-                        if num_val >= 100:
-                            candidates.append((j, num_val))
-            
-            # Return the FIRST number (furthest from "% of Goal") = steps
-            if len(candidates) >= 2:
-                candidates.sort(key=lambda x: x[0])  # Sort by index ascending
-                return candidates[0][1]  # Return first (steps)
-            elif len(candidates) == 1:
-                return candidates[0][1]
-    
-    return None
-
-def extract_steps(text: str, app: str) -> int:
-    """Extract step number using app-specific patterns"""
-    
-    if app == 'Apple Health':
-        # Pattern: "Summary Steps Add Data W M 6M TOTAL 15.226" (summary page tanpa kata steps)
-        m = re.search(r'Summary Steps\s+Add Data.*?TOTAL\s+(\d{1,2}[\., ]\d{3})', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Steps Distance 17.02 12,83KM" (OCR error: 17.102 -> 17.02)
-        m = re.search(r'Steps\s+Distance\s+(\d{2}[\.,]\d{2})\s+\d{1,2}[\.,]\d+KM', text, re.I)
-        if m:
-            num_str = m.group(1).replace(',', '.').replace(' ', '')
-            # Convert 17.02 to 17020 (assume it's actually 17,020 or similar)
-            parts = num_str.split('.')
-            if len(parts) == 2 and len(parts[1]) == 2:
-                steps = int(parts[0]) * 1000 + int(parts[1]) * 10
-                if steps >= 100: return steps
-        
-        # Pattern: "Today Today 10.818 7,42KM" (untuk Apple Health dengan Step Count)
-        m = re.search(r'Step Count\s+Step Distance\s+Today\s+Today\s+(\d{1,2}[\., ]\d{3})\s+\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Hari Ini Hari Ini 15.076 13,04KM" (Indonesian)
-        m = re.search(r'Langkah\s+Jarak\s+(?:Langk__\s+)?Hari Ini\s+Hari Ini\s+(\d{1,2}[\., ]\d{3})\s+\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Steps Distance 17.102 12,83KM" (tanpa "Today")
-        m = re.search(r'Steps\s+Distance\s+(\d{1,2}[\., ]\d{3})\s+\d{1,2}[\.,]\d+', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "TOTAL 15.226 steps" (summary page)
-        m = re.search(r'TOTAL\s+(\d{1,2}[\., ]\d{3})\s+steps', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Hari Ini Hari Ini 1.045 0,67KM"
-        m = re.search(r'Hari Ini\s+Hari Ini\s+(\d{1,2}[\., ]\d{3})', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Langkah Jarak 2.802 1,83KM"
-        m = re.search(r'Langkah\s+Jarak\s+(\d{1,2}[\., ]\d{3})', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Steps Distance 17.102 12,83KM"
-        m = re.search(r'Steps\s+Distance\s+(\d{1,2}[\., ]\d{3})', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Langkah 16.56 1.836langkah" atau "Steps 13.30 1.990 steps"
-        m = re.search(r'(?:Langkah|Steps)\s+\d{2}\.\d{2}\s+(\d{1,2}[\., ]\d{3})', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "640 0,47kM" di awal (untuk gambar dengan format berbeda)
-        m = re.search(r'\b(\d{3})\s+0[\.,]\d+\s*k[Mm]', text)
-        if m:
-            steps = int(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "646 langkah" atau "736 0,46km"
-        m = re.search(r'\b(\d{3})\s+(?:langkah|0[\.,]\d+\s*km)', text, re.I)
-        if m:
-            steps = int(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Today Today 10.818 7,42km" (untuk appple_12333.jpeg)
-        m = re.search(r'Today\s+Today\s+(\d{1,2}[\., ]\d{3})\s+\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Today 14.578 9,99kM" (untuk 2025-11-21_232346_apple.png)
-        m = re.search(r'Today\s+(\d{1,2}[\., ]\d{3})\s+\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Steps Distance 17.102 12,83KM" (untuk 2025-11-24_192531_apple.jpg)
-        m = re.search(r'Steps\s+Distance\s+(\d{2}[\., ]\d{3})\s+\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "TOTAL 15.226 steps" (untuk 2025-11-24_220330_apple.png)
-        m = re.search(r'TOTAL\s+(\d{2}[\., ]\d{3})\s+steps', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Today Today 1.211 0,94kM" (untuk PHOTO-2025-11-10-14-38-52.jpg)
-        m = re.search(r'Today\s+Today\s+(\d[\., ]\d{3})\s+0[\.,]\d+', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Steps Distance 17.102 12,83KM" (5 digit)
-        m = re.search(r'Steps\s+Distance\s+(\d{2}[\., ]\d{3})\s+\d{2}[\.,]\d+', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-    elif app == 'Google Fit':
-        # Pattern: "2,566 Kcart Pis" (OCR error untuk "Heart Pts")
-        m = re.search(r'(\d{1,2}[\., ]\d{3})\s*(?:Kcart|Hcart)\s+Pis', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "589 Heart Pts" (3 digit tanpa separator) - cek dulu sebelum yang lain
-        m = re.search(r'^.*?(\d{3})\s+Heart\s+Pts', text, re.I)
-        if m:
-            steps = int(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "16,331 Heart Pts" atau "7,555 Heart Pts" (5 digit)
-        m = re.search(r'(\d{2}[\., ,]\d{3})\s+Heart\s+Pts', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "2,566 Heart Pts" atau "2,566 Poin Kardio" (4 digit)
-        m = re.search(r'(\d{1,2}[\., ]\d{3})\s*(?:Heart|Hcart|Poin Kardio)', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Steps 1,571" atau "Stops 1.,602"
-        m = re.search(r'(?:Steps|Stops|Langkah)\s+(\d{1,2}[\.,]\d{3})', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-    elif app == 'Huawei Health':
-        # Pattern: "Kemajuan target Edit 3.011/10.000 langkah" (Step page Indonesian)
-        m = re.search(r'Kemajuan target\s+Edit\s+(\d{1,2}[\., ]\d{3})\s*/\s*\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Goal progress Edit 16.452/10.000 steps" (Step page English)
-        m = re.search(r'Goal progress\s+Edit\s+(\d{1,2}[\., ]\d{3})\s*/\s*\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "6.170 langkah" (standalone di step page)
-        m = re.search(r'(\d{1,2}[\., ]\d{3})\s*langkah\s+\d{1,4}\s+\d{2,4}\s+\d{2,4}\s+\d{2,4}', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Today's steps 8,376/4,000 steps" - ambil angka SEBELUM / (prioritas tertinggi)
-        m = re.search(r'Today\'?s steps\s+(\d{1,2}[\., ]\d{3})\s*/\s*\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Todays steps 3,540/10,000 steps" (tanpa apostrof)
-        m = re.search(r'Todays steps\s+(\d{1,2}[\., ]\d{3})\s*/\s*\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Today's steps 395 /10.000 steps" (tanpa separator ribuan)
-        m = re.search(r'Today\'?s steps\s+(\d{3,5})\s+/', text, re.I)
-        if m:
-            steps = int(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Todays steps 3,540/10,000" (tanpa kata steps di akhir)
-        m = re.search(r'Todays steps\s+(\d{1,2}[\., ]\d{3})\s*/', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Langkah Jarak Naik tangga 5.684 langkah" (Huawei detail page)
-        m = re.search(r'Langkah\s+Jarak\s+(?:Naik tangga\s+)?(\d{1,2}[\., ]\d{3})\s*langkah', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Distance Stair climbing 2.637 steps" (Huawei detail page English)
-        m = re.search(r'Distance\s+(?:Stair climbing\s+)?(\d{1,2}[\., ]\d{3})\s*steps', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "9,708 steps" atau "12,477 steps" (standalone dengan separator)
-        m = re.search(r'(\d{1,2}[\., ]\d{3})\s*steps', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Langkah hari ini 5.117/10.000 langkah"
-        m = re.search(r'Langkah hari ini\s+(\d{1,2}[\., ]\d{3})\s*/\s*\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Langkah hari ini 824/7.000 langkah" (tanpa separator ribuan)
-        m = re.search(r'Langkah hari ini\s+(\d{3,5})\s*/\s*\d', text, re.I)
-        if m:
-            steps = int(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Todays steps 5,498/10,000 steps"
-        m = re.search(r'Todays steps\s+(\d{1,2}[\., ]\d{3})\s*/\s*\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Steps Mood 05.06 Stress 50 735 Wake" - ambil angka sebelum Wake
-        m = re.search(r'Stress\s+\d+\s+(\d{3,5})\s+Wake', text, re.I)
-        if m:
-            steps = int(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Today's steps" tanpa angka setelahnya, cari di tempat lain
-        if "today's steps" in text.lower() or 'todays steps' in text.lower():
-            # Cari angka 3-5 digit yang mungkin steps
-            m = re.search(r'\b(\d{3,5})\s+Wake', text, re.I)
+        for anchor in boxes.find(lambda t: 'ingkh' in t):
+            # "X.XXX Ingkh" in a single item
+            m = re.search(r'(\d[\., ]\d{3})\s*ingkh', boxes.texts[anchor], re.I)
             if m:
-                steps = int(m.group(1))
-                if steps >= 100: return steps
-        
-        # Pattern: "Add record 8,376 steps Normal" (untuk huawei_.jpeg)
-        m = re.search(r'Add record\s+(\d{1,2}[\., ]\d{3})', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-    elif app == 'Samsung Health':
-        # Pattern: "Samsung Health 77 langkah" (very low steps)
-        m = re.search(r'Samsung Health\s+(\d{2,3})\s*langkah', text, re.I)
-        if m:
-            steps = int(m.group(1))
-            if steps >= 50: return steps
-        
-        # Pattern: "1.035 langkah 10 menit 41kkal 1.083" - ambil yang pertama
-        m = re.search(r'Samsung Health\s+[A-Z]\s+(\d{1,2}[\., ]\d{3})\s*langkah', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 50: return steps
-        
-        # Pattern: "Steps Active time Activity calories 7.492 63 299"
-        m = re.search(r'(?:Langkah|Steps)\s+(?:Waktu aktif|Active time)\s+(?:Kalori aktivitas|Activity calories)\s+(\d{1,2}[\., ]\d{3})\s+\d+\s+\d+', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 50: return steps
-        
-        # Pattern: "Samsung Health 77 langkah"
-        m = re.search(r'Samsung Health\s+(\d{1,5})\s*langkah', text, re.I)
-        if m:
-            steps = int(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Edit home 2,680 steps"
-        m = re.search(r'Edit home\s+(\d{1,2}[\., ]\d{3})\s*steps', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Steps Active time Activity calories 725 8 28"
-        m = re.search(r'(?:Langkah|Steps)\s+(?:Waktu aktif|Active time)\s+(?:Kalori aktivitas|Activity calories)\s+(\d{3,5})\s+\d+\s+\d+', text, re.I)
-        if m:
-            steps = int(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "1,862 37% /5,000 steps"
-        m = re.search(r'(\d{1,2}[\., ]\d{3})\s+\d+%\s*/\s*\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "7.492 Ingkh Target: 10.000" (untuk 499507250_24620207707567726_7253775697531596173_n.jpg)
-        m = re.search(r'(\d{1,2}[\., ]\d{3})\s+(?:Ingkh|langkah)\s+Target', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "Active time Activity calories 13,130 98 941" (untuk 2025-11-24_174611_samsung.jpg)
-        m = re.search(r'Active time\s+Activity calories\s+(\d{1,2}[\., ]\d{3})\s+\d+\s+\d+', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "7.492 Ingkh" atau "Langkah < ... 7.492 Ingkh"
-        m = re.search(r'(\d[\., ]\d{3})\s+Ingkh', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-    
-    elif app == 'Fitbit':
-        m = re.search(r'(\d{1,2}[\., ]\d{3})\s*Langkah', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        m = re.search(r'fitbit.*?(\d{1,2}[\., ]\d{3})', text, re.I | re.DOTALL)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        m = re.search(r'Today\s+(\d{1,2}[\., ]\d{3})\s*Steps', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
+                num_val = normalize_number(m.group(1))
+                if num_val >= 100:
+                    return num_val
+            # Or the number is its own box left of the label
+            candidates = boxes.left_of(anchor, min_digits=4, separated=True)
+            if candidates:
+                return int(boxes.values[candidates[0]])
     
     elif app == 'Garmin Connect':
-        # Pattern: "9,920 5,000 198% of Goal" or "10.514 6.180 170% of Goal"
-        m = re.search(r'(\d{1,2}[\., ]\d{3})\s+\d[\., ]\d{3}\s+\d+%\s+of\s+Goal', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-        
-        # Pattern: "November 9,920 5,000"
-        m = re.search(r'November\s+(\d{1,2}[\., ]\d{3})\s+\d', text, re.I)
-        if m:
-            steps = normalize_number(m.group(1))
-            if steps >= 100: return steps
-    
-    # Fallback patterns
-    m = re.search(r'(\d{1,2}[\., ]\d{3})\s*(?:steps|langkah)', text, re.I)
-    if m:
-        steps = normalize_number(m.group(1))
-        if steps >= 100: return steps
-    
-    m = re.search(r'\b(\d{2,5})\s*(?:steps|langkah)', text, re.I)
-    if m:
-        steps = int(m.group(1))
-        if steps >= 100: return steps
+        # Steps and goal are printed before "% of Goal"; steps is the first of the two
+        anchors = boxes.find(lambda t: 'of goal' in t)
+        if anchors:
+            candidates = boxes.above_or_left(anchors[0], max_lines=6, min_digits=4, separated=True)
+            if candidates:
+                return int(boxes.values[boxes.reading_order(candidates[:2])[0]])
     
     return None
 
-def process_ocr(image_url: str, show_progress: bool = False) -> dict:
-    start_time = time.time()
-    if show_progress:
-        print(f"🔍 Processing: {image_url.split('/')[-1]}...", end='', flush=True)
-    logger.info(f"🔍 Processing OCR for: {image_url}")
-    
-    # Download & preprocess
-    img = download_image(image_url)
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    img_rgb = cv2.resize(img_rgb, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
-    
-    # OCR
-    ocr_reader = get_reader()
-    results = ocr_reader.readtext(img_rgb)
-    raw_text = ' '.join([res[1] for res in results])
-    
-    # Classify app
-    app_class = classify_app(raw_text)
-    
+def find_steps(results: list, raw_text: str, app_class: str) -> int:
     # Extract steps using layout matching first
     steps = extract_steps_from_layout(results, app_class)
     
     # Fallback to regex if layout matching fails
     if steps is None:
         steps = extract_steps(raw_text, app_class)
+    return steps
+
+def read_image(ocr_reader, img_rgb: np.ndarray, app_class: str = None) -> list:
+    """readtext() honouring OCR_RECOGNITION_MODE; app_class is known for template crops"""
+    if OCR_RECOGNITION_MODE != 'anchored':
+        return ocr_reader.readtext(img_rgb)
+    
+    def has_steps(results):
+        raw_text = ' '.join([res[1] for res in results])
+        return find_steps(results, raw_text, app_class or classify_app(raw_text)) is not None
+    return readtext_anchored(ocr_reader, img_rgb, has_steps)
+
+def lookup_cached_result(img: np.ndarray, start_time: float):
+    """(cache_key, result) for img; result is None on a miss, both are None when caching is off"""
+    if result_cache is None:
+        return None, None
+    cache_key = result_cache.key_for(img)
+    cached = result_cache.get(cache_key)
+    if cached is None:
+        return cache_key, None
+    processing_time_ms = int((time.time() - start_time) * 1000)
+    logger.info(f"⚡ OCR cache hit: {cached['app_class']}, time: {processing_time_ms}ms")
+    return cache_key, {
+        "raw_ocr": cached["raw_ocr"],
+        "extracted_data": dict(cached["extracted_data"]),
+        "app_class": cached["app_class"],
+        "app_confidence": cached.get("app_confidence"),
+        "processing_time_ms": processing_time_ms,
+        "cache_hit": True
+    }
+
+def store_result(cache_key: str, result: dict):
+    if cache_key is not None and result_cache is not None:
+        result_cache.put(cache_key, result)
+
+class OcrPass(NamedTuple):
+    results: list
+    raw_text: str
+    app_class: str
+    app_confidence: float
+    steps: int
+    scope: str
+
+def run_ocr_pass(ocr_reader, img_stage: np.ndarray, template) -> OcrPass:
+    """One OCR pass over a preprocessed image: template ROIs when the layout is known, else the full frame"""
+    if template is not None:
+        results = []
+        for crop, x_offset, y_offset in crop_regions(img_stage, template):
+            results.extend(offset_results(read_image(ocr_reader, crop, template.app), x_offset, y_offset))
+        raw_text = ' '.join([res[1] for res in results])
+        steps = find_steps(results, raw_text, template.app)
+        if steps is not None:
+            # only scored for full-frame text; ROI crops carry the template's app
+            return OcrPass(results, raw_text, template.app, None, steps, 'roi')
+        logger.info(f"⚠ ROI OCR found no steps for {template.app}/{template.variant}, falling back to full frame")
+    
+    results = read_image(ocr_reader, img_stage)
+    raw_text = ' '.join([res[1] for res in results])
+    classification = classify(raw_text)
+    # Label's extractors first; apps holding a real share of the score are tried next, the rest skipped
+    for app in classification.candidates():
+        steps = find_steps(results, raw_text, app)
+        if steps is not None:
+            break
+    return OcrPass(results, raw_text, classification.label, classification.confidence, steps, 'full')
+
+@dataclass
+class OcrJob:
+    """One image moving through prepare_job -> infer_job -> extract_job"""
+    image_url: str
+    img: np.ndarray
+    start_time: float
+    cache_key: str = None
+    result: dict = None  # set on a cache hit, or by extract_job
+    template: object = None
+    first_stage: tuple = None  # (image, scale) for OCR_STAGES[0], prepared ahead of inference
+    ocr_pass: OcrPass = None
+    ocr_stage: str = None
+    stages_run: int = 0
+    scale: float = 1.0
+    refined: bool = False
+
+def prepare_job(image_url: str, img: np.ndarray, use_cache: bool = True, start_time: float = None) -> OcrJob:
+    """Cache lookup, template match and the first stage's preprocessing (no inference)"""
+    job = OcrJob(image_url, img, start_time or time.time())
+    # Same screenshot resubmitted under another report -> reuse the stored result
+    if use_cache:
+        job.cache_key, job.result = lookup_cached_result(img, job.start_time)
+    if job.result is None:
+        job.template = match_template(img)
+        job.first_stage = prepare_stage(img, OCR_STAGES[0])
+    return job
+
+def infer_job(job: OcrJob, ocr_reader=None) -> OcrJob:
+    """OCR passes, escalating through OCR_STAGES, then the step box re-read"""
+    if ocr_reader is None:
+        ocr_reader = get_reader()
+    
+    # Cheapest preprocessing first; later stages only run when the previous one found no plausible steps
+    fallback = None
+    for i, stage in enumerate(OCR_STAGES):
+        stage_start = time.time()
+        img_stage, scale = job.first_stage if i == 0 and job.first_stage is not None else prepare_stage(job.img, stage)
+        ocr_pass = run_ocr_pass(ocr_reader, img_stage, job.template)
+        job.stages_run += 1
+        metrics.observe("ocr_stage_seconds", time.time() - stage_start, stage=stage)
+        if is_plausible(ocr_pass.steps):
+            break
+        logger.info(f"⚠ OCR stage {stage} found no plausible steps ({ocr_pass.steps}), escalating")
+        # Plausibility only decides escalation: nothing plausible anywhere -> keep the first
+        # pass that read the most text, passes with a step reading first
+        rank = (ocr_pass.steps is not None, len(ocr_pass.raw_text))
+        if fallback is None or rank > fallback[0]:
+            fallback = (rank, stage, ocr_pass, scale)
+    else:
+        _, stage, ocr_pass, scale = fallback
+    job.first_stage = None
+    job.ocr_stage = stage if ocr_pass.steps is not None else None
+    job.scale = scale
+    metrics.inc("ocr_stage_total", stage=job.ocr_stage or "none")
+    
+    # Unsure about the step box -> re-read just that crop at high resolution
+    refined = refine_step_box(ocr_reader, job.img, scale, ocr_pass.results, ocr_pass.steps)
+    if refined is not None:
+        raw_text = ' '.join([res[1] for res in refined])
+        steps = find_steps(refined, raw_text, ocr_pass.app_class) or ocr_pass.steps
+        ocr_pass = ocr_pass._replace(results=refined, raw_text=raw_text, steps=steps)
+        job.refined = True
+    job.ocr_pass = ocr_pass
+    return job
+
+def extract_job(job: OcrJob) -> dict:
+    """Result dict from the inferred pass: steps plus secondary fields; stored in the cache"""
+    if job.result is not None:
+        return job.result
+    ocr_pass = job.ocr_pass
+    steps, raw_text, app_class = ocr_pass.steps, ocr_pass.raw_text, ocr_pass.app_class
     
     # Extract other data
     data = {}
     if steps:
         data['steps'] = steps
     
-    m = re.search(r'(\d{1,2})\s+(\w+)\s+(\d{4})\s+at\s+(\d{1,2}\.\d{2})', raw_text)
-    if m: data['date'] = f"{m.group(1)} {m.group(2)} {m.group(3)} at {m.group(4)}"
-    
-    m = re.search(r'(\d+[,\.]\d+)\s*km', raw_text)
-    if m: data['distance'] = f"{m.group(1)} km"
-    
-    m = re.search(r'(\d{2}):(\d{2})[:\.]?(\d{2})', raw_text)
-    if m: data['duration'] = f"{m.group(1)}:{m.group(2)}:{m.group(3)}"
-    
-    m = re.search(r'(\d+)\s*(?:ca|kcal)', raw_text, re.I)
-    if m: data['total_calories'] = f"{m.group(1)} kcal"
-    
-    m = re.search(r"(\d+)'(\d+)\"", raw_text)
-    if m: data['avg_pace'] = f"{m.group(1)}'{m.group(2)}\" /km"
-    
-    speeds = re.findall(r'(\d+[,\.]\d+)\s*km', raw_text)
-    if len(speeds) > 1: data['avg_speed'] = f"{speeds[1]} km/h"
-    
-    m = re.search(r'(\d{2,3})\s*(?:deeps|steps)/min', raw_text, re.I)
-    if m: data['avg_cadence'] = f"{m.group(1)} steps/min"
+    data.update(extract_secondary_fields(raw_text))
     
-    m = re.search(r'(\d+)\s*cm', raw_text)
-    if m: data['avg_stride'] = f"{m.group(1)} cm"
+    processing_time_ms = int((time.time() - job.start_time) * 1000)
     
-    m = re.search(r'(\d{2,3})\s*bpm', raw_text, re.I)
-    if m: data['avg_heart_rate'] = f"{m.group(1)} bpm"
-    
-    processing_time_ms = int((time.time() - start_time) * 1000)
-    
-    if show_progress:
-        status = "✓" if steps else "✗"
-        print(f" {status} {app_class} - {steps if steps else 'FAILED'} steps ({processing_time_ms}ms)")
-    
-    logger.info(f"✓ OCR completed: {app_class}, extracted {len(data)} fields, time: {processing_time_ms}ms")
+    logger.info(f"✓ OCR completed: {app_class}, extracted {len(data)} fields, stage: {job.ocr_stage} ({job.stages_run} run), scope: {ocr_pass.scope}, scale: {job.scale:.2f}x, refined: {job.refined}, time: {processing_time_ms}ms")
     logger.info(f"Raw OCR: {raw_text}")
     logger.info(f"Extracted data: {data}")
     
-    return {
+    job.result = {
         "raw_ocr": raw_text,
         "extracted_data": data,
         "app_class": app_class,
-        "processing_time_ms": processing_time_ms
+        "processing_time_ms": processing_time_ms,
+        "cache_hit": False,
+        "ocr_scope": ocr_pass.scope,
+        "app_confidence": ocr_pass.app_confidence,
+        "step_refined": job.refined,
+        "ocr_stage": job.ocr_stage,
+        "ocr_stages_run": job.stages_run
     }
+    store_result(job.cache_key, job.result)
+    return job.result
+
+def process_ocr(image_url: str, show_progress: bool = False, img: np.ndarray = None,
+                ocr_reader=None, use_cache: bool = True) -> dict:
+    """
+    Run OCR on image_url; pass img when the image was already downloaded and decoded,
+    and ocr_reader to route inference through something other than the global reader
+    (e.g. the batching InferenceScheduler). use_cache=False leaves caching to the caller.
+    """
+    start_time = time.time()
+    if show_progress:
+        print(f"🔍 Processing: {image_url.split('/')[-1]}...", end='', flush=True)
+    logger.info(f"🔍 Processing OCR for: {image_url}")
+    
+    # Download & preprocess
+    if img is None:
+        img = download_image(image_url)
+    job = prepare_job(image_url, img, use_cache, start_time)
+    if job.result is not None:
+        if show_progress:
+            print(f" ⚡ {job.result['app_class']} - cached ({job.result['processing_time_ms']}ms)")
+        return job.result
+    
+    result = extract_job(infer_job(job, ocr_reader))
+    
+    if show_progress:
+        steps = result['extracted_data'].get('steps')
+        status = "✓" if steps else "✗"
+        print(f" {status} {result['app_class']} - {steps if steps else 'FAILED'} steps ({result['processing_time_ms']}ms)")
+    return result
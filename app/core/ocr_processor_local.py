@@ -1,31 +1,23 @@
 import cv2
 import re
-import easyocr
 import numpy as np
 import time
-import threading
 from pathlib import Path
 from app.core.logger import setup_logger
+from app.core.preprocess import prepare_image
+from app.core.secondary_fields import extract_secondary_fields
+from app.core.engine_registry import engine_registry
+from app.core.step_refine import refine_step_box
 
 logger = setup_logger(__name__)
-reader = None
-reader_lock = threading.Lock()
 
 def get_reader():
-    global reader
-    if reader is None:
-        with reader_lock:
-            if reader is None:
-                try:
-                    import torch
-                    gpu_available = torch.cuda.is_available()
-                    logger.info(f"📦 Loading EasyOCR (GPU: {gpu_available})...")
-                    reader = easyocr.Reader(['en'], gpu=gpu_available)
-                    logger.info(f"✓ EasyOCR loaded with {'GPU' if gpu_available else 'CPU'}")
-                except ImportError:
-                    logger.warning("⚠ PyTorch not found, using CPU")
-                    reader = easyocr.Reader(['en'], gpu=False)
-    return reader
+    """Shared EasyOCR model from the engine registry (one per process, whichever pipeline asks first)"""
+    return engine_registry.acquire("local_pipeline")
+
+def release_reader():
+    """Drop this pipeline's hold on the shared model; it is unloaded once no pipeline holds it"""
+    engine_registry.release("local_pipeline")
 
 def load_local_image(file_path: str) -> np.ndarray:
     """Load image from local filesystem"""
@@ -149,8 +141,7 @@ def process_ocr_local(file_path: str, category: str = None) -> dict:
     
     # Load & preprocess
     img = load_local_image(file_path)
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    img_rgb = cv2.resize(img_rgb, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    img_rgb, scale = prepare_image(img)
     
     # OCR
     ocr_reader = get_reader()
@@ -163,41 +154,23 @@ def process_ocr_local(file_path: str, category: str = None) -> dict:
     # Extract steps
     steps = extract_steps(raw_text, app_class)
     
+    # Unsure about the step box -> re-read just that crop at high resolution (replaces the old 2x pass)
+    refined = refine_step_box(ocr_reader, img, scale, results, steps)
+    if refined is not None:
+        raw_text = ' '.join([res[1] for res in refined])
+        steps = extract_steps(raw_text, app_class) or steps
+    
     # Extract other data
     data = {}
     if steps:
         data['steps'] = steps
     
-    m = re.search(r'(\d{1,2})\s+(\w+)\s+(\d{4})\s+at\s+(\d{1,2}\.\d{2})', raw_text)
-    if m: data['date'] = f"{m.group(1)} {m.group(2)} {m.group(3)} at {m.group(4)}"
-    
-    m = re.search(r'(\d+[,\.]\d+)\s*km', raw_text)
-    if m: data['distance'] = f"{m.group(1)} km"
-    
-    m = re.search(r'(\d{2}):(\d{2})[:\.?](\d{2})', raw_text)
-    if m: data['duration'] = f"{m.group(1)}:{m.group(2)}:{m.group(3)}"
-    
-    m = re.search(r'(\d+)\s*(?:ca|kcal)', raw_text, re.I)
-    if m: data['total_calories'] = f"{m.group(1)} kcal"
-    
-    m = re.search(r"(\d+)'(\d+)\"", raw_text)
-    if m: data['avg_pace'] = f"{m.group(1)}'{m.group(2)}\" /km"
-    
-    speeds = re.findall(r'(\d+[,\.]\d+)\s*km', raw_text)
-    if len(speeds) > 1: data['avg_speed'] = f"{speeds[1]} km/h"
-    
-    m = re.search(r'(\d{2,3})\s*(?:deeps|steps)/min', raw_text, re.I)
-    if m: data['avg_cadence'] = f"{m.group(1)} steps/min"
-    
-    m = re.search(r'(\d+)\s*cm', raw_text)
-    if m: data['avg_stride'] = f"{m.group(1)} cm"
-    
-    m = re.search(r'(\d{2,3})\s*bpm', raw_text, re.I)
-    if m: data['avg_heart_rate'] = f"{m.group(1)} bpm"
+    # Local pipeline's duration regex requires the second separator ([:\.?])
+    data.update(extract_secondary_fields(raw_text, duration_separators=':.?', duration_separator_required=True))
     
     processing_time_ms = int((time.time() - start_time) * 1000)
     
-    logger.info(f"✓ OCR completed: {app_class}, extracted {len(data)} fields, time: {processing_time_ms}ms")
+    logger.info(f"✓ OCR completed: {app_class}, extracted {len(data)} fields, scale: {scale:.2f}x, refined: {refined is not None}, time: {processing_time_ms}ms")
     
     return {
         "file_path": file_path,
@@ -0,0 +1,224 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from decouple import config
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# SQLite file holding undelivered webhook results; empty = in-memory (retries still work, restarts lose them)
+WEBHOOK_OUTBOX_PATH = config("WEBHOOK_OUTBOX_PATH", default="")
+# Delivery attempts before a result moves to the dead-letter store
+WEBHOOK_MAX_ATTEMPTS = config("WEBHOOK_MAX_ATTEMPTS", cast=int, default=8)
+# Exponential backoff: base * 2^(attempt-1), capped, with jitter
+WEBHOOK_BACKOFF_BASE = config("WEBHOOK_BACKOFF_BASE", cast=float, default=2.0)
+WEBHOOK_BACKOFF_MAX = config("WEBHOOK_BACKOFF_MAX", cast=float, default=600.0)
+# Consecutive failures that open an environment's circuit, and how long it stays open
+WEBHOOK_BREAKER_THRESHOLD = config("WEBHOOK_BREAKER_THRESHOLD", cast=int, default=5)
+WEBHOOK_BREAKER_COOLDOWN = config("WEBHOOK_BREAKER_COOLDOWN", cast=float, default=30.0)
+
+PENDING = "pending"
+DEAD = "dead"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    env TEXT NOT NULL,
+    report_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (env, state, next_attempt_at);
+"""
+
+def backoff_delay(attempts: int, base: float = None, cap: float = None) -> float:
+    """Seconds before retry number `attempts`: half the capped exponential delay plus a random half"""
+    base = WEBHOOK_BACKOFF_BASE if base is None else base
+    cap = WEBHOOK_BACKOFF_MAX if cap is None else cap
+    delay = min(cap, base * (2 ** max(0, attempts - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+class OutboxStore:
+    """
+    Webhook results that are not yet acknowledged by the Laravel API.
+
+    A row stays here from submit until a 2xx response; failed deliveries are
+    rescheduled with backoff and after WEBHOOK_MAX_ATTEMPTS (or a non-retryable
+    response) the row is marked dead. Dead rows are kept for inspection and replay.
+    Claiming pushes next_attempt_at out by a lease so concurrent senders skip the row.
+    """
+
+    def __init__(self, path: str = WEBHOOK_OUTBOX_PATH, max_attempts: int = WEBHOOK_MAX_ATTEMPTS):
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path or ":memory:"
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        if path:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def add(self, env: str, report_id, payload: dict) -> int:
+        now = time.time()
+        with self.lock:
+            return self.conn.execute(
+                "INSERT INTO outbox (env, report_id, payload, created_at, next_attempt_at) VALUES (?, ?, ?, ?, ?)",
+                (env, str(report_id), json.dumps(payload), now, now)
+            ).lastrowid
+
+    def claim_due(self, env: str, limit: int, lease: float) -> list:
+        """Up to `limit` due rows of env as (id, payload dict, attempts, created_at), leased for `lease` seconds"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT id, payload, attempts, created_at FROM outbox WHERE env = ? AND state = ? AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at, id LIMIT ?", (env, PENDING, now, limit)
+                ).fetchall()
+                self.conn.executemany(
+                    "UPDATE outbox SET next_attempt_at = ? WHERE id = ?", [(now + lease, row[0]) for row in rows]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return [(row[0], json.loads(row[1]), row[2], row[3]) for row in rows]
+
+    def delivered(self, ids: list):
+        with self.lock:
+            self.conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def failed(self, rows: list, error: str, retryable: bool = True) -> int:
+        """Reschedule (or dead-letter) claimed rows after a failed delivery; returns how many went dead"""
+        now = time.time()
+        updates, dead = [], 0
+        for row_id, _, attempts, _ in rows:
+            attempts += 1
+            if not retryable or attempts >= self.max_attempts:
+                updates.append((DEAD, attempts, now, error, row_id))
+                dead += 1
+            else:
+                updates.append((PENDING, attempts, now + backoff_delay(attempts), error, row_id))
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE outbox SET state = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?", updates
+            )
+        return dead
+
+    def next_due_at(self, env: str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE env = ? AND state = ?", (env, PENDING)
+            ).fetchone()
+        return row[0]
+
+    def dead_letters(self, env: str = None, limit: int = 50, offset: int = 0) -> list:
+        query = "SELECT id, env, report_id, attempts, created_at, last_error, payload FROM outbox WHERE state = ?"
+        params = [DEAD]
+        if env:
+            query += " AND env = ?"
+            params.append(env)
+        query += " ORDER BY id LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [{
+            "id": r[0], "env": r[1], "report_id": r[2], "attempts": r[3],
+            "created_at": r[4], "last_error": r[5], "payload": json.loads(r[6])
+        } for r in rows]
+
+    def replay(self, ids: list = None, env: str = None) -> int:
+        """Move dead rows (all, by id, and/or by env) back to pending with a fresh attempt budget"""
+        query = "UPDATE outbox SET state = ?, attempts = 0, next_attempt_at = ?, last_error = NULL WHERE state = ?"
+        params = [PENDING, time.time(), DEAD]
+        if ids:
+            query += f" AND id IN ({','.join('?' * len(ids))})"
+            params += list(ids)
+        if env:
+            query += " AND env = ?"
+            params.append(env)
+        with self.lock:
+            return self.conn.execute(query, params).rowcount
+
+    def counts(self) -> dict:
+        with self.lock:
+            rows = self.conn.execute("SELECT env, state, COUNT(*) FROM outbox GROUP BY env, state").fetchall()
+        counts = {}
+        for env, state, count in rows:
+            counts.setdefault(env, {PENDING: 0, DEAD: 0})[state] = count
+        return counts
+
+    def pending_count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox WHERE state = ?", (PENDING,)).fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures; open rejects for `cooldown`
+    seconds, then half-open lets one delivery through: success closes, failure re-opens.
+    """
+
+    def __init__(self, name: str, threshold: int = WEBHOOK_BREAKER_THRESHOLD, cooldown: float = WEBHOOK_BREAKER_COOLDOWN):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_running = False
+        self.opens = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.time() - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+            self.trial_running = False
+        if self.state == "half_open" and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+
+    def retry_in(self) -> float:
+        """Seconds until allow() may say yes again"""
+        if self.state == "open":
+            return max(0.0, self.cooldown - (time.time() - self.opened_at))
+        return 0.0 if self.state == "closed" else 1.0
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"✓ Webhook circuit {self.name} closed")
+        self.state = "closed"
+        self.failures = 0
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+            self.state = "open"
+            self.opened_at = time.time()
+            self.trial_running = False
+            self.opens += 1
+            logger.warning(f"⚠ Webhook circuit {self.name} open for {self.cooldown:.0f}s after {self.failures} consecutive failures")
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "retry_in_seconds": round(self.retry_in(), 1)
+        }
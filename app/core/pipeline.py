@@ -0,0 +1,430 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from decouple import config
+from app.core import metrics
+from app.core.downloader import fetch_image_bytes, decode_image, load_file_image
+from app.core.ocr_processor import OcrJob, prepare_job, infer_job, extract_job
+from app.core.inference_scheduler import get_scheduler
+from app.core.ocr_pool import ocr_pool
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Workers per stage; inference defaults to WORKER_COUNT (the old number of ocr_worker tasks)
+PIPELINE_DOWNLOAD_CONCURRENCY = config("PIPELINE_DOWNLOAD_CONCURRENCY", cast=int, default=8)
+PIPELINE_DECODE_CONCURRENCY = config("PIPELINE_DECODE_CONCURRENCY", cast=int, default=2)
+PIPELINE_PREPROCESS_CONCURRENCY = config("PIPELINE_PREPROCESS_CONCURRENCY", cast=int, default=2)
+PIPELINE_INFER_CONCURRENCY = config("PIPELINE_INFER_CONCURRENCY", cast=int, default=config("WORKER_COUNT", cast=int, default=3))
+PIPELINE_EXTRACT_CONCURRENCY = config("PIPELINE_EXTRACT_CONCURRENCY", cast=int, default=1)
+PIPELINE_DELIVER_CONCURRENCY = config("PIPELINE_DELIVER_CONCURRENCY", cast=int, default=1)
+# Items buffered between two stages; a full buffer makes the upstream stage wait
+PIPELINE_QUEUE_SIZE = config("PIPELINE_QUEUE_SIZE", cast=int, default=4)
+# Finished reports whose end-to-end time feeds recent_latency()
+LATENCY_WINDOW = 50
+
+@dataclass
+class PipelineJob:
+    data: object
+    started_at: float = field(default_factory=time.time)
+    content: bytes = None
+    img: object = None
+    ocr: OcrJob = None
+    result: dict = None
+    # Counts against the reports allowed ahead of inference until it leaves the infer stage
+    holds_slot: bool = False
+    # Seconds the report held an inference worker (admission control's capacity estimate)
+    infer_seconds: float = 0.0
+    # Set once the deliver stage has settled the report, so a later error does not settle it again
+    settled: bool = False
+
+class Stage:
+    """
+    A named step with its own worker tasks. Workers take items from `inbox`, run
+    `handler` and put the returned item on the next stage's inbox (bounded, so a slow
+    stage backs up the ones before it instead of piling up decoded images).
+    A handler exception drops the item and reports it through on_error; items for
+    which the awaitable `skip` returns True are dropped before the handler runs.
+    Exceptions from skip/on_error are logged, the worker keeps going.
+    """
+
+    def __init__(self, name: str, handler, concurrency: int, inbox: asyncio.Queue = None):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.inbox = inbox
+        self.next = None
+        self.on_error = None
+        self.skip = None
+        self.workers = {}
+        self.idle = set()
+        self.busy = 0
+        self.processed = 0
+        self.failed = 0
+        self.seconds = 0.0
+
+    def start(self):
+        for worker_id in range(1, self.concurrency + 1):
+            if worker_id not in self.workers:
+                self.workers[worker_id] = asyncio.create_task(self._work(worker_id))
+
+    def resize(self, concurrency: int):
+        """
+        Grow or shrink the worker set. Surplus workers that are waiting for an item are
+        cancelled right away (no item is lost); busy ones exit after their current item.
+        """
+        self.concurrency = max(1, concurrency)
+        self.start()
+        for worker_id in [w for w in self.workers if w > self.concurrency and w in self.idle]:
+            self.workers.pop(worker_id).cancel()
+            self.idle.discard(worker_id)
+
+    def stop(self):
+        for worker in self.workers.values():
+            worker.cancel()
+        self.workers.clear()
+        self.idle.clear()
+
+    async def _take(self):
+        return await self.inbox.get()
+
+    async def _work(self, worker_id: int):
+        while worker_id <= self.concurrency:
+            self.idle.add(worker_id)
+            try:
+                item = await self._take()
+            finally:
+                self.idle.discard(worker_id)
+            try:
+                if self.skip is not None and await self.skip(item, self.name):
+                    continue
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"❌ [{self.name}-{worker_id}] Error dropping superseded item: {e}")
+                continue
+            self.busy += 1
+            started = time.time()
+            try:
+                item = await self.handler(item, worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"❌ [{self.name}-{worker_id}] Error: {e}")
+                if self.on_error is not None:
+                    # Same catch-all as the handler: a failing error hook must not end the worker
+                    try:
+                        await self.on_error(item, e)
+                    except Exception as hook_error:
+                        logger.error(f"❌ [{self.name}-{worker_id}] Error while failing item: {hook_error}")
+                continue
+            finally:
+                self.busy -= 1
+                elapsed = time.time() - started
+                self.seconds += elapsed
+                metrics.observe("pipeline_stage_seconds", elapsed, stage=self.name)
+            self.processed += 1
+            if self.next is not None and item is not None:
+                await self.next.inbox.put(item)
+        # Retired by resize()
+        if self.workers.get(worker_id) is asyncio.current_task():
+            del self.workers[worker_id]
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "workers": len(self.workers),
+            "busy": self.busy,
+            "queue_depth": self.inbox.qsize() if self.inbox is not None else None,
+            "queue_capacity": self.inbox.maxsize if self.inbox is not None else None,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_seconds": round(self.seconds / (self.processed + self.failed), 4) if self.processed + self.failed else 0
+        }
+
+class SourceStage(Stage):
+    """First stage: pulls reports straight from the job queue"""
+
+    def __init__(self, name: str, handler, concurrency: int, source):
+        super().__init__(name, handler, concurrency)
+        self.source = source
+
+    async def _take(self):
+        return await self.source()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "queue_depth": None, "queue_capacity": None}
+
+class OcrPipeline:
+    """
+    download -> decode -> preprocess -> infer -> extract -> deliver, each stage with
+    its own concurrency and a bounded queue in front, so the next images are already
+    downloaded and preprocessed while the current one is in inference.
+
+    take() yields the next report from the job queue; started/finished are the queue
+    bookkeeping hooks (registry state, ack); deliver hands the result on.
+    With the process executor (OCR_EXECUTOR=process) the worker process runs
+    preprocessing, inference and extraction in one call, so preprocess/extract pass
+    the item through.
+
+    Single flight: a report whose image URL is already in the pipeline does not run
+    again; it waits for that computation and gets a copy of its result. A job for a
+    report that is already part of that flight is discarded, so it is answered once.
+
+    Only about one buffer's worth of reports beyond the inference workers is taken from
+    the job queue ahead of inference; the rest stay in the fair queue, so its lane
+    weights still decide what runs next when a burst arrives.
+
+    Superseded reports: current(data) says whether the report still wants this image.
+    A report resubmitted with another image is dropped at the next stage boundary
+    (through discarded, which acks it without touching the newer submission) unless
+    other reports wait on the same image; a result that arrives anyway is not delivered.
+    """
+
+    def __init__(self, take, started, finished, deliver, current=None, discarded=None):
+        self.started = started
+        self.finished = finished
+        self.deliver = deliver
+        self.current = current or (lambda data: True)
+        self.discarded = discarded
+        # image URL -> report running the computation / reports waiting on it
+        self.leaders = {}
+        self.flights = {}
+        # Reports taken from the job queue that have not left the infer stage yet
+        self.holding = 0
+        self.slot_free = asyncio.Condition()
+        self.coalesced = 0
+        self.superseded = 0
+        specs = [
+            ("preprocess", self._preprocess, PIPELINE_PREPROCESS_CONCURRENCY),
+            ("infer", self._infer, PIPELINE_INFER_CONCURRENCY),
+            ("extract", self._extract, PIPELINE_EXTRACT_CONCURRENCY),
+            ("deliver", self._deliver, PIPELINE_DELIVER_CONCURRENCY),
+        ]
+        self.stages = [
+            SourceStage("download", self._download, PIPELINE_DOWNLOAD_CONCURRENCY, self._take),
+            Stage("decode", self._decode, PIPELINE_DECODE_CONCURRENCY, asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)),
+        ] + [Stage(name, handler, n, asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)) for name, handler, n in specs]
+        for stage, nxt in zip(self.stages, self.stages[1:]):
+            stage.next = nxt
+        for stage in self.stages:
+            stage.on_error = self._failed
+        for stage in self.stages[1:-1]:
+            stage.skip = self._stale
+        self.by_name = {stage.name: stage for stage in self.stages}
+        self.take = take
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        logger.info("🚀 OCR pipeline started: " + ", ".join(f"{s.name} x{s.concurrency}" for s in self.stages))
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+
+    def in_flight(self) -> int:
+        """Reports taken from the job queue and not yet finished"""
+        followers = sum(len(waiting) for waiting in self.flights.values())
+        return followers + sum(stage.busy + (stage.inbox.qsize() if stage.inbox is not None else 0) for stage in self.stages)
+
+    def slot_limit(self) -> int:
+        """Reports allowed between the job queue and the end of inference"""
+        return self.by_name["infer"].concurrency + PIPELINE_QUEUE_SIZE
+
+    async def _take(self):
+        async with self.slot_free:
+            await self.slot_free.wait_for(lambda: self.holding < self.slot_limit())
+            self.holding += 1
+        try:
+            return await self.take()
+        except BaseException:
+            await self._release_slot()
+            raise
+
+    async def _release_slot(self):
+        async with self.slot_free:
+            self.holding -= 1
+            self.slot_free.notify_all()
+
+    async def _release(self, job: PipelineJob):
+        if job.holds_slot:
+            job.holds_slot = False
+            await self._release_slot()
+
+    async def _drop(self, data, stage: str):
+        self.superseded += 1
+        metrics.inc("superseded_dropped_total", stage=stage)
+        logger.info(f"⚠ [{stage}] Report {data.report_id} was resubmitted with another image, dropping {data.s3_url}")
+        if self.discarded is not None:
+            await self.discarded(data)
+
+    async def _stale(self, job: PipelineJob, stage: str) -> bool:
+        """Drop a superseded report before the next stage unless others wait on its image"""
+        if self.current(job.data) or self.flights.get(job.data.s3_url):
+            return False
+        await self._release(job)
+        self.flights.pop(job.data.s3_url, None)
+        self.leaders.pop(job.data.s3_url, None)
+        await self._drop(job.data, stage)
+        return True
+
+    async def _settle(self, job_data, result: dict = None, seconds: float = 0.0):
+        """
+        Finish the report and everyone coalesced onto its image: deliver result, or fail
+        when None. Each report is settled on its own, one failing does not skip the rest.
+        """
+        self.leaders.pop(job_data.s3_url, None)
+        for data in [job_data] + self.flights.pop(job_data.s3_url, []):
+            try:
+                # Followers didn't use a worker of their own
+                await self._settle_one(data, result, seconds if data is job_data else 0.0)
+            except Exception as e:
+                logger.error(f"❌ [deliver] Could not settle report {data.report_id}: {e}")
+
+    async def _settle_one(self, data, result: dict = None, seconds: float = 0.0):
+        if not self.current(data):
+            await self._drop(data, "deliver")
+            return
+        success = result is not None
+        if success:
+            try:
+                await self.deliver(data, dict(result))
+            except Exception as e:
+                logger.error(f"❌ [deliver] Could not hand on result for report {data.report_id}: {e}")
+                success = False
+        await self.finished(data, success=success, seconds=seconds)
+
+    async def _failed(self, item, error):
+        # The download stage receives the bare request, later stages a PipelineJob
+        if isinstance(item, PipelineJob):
+            await self._release(item)
+            if item.settled:
+                return
+            item.settled = True
+            await self._settle(item.data, seconds=item.infer_seconds)
+            return
+        # A bare request failed in the download stage, which took a slot for it
+        await self._release_slot()
+        if self.leaders.get(item.s3_url, item) is item:
+            await self._settle(item)
+        elif not any(item is other for other in self.flights.get(item.s3_url, [])):
+            # Failed before joining another report's flight; that flight is left alone
+            await self._settle_one(item)
+
+    async def _download(self, data, worker_id: int) -> PipelineJob:
+        # Followers and duplicates leave the pipeline here; a failure is released by _failed
+        job = await self._start_download(data, worker_id)
+        if job is None:
+            await self._release_slot()
+        return job
+
+    async def _start_download(self, data, worker_id: int) -> PipelineJob:
+        self.started(data, worker_id)
+        if data.s3_url in self.flights:
+            waiting = [self.leaders[data.s3_url]] + self.flights[data.s3_url]
+            if any(str(other.report_id) == str(data.report_id) for other in waiting):
+                # Resubmitted back to an image its earlier job is still computing: that job answers
+                metrics.inc("single_flight_total", role="duplicate")
+                logger.info(f"🔁 [download-{worker_id}] Report {data.report_id} is already in flight for {data.s3_url}, dropping the duplicate")
+                if self.discarded is not None:
+                    await self.discarded(data)
+                return None
+            self.flights[data.s3_url].append(data)
+            self.coalesced += 1
+            metrics.inc("single_flight_total", role="follower")
+            logger.info(f"🔁 [download-{worker_id}] Report {data.report_id} shares the OCR already running for {data.s3_url}")
+            return None
+        self.flights[data.s3_url] = []
+        self.leaders[data.s3_url] = data
+        job = PipelineJob(data, holds_slot=True)
+        logger.info(f"⚙ [download-{worker_id}] Processing report {data.report_id}")
+        if not data.s3_url.startswith('file://'):
+            job.content = await fetch_image_bytes(data.s3_url)
+        return job
+
+    async def _decode(self, job: PipelineJob, worker_id: int) -> PipelineJob:
+        url = job.data.s3_url
+        if job.content is None:
+            job.img = await asyncio.to_thread(load_file_image, url[7:])
+        else:
+            job.img = await asyncio.to_thread(decode_image, job.content, url)
+            job.content = None
+        return job
+
+    async def _preprocess(self, job: PipelineJob, worker_id: int) -> PipelineJob:
+        if ocr_pool is None:
+            job.ocr = await asyncio.to_thread(prepare_job, job.data.s3_url, job.img, True, job.started_at)
+        return job
+
+    async def _infer(self, job: PipelineJob, worker_id: int) -> PipelineJob:
+        started = time.time()
+        try:
+            if ocr_pool is not None:
+                job.result = await ocr_pool.run(job.data.s3_url, job.img)
+            elif job.ocr.result is None:
+                await asyncio.to_thread(infer_job, job.ocr, get_scheduler())
+        finally:
+            await self._release(job)
+        job.infer_seconds = time.time() - started
+        job.img = None
+        return job
+
+    async def _extract(self, job: PipelineJob, worker_id: int) -> PipelineJob:
+        if job.result is None:
+            job.result = await asyncio.to_thread(extract_job, job.ocr)
+        job.ocr = None
+        return job
+
+    async def _deliver(self, job: PipelineJob, worker_id: int):
+        job.settled = True
+        await self._settle(job.data, job.result, job.infer_seconds)
+        logger.info(f"✓ [deliver-{worker_id}] Completed OCR for report {job.data.report_id}")
+        elapsed = time.time() - job.started_at
+        self.latencies.append(elapsed)
+        metrics.observe("pipeline_report_seconds", elapsed)
+        return None
+
+    def recent_latency(self) -> float:
+        """Average seconds from download to delivery over the last LATENCY_WINDOW reports"""
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    def backlog(self) -> int:
+        """Reports inside the pipeline still waiting for inference"""
+        return sum(self.by_name[name].inbox.qsize() for name in ("decode", "preprocess", "infer"))
+
+    def stats(self) -> dict:
+        return {stage.name: stage.stats() for stage in self.stages}
+
+ocr_pipeline = None
+
+def start_pipeline(take, started, finished, deliver, current=None, discarded=None) -> OcrPipeline:
+    global ocr_pipeline
+    ocr_pipeline = OcrPipeline(take, started, finished, deliver, current, discarded)
+    ocr_pipeline.start()
+    return ocr_pipeline
+
+def stop_pipeline():
+    if ocr_pipeline is not None:
+        ocr_pipeline.stop()
+
+def get_pipeline_load() -> tuple:
+    """(reports inside the pipeline, inference workers)"""
+    if ocr_pipeline is None:
+        return 0, PIPELINE_INFER_CONCURRENCY
+    return ocr_pipeline.in_flight(), ocr_pipeline.by_name["infer"].concurrency
+
+def get_pipeline_stats() -> dict:
+    if ocr_pipeline is None:
+        return {"running": False}
+    return {
+        "running": True,
+        "in_flight": ocr_pipeline.in_flight(),
+        "taken_ahead_limit": ocr_pipeline.slot_limit(),
+        "recent_latency_seconds": round(ocr_pipeline.recent_latency(), 2),
+        "coalesced": ocr_pipeline.coalesced,
+        "superseded_dropped": ocr_pipeline.superseded,
+        "stages": ocr_pipeline.stats()
+    }
@@ -0,0 +1,135 @@
+import cv2
+import numpy as np
+from decouple import config
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# adaptive: scale so the measured glyph height lands on OCR_TARGET_GLYPH_HEIGHT
+# fixed:    legacy 2x INTER_CUBIC upscale for every image
+# none:     original resolution; low-confidence step boxes are re-read by step_refine
+OCR_RESIZE_MODE = config("OCR_RESIZE_MODE", default="none").lower()
+OCR_TARGET_GLYPH_HEIGHT = config("OCR_TARGET_GLYPH_HEIGHT", cast=float, default=24.0)
+OCR_MIN_SCALE = config("OCR_MIN_SCALE", cast=float, default=0.5)
+OCR_MAX_SCALE = config("OCR_MAX_SCALE", cast=float, default=2.0)
+# Used when no glyphs can be measured: scale the screen width towards a 1080px phone
+OCR_REFERENCE_WIDTH = config("OCR_REFERENCE_WIDTH", cast=int, default=1080)
+
+# OCR passes tried in order until one yields a plausible step count:
+# gray = downscaled grayscale, color = OCR_RESIZE_MODE color pass, contrast = CLAHE + binarization
+OCR_STAGES = [s.strip().lower() for s in config("OCR_STAGES", default="gray,color,contrast").split(",") if s.strip()]
+# Cheap first OCR stage: grayscale, downscaled so the width is at most this
+OCR_GRAY_STAGE_WIDTH = config("OCR_GRAY_STAGE_WIDTH", cast=int, default=720)
+# Contrast stage: CLAHE clip limit before Otsu binarization
+OCR_CONTRAST_CLIP_LIMIT = config("OCR_CONTRAST_CLIP_LIMIT", cast=float, default=3.0)
+
+# Glyph measurement runs on a thumbnail this wide
+MEASURE_WIDTH = 720
+# Scales this close to 1 are not worth a resample
+SCALE_TOLERANCE = 0.1
+
+def _glyph_heights(binary: np.ndarray) -> np.ndarray:
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    if count <= 1:
+        return np.empty(0)
+    w = stats[1:, cv2.CC_STAT_WIDTH]
+    h = stats[1:, cv2.CC_STAT_HEIGHT]
+    area = stats[1:, cv2.CC_STAT_AREA]
+    max_h = binary.shape[0] / 8
+    fill = area / np.maximum(w * h, 1)
+    # Character-shaped blobs: not specks, not panels/icons, not long rules
+    glyph = (h >= 5) & (h <= max_h) & (w <= h * 1.5) & (w * 5 >= h) & (fill > 0.15) & (fill < 0.95)
+    return h[glyph]
+
+def estimate_glyph_height(img: np.ndarray):
+    """Median character height in pixels of the original image, or None if no text-like blobs"""
+    height, width = img.shape[:2]
+    factor = min(1.0, MEASURE_WIDTH / width)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    if factor < 1.0:
+        gray = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+
+    # Dark-on-light and light-on-dark screens: keep whichever polarity looks like text
+    heights = max(_glyph_heights(binary), _glyph_heights(cv2.bitwise_not(binary)), key=len)
+    if len(heights) < 10:
+        return None
+    return float(np.median(heights)) / factor
+
+def choose_scale(img: np.ndarray, mode: str = None) -> float:
+    mode = (mode or OCR_RESIZE_MODE).lower()
+    if mode == "fixed":
+        return 2.0
+    if mode == "none":
+        return 1.0
+
+    glyph_height = estimate_glyph_height(img)
+    if glyph_height:
+        scale = OCR_TARGET_GLYPH_HEIGHT / glyph_height
+    else:
+        scale = OCR_REFERENCE_WIDTH / img.shape[1]
+    scale = min(OCR_MAX_SCALE, max(OCR_MIN_SCALE, scale))
+    if abs(scale - 1.0) <= SCALE_TOLERANCE:
+        scale = 1.0
+    logger.info(f"📐 Resolution normalization: glyph={glyph_height and round(glyph_height, 1)}px, size={img.shape[1]}x{img.shape[0]}, scale={scale:.2f}")
+    return scale
+
+def prepare_image(img: np.ndarray, mode: str = None):
+    """BGR image -> (RGB image ready for readtext, applied scale)"""
+    scale = choose_scale(img, mode)
+    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    if scale != 1.0:
+        interpolation = cv2.INTER_CUBIC if scale > 1.0 else cv2.INTER_AREA
+        img_rgb = cv2.resize(img_rgb, None, fx=scale, fy=scale, interpolation=interpolation)
+    return img_rgb, scale
+
+def prepare_gray(img: np.ndarray):
+    """BGR image -> (grayscale image no wider than OCR_GRAY_STAGE_WIDTH, applied scale)"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    scale = min(1.0, OCR_GRAY_STAGE_WIDTH / img.shape[1])
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray, scale
+
+def prepare_contrast(img: np.ndarray, mode: str = None):
+    """BGR image -> (CLAHE-equalized, Otsu-binarized grayscale at the configured scale, applied scale)"""
+    scale = choose_scale(img, mode)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    if scale != 1.0:
+        interpolation = cv2.INTER_CUBIC if scale > 1.0 else cv2.INTER_AREA
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+    gray = cv2.createCLAHE(clipLimit=OCR_CONTRAST_CLIP_LIMIT, tileGridSize=(8, 8)).apply(gray)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # Keep dark text on a light background whatever the screen theme
+    if np.count_nonzero(binary) < binary.size / 2:
+        binary = cv2.bitwise_not(binary)
+    return binary, scale
+
+STAGE_PREPARERS = {
+    "gray": prepare_gray,
+    "color": prepare_image,
+    "contrast": prepare_contrast,
+}
+unknown_stages = [s for s in OCR_STAGES if s not in STAGE_PREPARERS]
+if unknown_stages or not OCR_STAGES:
+    logger.warning(f"⚠ Unknown OCR_STAGES {unknown_stages or OCR_STAGES}, using color only")
+    OCR_STAGES = [s for s in OCR_STAGES if s in STAGE_PREPARERS] or ["color"]
+
+def prepare_stage(img: np.ndarray, stage: str):
+    """(image, scale) for one OCR_STAGES entry"""
+    return STAGE_PREPARERS[stage](img)
+
+def describe_color_pass() -> str:
+    if OCR_RESIZE_MODE == "fixed":
+        return "resize_2x + color_conversion"
+    if OCR_RESIZE_MODE == "none":
+        return "color_conversion"
+    return f"adaptive_resize (glyph {OCR_TARGET_GLYPH_HEIGHT:.0f}px, {OCR_MIN_SCALE}x-{OCR_MAX_SCALE}x) + color_conversion"
+
+def describe_preprocessing() -> str:
+    stages = {
+        "gray": f"grayscale (<= {OCR_GRAY_STAGE_WIDTH}px wide)",
+        "color": describe_color_pass(),
+        "contrast": "clahe + otsu_binarization",
+    }
+    return " -> ".join(f"{stage}: {stages[stage]}" for stage in OCR_STAGES)
@@ -1,139 +1,162 @@
 import asyncio
-import httpx
-import threading
 from contextlib import asynccontextmanager
 from decouple import config
-from app.core.ocr_processor import process_ocr
+from app.core.downloader import close_client
+from app.core.inference_scheduler import stop_scheduler
+from app.core.ocr_pool import ocr_pool
+from app.core.warmup import load_and_warm_up
+from app.core.queue_registry import QueueRegistry, WAITING
+from app.core.job_queue import create_task_queue
+from app.core.webhooks import webhook_dispatcher, environment_of
+from app.core.pipeline import start_pipeline, stop_pipeline, get_pipeline_load
+from app.core.ocr_processor import release_reader
+from app.core.ocr_processor_local import release_reader as release_local_reader
+from app.core.admission import admission
+from app.core import metrics
+from app.core.autoscaler import start_autoscaler, stop_autoscaler
+from app.models.requests import OCRRequest
 from app.core.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 # Queue with max size to prevent memory overflow
 MAX_QUEUE_SIZE = config("MAX_QUEUE_SIZE", cast=int, default=1000)
-task_queue = asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
-queue_list = []
-queue_list_lock = threading.Lock()
-
-# Metrics
-processed_count = 0
-failed_count = 0
-metrics_lock = threading.Lock()
+# In-memory by default; QUEUE_DB_PATH makes it survive restarts (see job_queue)
+task_queue = create_task_queue(OCRRequest, MAX_QUEUE_SIZE)
+# report_id -> state/timestamps/worker for everything queued, in flight or recently finished
+QUEUE_HISTORY_SIZE = config("QUEUE_HISTORY_SIZE", cast=int, default=100)
+queue_registry = QueueRegistry(history_size=QUEUE_HISTORY_SIZE)
 
 async def queue_task_check(data) -> bool:
-    # Quick check without lock for performance
-    for item in queue_list:
-        if str(item.report_id) == str(data.report_id):
-            item.s3_url = data.s3_url
-            logger.info(f"⚠ Report id:{data.report_id} already in queue, updated s3_url")
-            return True
+    """
+    True when the submission is absorbed by a report already in the queue. A new image
+    for a report that is processing returns False: the caller queues it as a fresh job
+    and the pipeline drops the running one at its next stage (see is_current).
+    """
+    entry = queue_registry.get(data.report_id)
+    if entry is None:
+        return False
+    if entry.data.s3_url == data.s3_url:
+        logger.info(f"⚠ Report id:{data.report_id} already in queue ({entry.state}) with the same image")
+        return True
+    if entry.state == WAITING:
+        entry.data.s3_url = data.s3_url
+        task_queue.update(entry.data)
+        logger.info(f"⚠ Report id:{data.report_id} already waiting in queue, updated s3_url")
+        return True
+    metrics.inc("superseded_total")
+    logger.info(f"⚠ Report id:{data.report_id} resubmitted with a new image while {entry.state}, superseding the running job")
     return False
 
-async def queue_add(data):
-    # Check if queue is full
-    if task_queue.qsize() >= MAX_QUEUE_SIZE:
+def is_current(data) -> bool:
+    """Whether this job still carries the image its report was last submitted with"""
+    entry = queue_registry.get(data.report_id)
+    return entry is None or entry.data.s3_url == data.s3_url
+
+def estimate_wait(data) -> float:
+    """Seconds until a report submitted now would be finished, from recent throughput"""
+    scheduler = task_queue.scheduler
+    lane = scheduler.lane_for(data)
+    in_flight, workers = get_pipeline_load()
+    return admission.estimate(scheduler.pending[lane], scheduler.lane_share(lane), task_queue.qsize(), in_flight, workers)
+
+async def queue_add(data) -> float:
+    """Admission control + registry entry; returns the estimated seconds until the report is done"""
+    wait = estimate_wait(data)
+    waiting = task_queue.qsize()
+    if waiting >= MAX_QUEUE_SIZE:
         logger.error(f"❌ Queue full! Rejecting report {data.report_id}")
-        raise Exception("Queue is full. Please try again later.")
+        # Come back once a tenth of the queue has drained, not the moment one slot frees up
+        admission.reject("queue_full", "Queue is full. Please try again later.",
+                         wait * (waiting - 0.9 * MAX_QUEUE_SIZE + 1) / (waiting + 1))
+    if not task_queue.scheduler.admits(data):
+        logger.error(f"❌ User {data.user_id} reached MAX_QUEUED_PER_USER, rejecting report {data.report_id}")
+        admission.reject("user_limit", "Too many reports queued for this user. Please try again later.",
+                         wait / max(1, task_queue.scheduler.max_per_user))
+    if admission.max_wait and wait > admission.max_wait:
+        logger.error(f"❌ Estimated wait {wait:.0f}s over ADMISSION_MAX_WAIT_SECONDS, rejecting report {data.report_id}")
+        admission.reject("wait_too_long", "Estimated wait is too long. Please try again later.", wait - admission.max_wait)
     
-    queue_list.append(data)
-    waiting = task_queue.qsize()
-    logger.info(f"✓ Added report id:{data.report_id} | Queue: {len(queue_list)} tracked, {waiting} waiting")
+    admission.admit(wait)
+    queue_registry.add(data)
+    logger.info(f"✓ Added report id:{data.report_id} | Queue: {len(queue_registry)} tracked, {waiting + 1} waiting, ~{wait:.0f}s to done")
+    return wait
 
 async def queue_clear():
-    global queue_list
-    count = len(queue_list)
-    queue_list.clear()
-    logger.info(f"✓ Cleared {count} items from queue_list")
+    count = queue_registry.clear()
+    logger.info(f"✓ Cleared {count} items from queue registry")
     return count
 
-def get_queue_list():
-    """Get current queue_list - snapshot copy"""
-    return list(queue_list)
+def get_queue_page(offset: int = 0, limit: int = 5, state: str = None) -> list:
+    """One page of tracked reports for /app-status"""
+    return queue_registry.page(offset, limit, state)
+
+def get_queue_stats() -> dict:
+    return {
+        **queue_registry.stats(),
+        "storage": task_queue.stats(),
+        "admission": admission.stats(get_pipeline_load()[1])
+    }
 
-async def queue_done(data, success: bool = True):
-    global queue_list, processed_count, failed_count
-    before_count = len(queue_list)
-    queue_list = [item for item in queue_list if str(item.report_id) != str(data.report_id)]
-    after_count = len(queue_list)
+async def queue_done(data, success: bool = True, seconds: float = 0.0):
+    # Not reached when a worker is cancelled mid-job, so a durable job stays pending for the next start
+    task_queue.ack(data)
+    queue_registry.finish(data.report_id, success)
+    admission.record_completion(seconds)
     waiting = task_queue.qsize()
-    logger.info(f"✓ [Queue] Removed report {data.report_id} | Remaining: {after_count} tracked, {waiting} waiting")
-    
-    if success:
-        processed_count += 1
-    else:
-        failed_count += 1
+    logger.info(f"✓ [Queue] Removed report {data.report_id} | Remaining: {len(queue_registry)} tracked, {waiting} waiting")
 
-async def ocr_worker(worker_id: int):
-    while True:
-        data = await task_queue.get()
-        try:
-            logger.info(f"⚙ [Worker-{worker_id}] Processing report {data.report_id}")
-            
-            result = await asyncio.to_thread(process_ocr, data.s3_url)
-            
-            # Determine environment and get appropriate URL/key
-            env = getattr(data, 'environment', 'staging').lower()
-            if env == 'production':
-                api_url = config("LARAVEL_API_URL_PRODUCTION", default=config("LARAVEL_API_URL", default="http://localhost:8003"))
-                api_key = config("LARAVEL_API_KEY_PRODUCTION", default=config("LARAVEL_API_KEY", default=""))
-            else:
-                api_url = config("LARAVEL_API_URL_STAGING", default=config("LARAVEL_API_URL", default="http://localhost:8003"))
-                api_key = config("LARAVEL_API_KEY_STAGING", default=config("LARAVEL_API_KEY", default=""))
-            
-            # Clean URL from any leading/trailing whitespace or '=' characters
-            api_url = api_url.strip().lstrip('=')
-            api_url = api_url + "/api/ocr/result"
-            
-            payload = {
-                "report_id": data.report_id,
-                "user_id": data.user_id,
-                "img_url": data.s3_url,
-                "raw_ocr": result["raw_ocr"],
-                "extracted_data": result["extracted_data"],
-                'app_class': result["app_class"],
-                "processing_time_ms": result["processing_time_ms"]
-            }
-            
-            headers = {
-                "x-api-key": api_key
-            }
+def pipeline_started(data, worker_id: int):
+    entry = queue_registry.get(data.report_id)
+    if entry is not None and entry.state == WAITING and entry.data is not data:
+        # Durable queue: a resubmission may have updated the registry after this job was claimed
+        data.s3_url = entry.data.s3_url
+    queue_registry.start(data.report_id, worker_id)
+
+async def pipeline_finished(data, success: bool, seconds: float = 0.0):
+    await queue_done(data, success, seconds)
+    task_queue.task_done()
 
-            logger.info(f"📤 [Worker-{worker_id}] Sending to {env.upper()} webhook: {api_url}")
-            logger.info(f"📦 [Worker-{worker_id}] Payload: report_id={data.report_id}, user_id={data.user_id}, app_class={result['app_class']}")
-            
-            try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.post(api_url, json=payload, headers=headers)
-                    logger.info(f"✅ Webhook response: {response.status_code} - {response.text[:200]}")
-                    
-                    if response.status_code == 200:
-                        logger.info(f"✓ [Worker-{worker_id}] Successfully sent OCR result for report {data.report_id}")
-                    else:
-                        logger.warning(f"⚠ [Worker-{worker_id}] Webhook returned non-200 status: {response.status_code}")
-                        
-            except (httpx.ConnectError, httpx.TimeoutException) as e:
-                logger.error(f"🔌 [Worker-{worker_id}] Webhook failed: {e}")
-                # Don't raise - continue processing
-            except Exception as e:
-                logger.error(f"❌ [Worker-{worker_id}] Unexpected webhook error: {e}")
-                # Don't raise - continue processing
+async def pipeline_discarded(data):
+    """A superseded job: ack it, but leave the registry entry to the newer submission"""
+    task_queue.ack(data)
+    task_queue.task_done()
 
-            logger.info(f"✓ [Worker-{worker_id}] Completed OCR for report {data.report_id}")
-            await queue_done(data, success=True)
-        except Exception as e:
-            logger.error(f"✘ [Worker-{worker_id}] Error: {e}")
-            await queue_done(data, success=False)
-        finally:
-            task_queue.task_done()
+async def deliver_result(data, result: dict):
+    # Delivery happens in the webhook dispatcher; the pipeline is free for the next report
+    await webhook_dispatcher.submit(data, result)
+    logger.info(f"📦 Queued result for {environment_of(data).upper()} webhook: report_id={data.report_id}, user_id={data.user_id}, app_class={result['app_class']}")
 
 @asynccontextmanager
 async def lifespan(app):
-    global queue_list
-    queue_list.clear()
-    workers = []
-    worker_count = config("WORKER_COUNT", cast=int, default=3)
-    logger.info(f"🚀 Starting {worker_count} OCR workers...")
-    for i in range(worker_count):
-        workers.append(asyncio.create_task(ocr_worker(i+1)))
+    queue_registry.clear()
+    # Reports left over from the previous process (durable queue only)
+    for data in task_queue.recover():
+        queue_registry.add(data)
+    
+    async def start_workers():
+        # Model load + warm-up first; /ready answers 503 until this finishes
+        try:
+            await asyncio.to_thread(load_and_warm_up)
+        except Exception:
+            logger.error("❌ OCR workers not started: model failed to load")
+            return
+        # download -> decode -> preprocess -> infer -> extract -> deliver, see pipeline
+        pipeline = start_pipeline(task_queue.get, pipeline_started, pipeline_finished, deliver_result,
+                                  current=is_current, discarded=pipeline_discarded)
+        start_autoscaler(pipeline, task_queue.qsize)
+    
+    webhook_dispatcher.start()
+    startup = asyncio.create_task(start_workers())
     yield
-    for worker in workers:
-        worker.cancel()
+    startup.cancel()
+    stop_autoscaler()
+    stop_pipeline()
+    await webhook_dispatcher.stop()
+    await close_client()
+    task_queue.close()
+    await asyncio.to_thread(stop_scheduler)
+    if ocr_pool is not None:
+        ocr_pool.shutdown()
+    release_reader()
+    release_local_reader()
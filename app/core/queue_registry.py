@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Optional
+
+WAITING = "waiting"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+@dataclass
+class QueueEntry:
+    data: Any
+    state: str = WAITING
+    enqueued_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    worker_id: Optional[int] = None
+
+    def describe(self) -> dict:
+        return {
+            "report_id": self.data.report_id,
+            "user_id": self.data.user_id,
+            "img_url": self.data.s3_url,
+            "state": self.state,
+            "enqueued_at": self.enqueued_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "worker_id": self.worker_id
+        }
+
+class QueueRegistry:
+    """
+    Reports known to the queue, keyed by report_id.
+
+    Active (waiting/processing) entries live in an insertion-ordered dict so lookup,
+    state changes and removal are O(1); finished entries move to a bounded history.
+    Per-state counts are kept alongside so status never has to walk the entries.
+    """
+
+    def __init__(self, history_size: int = 100):
+        self.active = OrderedDict()
+        self.history = OrderedDict()
+        self.history_size = history_size
+        self.counts = {WAITING: 0, PROCESSING: 0, DONE: 0, FAILED: 0}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(report_id) -> str:
+        return str(report_id)
+
+    def get(self, report_id) -> Optional[QueueEntry]:
+        return self.active.get(self.key(report_id))
+
+    def __contains__(self, report_id) -> bool:
+        return self.key(report_id) in self.active
+
+    def __len__(self) -> int:
+        return len(self.active)
+
+    def add(self, data) -> QueueEntry:
+        entry = QueueEntry(data=data, enqueued_at=time.time())
+        with self.lock:
+            key = self.key(data.report_id)
+            previous = self.active.pop(key, None)
+            if previous is not None:
+                self.counts[previous.state] -= 1
+            self.active[key] = entry
+            self.counts[WAITING] += 1
+        return entry
+
+    def start(self, report_id, worker_id: int) -> Optional[QueueEntry]:
+        with self.lock:
+            entry = self.active.get(self.key(report_id))
+            if entry is None or entry.state != WAITING:
+                return entry
+            self.counts[WAITING] -= 1
+            self.counts[PROCESSING] += 1
+            entry.state = PROCESSING
+            entry.started_at = time.time()
+            entry.worker_id = worker_id
+            return entry
+
+    def finish(self, report_id, success: bool = True) -> Optional[QueueEntry]:
+        """Move an active entry to the history as done/failed"""
+        with self.lock:
+            key = self.key(report_id)
+            entry = self.active.pop(key, None)
+            if entry is None:
+                return None
+            self.counts[entry.state] -= 1
+            entry.state = DONE if success else FAILED
+            entry.finished_at = time.time()
+            self.counts[entry.state] += 1
+            self.history.pop(key, None)
+            self.history[key] = entry
+            while len(self.history) > self.history_size:
+                self.history.popitem(last=False)
+            return entry
+
+    def clear(self) -> int:
+        with self.lock:
+            count = len(self.active)
+            self.active.clear()
+            self.counts[WAITING] = self.counts[PROCESSING] = 0
+            return count
+
+    def page(self, offset: int = 0, limit: int = 20, state: str = None) -> list:
+        """Entries in submission order; finished ones (newest last) follow the active ones"""
+        with self.lock:
+            if state in (DONE, FAILED):
+                entries = (e for e in self.history.values() if e.state == state)
+            elif state is not None:
+                entries = (e for e in self.active.values() if e.state == state)
+            else:
+                entries = (e for source in (self.active, self.history) for e in source.values())
+            return [e.describe() for e in islice(entries, max(0, offset), max(0, offset) + max(0, limit))]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "tracked": len(self.active),
+                "waiting": self.counts[WAITING],
+                "processing": self.counts[PROCESSING],
+                "done": self.counts[DONE],
+                "failed": self.counts[FAILED],
+                "history_size": len(self.history)
+            }
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+from decouple import config
+from app.core.config import settings
+from app.core import preprocess, step_refine, layout_templates, anchored_ocr
+from app.core.step_patterns import STEP_MAX_PLAUSIBLE
+from app.core.model_bundle import describe_bundle
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+RESULT_CACHE_ENABLED = config("RESULT_CACHE_ENABLED", cast=bool, default=True)
+RESULT_CACHE_MAX_ITEMS = config("RESULT_CACHE_MAX_ITEMS", cast=int, default=2000)
+RESULT_CACHE_TTL_SECONDS = config("RESULT_CACHE_TTL_SECONDS", cast=int, default=7 * 24 * 3600)
+RESULT_CACHE_DIR = config("RESULT_CACHE_DIR", default="")
+RESULT_CACHE_DISK_MAX_MB = config("RESULT_CACHE_DISK_MAX_MB", cast=int, default=256)
+
+# Only the OCR outcome is cached; timing is recomputed per request
+CACHED_FIELDS = ("raw_ocr", "extracted_data", "app_class", "app_confidence")
+
+def settings_fingerprint() -> str:
+    """Hash of everything besides the image that changes an OCR result (version, preprocessing, ROI templates, model bundle...)"""
+    h = hashlib.blake2b(digest_size=12)
+    h.update(repr((
+        settings.APP_VERSION,
+        preprocess.OCR_RESIZE_MODE, preprocess.OCR_TARGET_GLYPH_HEIGHT, preprocess.OCR_MIN_SCALE,
+        preprocess.OCR_MAX_SCALE, preprocess.OCR_REFERENCE_WIDTH, preprocess.OCR_STAGES,
+        preprocess.OCR_GRAY_STAGE_WIDTH, preprocess.OCR_CONTRAST_CLIP_LIMIT,
+        step_refine.STEP_REFINE_ENABLED, step_refine.STEP_REFINE_MIN_CONF, step_refine.STEP_REFINE_SCALE,
+        STEP_MAX_PLAUSIBLE,
+        anchored_ocr.OCR_RECOGNITION_MODE, anchored_ocr.ANCHOR_MIN_ASPECT, anchored_ocr.ANCHOR_MAX_ASPECT,
+        anchored_ocr.ANCHOR_NEIGHBOUR_RADIUS,
+        layout_templates.LAYOUT_ROI_ENABLED, layout_templates.LAYOUT_ASPECT_TOLERANCE,
+        # Bundle weights are not quantized like stock EasyOCR on CPU, so recognition can differ
+        describe_bundle().get("version")
+    )).encode())
+    templates_path = Path(layout_templates.LAYOUT_TEMPLATES_PATH)
+    if layout_templates.LAYOUT_ROI_ENABLED and templates_path.is_file():
+        h.update(templates_path.read_bytes())
+    return h.hexdigest()
+
+# Computed once: settings are read at import and the templates file is loaded once per process
+SETTINGS_FINGERPRINT = settings_fingerprint()
+
+class OCRResultCache:
+    """Two-tier OCR result cache keyed by a hash of the decoded image bytes"""
+
+    def __init__(self, max_items: int, ttl_seconds: int, disk_dir: str = "", disk_max_bytes: int = 0):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lookup_ns = 0
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_index = OrderedDict()  # key -> (size, mtime), oldest first
+        self.disk_bytes = 0
+        if self.disk_dir:
+            self._load_disk_index()
+
+    @staticmethod
+    def key_for(img: np.ndarray) -> str:
+        # Settings prefix keeps old entries (disk tier included) from surviving a pipeline or config change
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"{SETTINGS_FINGERPRINT}|{img.shape}|{img.dtype}".encode())
+        h.update(np.ascontiguousarray(img).data)
+        return h.hexdigest()
+
+    def get(self, key: str):
+        started = time.perf_counter_ns()
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self.memory.move_to_end(key)
+                    self.hits += 1
+                    self.lookup_ns += time.perf_counter_ns() - started
+                    return value
+                del self.memory[key]
+
+        value = self._disk_get(key, now) if self.disk_dir else None
+        with self.lock:
+            if value is not None:
+                self.disk_hits += 1
+                self._memory_put(key, value, now)
+            else:
+                self.misses += 1
+            self.lookup_ns += time.perf_counter_ns() - started
+        return value
+
+    def put(self, key: str, result: dict):
+        value = {field: result[field] for field in CACHED_FIELDS}
+        now = time.time()
+        with self.lock:
+            self._memory_put(key, value, now)
+        if self.disk_dir:
+            self._disk_put(key, value)
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "enabled": True,
+                "memory_items": len(self.memory),
+                "memory_capacity": self.max_items,
+                "disk_enabled": self.disk_dir is not None,
+                "disk_items": len(self.disk_index),
+                "disk_usage_mb": round(self.disk_bytes / 1024 / 1024, 2),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": f"{(self.hits + self.disk_hits) / lookups * 100:.1f}%" if lookups else "0.0%",
+                "avg_lookup_us": round(self.lookup_ns / lookups / 1000, 1) if lookups else 0
+            }
+
+    def _memory_put(self, key: str, value: dict, now: float):
+        self.memory[key] = (now, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_items:
+            self.memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _load_disk_index(self):
+        self.disk_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.disk_dir.glob("*/*.json"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for mtime, key, size in sorted(entries):
+            self.disk_index[key] = (size, mtime)
+            self.disk_bytes += size
+        logger.info(f"✓ Result cache disk tier: {len(self.disk_index)} entries in {self.disk_dir}")
+
+    def _disk_get(self, key: str, now: float):
+        with self.lock:
+            meta = self.disk_index.get(key)
+        if meta is None:
+            return None
+        if now - meta[1] > self.ttl_seconds:
+            self._disk_remove(key)
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠ Result cache: dropping unreadable entry {key}: {e}")
+            self._disk_remove(key)
+            return None
+
+    def _disk_put(self, key: str, value: dict):
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+            size = path.stat().st_size
+        except OSError as e:
+            logger.warning(f"⚠ Result cache: failed to write {key}: {e}")
+            return
+        with self.lock:
+            old = self.disk_index.pop(key, None)
+            if old:
+                self.disk_bytes -= old[0]
+            self.disk_index[key] = (size, time.time())
+            self.disk_bytes += size
+            # Oldest entries first: drop until under budget and the rest are fresh
+            evict = []
+            remaining = self.disk_bytes
+            now = time.time()
+            for old_key, (old_size, mtime) in self.disk_index.items():
+                if remaining <= self.disk_max_bytes and now - mtime <= self.ttl_seconds:
+                    break
+                evict.append(old_key)
+                remaining -= old_size
+        for old_key in evict:
+            self._disk_remove(old_key)
+
+    def _disk_remove(self, key: str):
+        with self.lock:
+            meta = self.disk_index.pop(key, None)
+            if meta:
+                self.disk_bytes -= meta[0]
+        try:
+            self._disk_path(key).unlink()
+        except OSError:
+            pass
+
+result_cache = OCRResultCache(
+    max_items=RESULT_CACHE_MAX_ITEMS,
+    ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+    disk_dir=RESULT_CACHE_DIR,
+    disk_max_bytes=RESULT_CACHE_DISK_MAX_MB * 1024 * 1024
+) if RESULT_CACHE_ENABLED else None
+
+def get_cache_stats() -> dict:
+    if result_cache is None:
+        return {"enabled": False}
+    return result_cache.stats()
@@ -0,0 +1,104 @@
+import re
+from typing import List, NamedTuple
+
+# One pass over the OCR text: every digit run, plus the unit that follows it (if any).
+# The unit is captured in a lookahead so the scan still yields every digit run.
+# km/cm are case-sensitive, the rest are not -- same as the per-field regexes they replace.
+TOKEN_RE = re.compile(
+    r"(\d+)(?:(?=\s*(?:(km)|(cm)|(?i:(kcal|ca))|(?i:(bpm))|(?i:((?:deeps|steps)/min))))|)"
+)
+UNITS = (None, 'km', 'cm', 'kcal', 'bpm', 'steps/min')
+DATE_RE = re.compile(r'(\d{1,2})\s+(\w+)\s+(\d{4})\s+at\s+(\d{1,2}\.\d{2})')
+AT_RE = re.compile(r'\s+at\s')
+
+class Token(NamedTuple):
+    text: str
+    start: int
+    end: int
+    unit: str
+
+def tokenize(text: str) -> List[Token]:
+    tokens = []
+    for m in TOKEN_RE.finditer(text):
+        # lastindex is the unit's group when one matched, otherwise 1 -> UNITS[0] = None
+        tokens.append(Token(m.group(1), m.start(), m.end(1), UNITS[m.lastindex - 1]))
+    return tokens
+
+def _char(text: str, index: int) -> str:
+    return text[index] if index < len(text) else ''
+
+def _joined(text: str, left: Token, right: Token, separators: str) -> bool:
+    """right follows left after exactly one separator character"""
+    return right.start == left.end + 1 and _char(text, left.end) in separators
+
+def extract_secondary_fields(text: str, duration_separators: str = ':.', duration_separator_required: bool = False) -> dict:
+    """
+    Date, distance, duration, calories, pace, speed, cadence, stride and heart rate from
+    a single token stream. Each resolver reproduces the leftmost match of the regex it
+    replaced (noted per field), so the output is the same as running them one by one.
+    """
+    tokens = tokenize(text)
+    data = {}
+
+    # (\d{1,2})\s+(\w+)\s+(\d{4})\s+at\s+(\d{1,2}\.\d{2}) -- needs a 4-digit run followed by " at ",
+    # and can only start on a run's last 1-2 digits
+    has_year = any(len(t.text) == 4 and AT_RE.match(text, t.end) for t in tokens)
+    for token in tokens if has_year else ():
+        starts = (token.end - 2, token.end - 1) if len(token.text) >= 2 else (token.end - 1,)
+        m = next((m for m in (DATE_RE.match(text, s) for s in starts) if m), None)
+        if m:
+            data['date'] = f"{m.group(1)} {m.group(2)} {m.group(3)} at {m.group(4)}"
+            break
+
+    # (\d+[,\.]\d+)\s*km -- first as distance, second (findall) as speed
+    decimals_km = [text[left.start:right.end] for left, right in zip(tokens, tokens[1:])
+                   if right.unit == 'km' and _joined(text, left, right, ',.')]
+    if decimals_km:
+        data['distance'] = f"{decimals_km[0]} km"
+
+    # (\d{2}):(\d{2})[:\.]?(\d{2})  (or a required [:\.?] for the local pipeline)
+    for i in range(len(tokens) - 1):
+        hours, minutes = tokens[i], tokens[i + 1]
+        if len(hours.text) < 2 or len(minutes.text) < 2 or not _joined(text, hours, minutes, ':'):
+            continue
+        seconds = None
+        if len(minutes.text) >= 4 and not duration_separator_required:
+            seconds = minutes.text[2:4]
+        elif len(minutes.text) == 2 and i + 2 < len(tokens):
+            nxt = tokens[i + 2]
+            if len(nxt.text) >= 2 and _joined(text, minutes, nxt, duration_separators):
+                seconds = nxt.text[:2]
+        if seconds is not None:
+            data['duration'] = f"{hours.text[-2:]}:{minutes.text[:2]}:{seconds}"
+            break
+
+    # (\d+)\s*(?:ca|kcal)
+    token = next((t for t in tokens if t.unit == 'kcal'), None)
+    if token:
+        data['total_calories'] = f"{token.text} kcal"
+
+    # (\d+)'(\d+)"
+    for left, right in zip(tokens, tokens[1:]):
+        if _joined(text, left, right, "'") and _char(text, right.end) == '"':
+            data['avg_pace'] = f"{left.text}'{right.text}\" /km"
+            break
+
+    if len(decimals_km) > 1:
+        data['avg_speed'] = f"{decimals_km[1]} km/h"
+
+    # (\d{2,3})\s*(?:deeps|steps)/min -- a longer run matches on its last 3 digits
+    token = next((t for t in tokens if t.unit == 'steps/min' and len(t.text) >= 2), None)
+    if token:
+        data['avg_cadence'] = f"{token.text[-3:]} steps/min"
+
+    # (\d+)\s*cm
+    token = next((t for t in tokens if t.unit == 'cm'), None)
+    if token:
+        data['avg_stride'] = f"{token.text} cm"
+
+    # (\d{2,3})\s*bpm
+    token = next((t for t in tokens if t.unit == 'bpm' and len(t.text) >= 2), None)
+    if token:
+        data['avg_heart_rate'] = f"{token.text[-3:]} bpm"
+
+    return data
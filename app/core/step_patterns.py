@@ -0,0 +1,262 @@
+import re
+import threading
+from decouple import config
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Reorder interchangeable patterns (same `group`) by observed hit count
+STEP_PATTERN_ADAPTIVE = config("STEP_PATTERN_ADAPTIVE", cast=bool, default=False)
+STEP_PATTERN_REORDER_EVERY = config("STEP_PATTERN_REORDER_EVERY", cast=int, default=500)
+# Readings above this are two numbers run together by OCR, not a day's steps
+STEP_MAX_PLAUSIBLE = config("STEP_MAX_PLAUSIBLE", cast=int, default=60000)
+# Lowest min_steps any pattern accepts
+STEP_MIN_PLAUSIBLE = 50
+
+def normalize_number(num_str: str) -> int:
+    """Convert string number to int"""
+    return int(num_str.replace('.', '').replace(',', '').replace(' ', ''))
+
+def decimal_thousands(num_str: str):
+    """'17.02' -> 17020: OCR dropped a digit of '17.102'; only for exactly two decimals"""
+    parts = num_str.replace(',', '.').replace(' ', '').split('.')
+    if len(parts) == 2 and len(parts[1]) == 2:
+        return int(parts[0]) * 1000 + int(parts[1]) * 10
+    return None
+
+NORMALIZERS = {
+    "number": normalize_number,
+    "int": int,
+    "decimal_thousands": decimal_thousands,
+}
+
+class StepPattern:
+    """
+    One step-count regex.
+
+    `needs` lists lowercase literals the regex cannot match without (a tuple inside
+    means any one of them); they are checked with `in` before the regex runs.
+    Patterns sharing a `group` never match the same screen (e.g. language variants),
+    so adaptive mode may reorder them without changing results.
+    """
+    __slots__ = ("name", "regex", "normalizer", "min_steps", "needs", "group", "example", "tried", "hits")
+
+    def __init__(self, pattern: str, normalizer: str = "number", min_steps: int = 100, needs=(),
+                 flags: int = re.I, group: str = None, example: str = ""):
+        self.name = None
+        self.regex = re.compile(pattern, flags)
+        self.normalizer = NORMALIZERS[normalizer]
+        self.min_steps = min_steps
+        self.needs = [n if isinstance(n, tuple) else (n,) for n in ((needs,) if isinstance(needs, str) else needs)]
+        self.group = group
+        self.example = example
+        self.tried = 0
+        self.hits = 0
+
+    def extract(self, text: str, text_lower: str):
+        for alternatives in self.needs:
+            if not any(literal in text_lower for literal in alternatives):
+                return None
+        self.tried += 1
+        m = self.regex.search(text)
+        if not m:
+            return None
+        steps = self.normalizer(m.group(1))
+        if steps is None or steps < self.min_steps:
+            return None
+        self.hits += 1
+        return steps
+
+P = StepPattern
+
+# Ordered per app: the first pattern producing a plausible count wins.
+# (Patterns that were fully shadowed by an earlier, broader one have been dropped.)
+STEP_PATTERNS = {
+    'Apple Health': [
+        P(r'Summary Steps\s+Add Data.*?TOTAL\s+(\d{1,2}[\., ]\d{3})', needs='summary steps',
+          example='Summary Steps Add Data W M 6M TOTAL 15.226'),
+        P(r'Steps\s+Distance\s+(\d{2}[\.,]\d{2})\s+\d{1,2}[\.,]\d+KM', 'decimal_thousands', needs='distance',
+          example='Steps Distance 17.02 12,83KM (OCR error: 17.102 -> 17.02)'),
+        P(r'Step Count\s+Step Distance\s+Today\s+Today\s+(\d{1,2}[\., ]\d{3})\s+\d', needs='step count', group='today_total',
+          example='Step Count Step Distance Today Today 10.818 7,42KM'),
+        P(r'Langkah\s+Jarak\s+(?:Langk__\s+)?Hari Ini\s+Hari Ini\s+(\d{1,2}[\., ]\d{3})\s+\d', needs='hari ini', group='today_total',
+          example='Langkah Jarak Hari Ini Hari Ini 15.076 13,04KM'),
+        P(r'Steps\s+Distance\s+(\d{1,2}[\., ]\d{3})\s+\d{1,2}[\.,]\d+', needs='distance',
+          example='Steps Distance 17.102 12,83KM'),
+        P(r'TOTAL\s+(\d{1,2}[\., ]\d{3})\s+steps', needs='total',
+          example='TOTAL 15.226 steps'),
+        P(r'Hari Ini\s+Hari Ini\s+(\d{1,2}[\., ]\d{3})', needs='hari ini',
+          example='Hari Ini Hari Ini 1.045 0,67KM'),
+        P(r'Langkah\s+Jarak\s+(\d{1,2}[\., ]\d{3})', needs='jarak',
+          example='Langkah Jarak 2.802 1,83KM'),
+        P(r'Steps\s+Distance\s+(\d{1,2}[\., ]\d{3})', needs='distance',
+          example='Steps Distance 17.102'),
+        P(r'(?:Langkah|Steps)\s+\d{2}\.\d{2}\s+(\d{1,2}[\., ]\d{3})', needs=[('langkah', 'steps')],
+          example='Langkah 16.56 1.836langkah / Steps 13.30 1.990 steps'),
+        P(r'\b(\d{3})\s+0[\.,]\d+\s*k[Mm]', 'int', flags=0,
+          example='640 0,47kM'),
+        P(r'\b(\d{3})\s+(?:langkah|0[\.,]\d+\s*km)', 'int', needs=[('langkah', 'km')],
+          example='646 langkah / 736 0,46km'),
+        P(r'Today\s+Today\s+(\d{1,2}[\., ]\d{3})\s+\d', needs='today',
+          example='Today Today 10.818 7,42km'),
+        P(r'Today\s+(\d{1,2}[\., ]\d{3})\s+\d', needs='today',
+          example='Today 14.578 9,99kM'),
+    ],
+    'Google Fit': [
+        P(r'(\d{1,2}[\., ]\d{3})\s*(?:Kcart|Hcart)\s+Pis', needs='pis',
+          example='2,566 Kcart Pis (OCR error for Heart Pts)'),
+        P(r'(\d{3})\s+Heart\s+Pts', 'int', needs='heart',
+          example='589 Heart Pts'),
+        P(r'(\d{2}[\., ,]\d{3})\s+Heart\s+Pts', needs='heart',
+          example='16,331 Heart Pts'),
+        P(r'(\d{1,2}[\., ]\d{3})\s*(?:Heart|Hcart|Poin Kardio)', needs=[('heart', 'hcart', 'poin kardio')],
+          example='2,566 Heart Pts / 2,566 Poin Kardio'),
+        P(r'(?:Steps|Stops|Langkah)\s+(\d{1,2}[\.,]\d{3})', needs=[('steps', 'stops', 'langkah')],
+          example='Steps 1,571 / Stops 1.,602'),
+    ],
+    'Huawei Health': [
+        P(r'Kemajuan target\s+Edit\s+(\d{1,2}[\., ]\d{3})\s*/\s*\d', needs='kemajuan target', group='goal_progress',
+          example='Kemajuan target Edit 3.011/10.000 langkah'),
+        P(r'Goal progress\s+Edit\s+(\d{1,2}[\., ]\d{3})\s*/\s*\d', needs='goal progress', group='goal_progress',
+          example='Goal progress Edit 16.452/10.000 steps'),
+        P(r'(\d{1,2}[\., ]\d{3})\s*langkah\s+\d{1,4}\s+\d{2,4}\s+\d{2,4}\s+\d{2,4}', needs='langkah',
+          example='6.170 langkah 0 100 200 300'),
+        P(r'Today\'?s steps\s+(\d{1,2}[\., ]\d{3})\s*/\s*\d', needs=[("today's steps", 'todays steps')],
+          example="Today's steps 8,376/4,000 steps"),
+        P(r'Today\'?s steps\s+(\d{3,5})\s+/', 'int', needs=[("today's steps", 'todays steps')],
+          example="Today's steps 395 /10.000 steps"),
+        P(r'Todays steps\s+(\d{1,2}[\., ]\d{3})\s*/', needs='todays steps',
+          example='Todays steps 3,540/'),
+        P(r'Langkah\s+Jarak\s+(?:Naik tangga\s+)?(\d{1,2}[\., ]\d{3})\s*langkah', needs='jarak', group='detail_page',
+          example='Langkah Jarak Naik tangga 5.684 langkah'),
+        P(r'Distance\s+(?:Stair climbing\s+)?(\d{1,2}[\., ]\d{3})\s*steps', needs='distance', group='detail_page',
+          example='Distance Stair climbing 2.637 steps'),
+        P(r'(\d{1,2}[\., ]\d{3})\s*steps', needs='steps',
+          example='9,708 steps'),
+        P(r'Langkah hari ini\s+(\d{1,2}[\., ]\d{3})\s*/\s*\d', needs='langkah hari ini',
+          example='Langkah hari ini 5.117/10.000 langkah'),
+        P(r'Langkah hari ini\s+(\d{3,5})\s*/\s*\d', 'int', needs='langkah hari ini',
+          example='Langkah hari ini 824/7.000 langkah'),
+        P(r'Stress\s+\d+\s+(\d{3,5})\s+Wake', 'int', needs=['stress', 'wake'],
+          example='Steps Mood 05.06 Stress 50 735 Wake'),
+        P(r'\b(\d{3,5})\s+Wake', 'int', needs=[("today's steps", 'todays steps'), 'wake'],
+          example="Today's steps without a number; count found next to Wake"),
+        P(r'Add record\s+(\d{1,2}[\., ]\d{3})', needs='add record',
+          example='Add record 8,376 steps Normal'),
+    ],
+    'Samsung Health': [
+        P(r'Samsung Health\s+(\d{2,3})\s*langkah', 'int', min_steps=50, needs='samsung health',
+          example='Samsung Health 77 langkah'),
+        P(r'Samsung Health\s+[A-Z]\s+(\d{1,2}[\., ]\d{3})\s*langkah', min_steps=50, needs='samsung health',
+          example='Samsung Health A 1.035 langkah 10 menit 41kkal'),
+        P(r'(?:Langkah|Steps)\s+(?:Waktu aktif|Active time)\s+(?:Kalori aktivitas|Activity calories)\s+(\d{1,2}[\., ]\d{3})\s+\d+\s+\d+',
+          min_steps=50, needs=[('waktu aktif', 'active time')],
+          example='Steps Active time Activity calories 7.492 63 299'),
+        P(r'Samsung Health\s+(\d{1,5})\s*langkah', 'int', needs='samsung health',
+          example='Samsung Health 77 langkah'),
+        P(r'Edit home\s+(\d{1,2}[\., ]\d{3})\s*steps', needs='edit home',
+          example='Edit home 2,680 steps'),
+        P(r'(?:Langkah|Steps)\s+(?:Waktu aktif|Active time)\s+(?:Kalori aktivitas|Activity calories)\s+(\d{3,5})\s+\d+\s+\d+',
+          'int', needs=[('waktu aktif', 'active time')],
+          example='Steps Active time Activity calories 725 8 28'),
+        P(r'(\d{1,2}[\., ]\d{3})\s+\d+%\s*/\s*\d', needs='%',
+          example='1,862 37% /5,000 steps'),
+        P(r'(\d{1,2}[\., ]\d{3})\s+(?:Ingkh|langkah)\s+Target', needs='target',
+          example='7.492 Ingkh Target: 10.000'),
+        P(r'Active time\s+Activity calories\s+(\d{1,2}[\., ]\d{3})\s+\d+\s+\d+', needs='activity calories',
+          example='Active time Activity calories 13,130 98 941'),
+        P(r'(\d[\., ]\d{3})\s+Ingkh', needs='ingkh',
+          example='7.492 Ingkh'),
+    ],
+    'Fitbit': [
+        P(r'(\d{1,2}[\., ]\d{3})\s*Langkah', needs='langkah',
+          example='6.123 Langkah'),
+        P(r'fitbit.*?(\d{1,2}[\., ]\d{3})', needs='fitbit', flags=re.I | re.DOTALL,
+          example='fitbit ... 6,123'),
+        P(r'Today\s+(\d{1,2}[\., ]\d{3})\s*Steps', needs='today',
+          example='Today 6,123 Steps'),
+    ],
+    'Garmin Connect': [
+        P(r'(\d{1,2}[\., ]\d{3})\s+\d[\., ]\d{3}\s+\d+%\s+of\s+Goal', needs='goal',
+          example='9,920 5,000 198% of Goal'),
+        P(r'November\s+(\d{1,2}[\., ]\d{3})\s+\d', needs='november',
+          example='November 9,920 5,000'),
+    ],
+}
+
+# Tried for every app after its own list
+FALLBACK_PATTERNS = [
+    P(r'(\d{1,2}[\., ]\d{3})\s*(?:steps|langkah)', needs=[('steps', 'langkah')],
+      example='1,234 steps'),
+    P(r'\b(\d{2,5})\s*(?:steps|langkah)', 'int', needs=[('steps', 'langkah')],
+      example='401steps'),
+]
+
+for app_name, patterns in list(STEP_PATTERNS.items()) + [('fallback', FALLBACK_PATTERNS)]:
+    for i, pattern in enumerate(patterns, 1):
+        pattern.name = f"{app_name.lower().replace(' ', '_')}.{i}"
+
+class StepPatternRegistry:
+    def __init__(self, patterns: dict, fallback: list, adaptive: bool = STEP_PATTERN_ADAPTIVE,
+                 reorder_every: int = STEP_PATTERN_REORDER_EVERY):
+        self.patterns = {app: list(p) for app, p in patterns.items()}
+        self.fallback = list(fallback)
+        self.adaptive = adaptive
+        self.reorder_every = max(1, reorder_every)
+        self.extractions = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def extract(self, text: str, app: str):
+        self.extractions += 1
+        if self.adaptive and self.extractions % self.reorder_every == 0:
+            self.reorder()
+        text_lower = text.lower()
+        for pattern in self.patterns.get(app, ()):
+            steps = pattern.extract(text, text_lower)
+            if steps is not None:
+                return steps
+        for pattern in self.fallback:
+            steps = pattern.extract(text, text_lower)
+            if steps is not None:
+                return steps
+        self.misses += 1
+        return None
+
+    def reorder(self):
+        """Sort each run of same-group patterns by hits; ungrouped patterns keep their slot"""
+        with self.lock:
+            for app, patterns in self.patterns.items():
+                ordered, run = [], []
+                for pattern in patterns + [None]:
+                    if run and (pattern is None or pattern.group is None or pattern.group != run[0].group):
+                        ordered.extend(sorted(run, key=lambda p: -p.hits))
+                        run = []
+                    if pattern is not None:
+                        (run if pattern.group else ordered).append(pattern)
+                # Swap the list in one assignment; readers iterate the old one safely
+                self.patterns[app] = ordered
+
+    def stats(self) -> dict:
+        def describe(pattern):
+            return {"name": pattern.name, "example": pattern.example, "tried": pattern.tried, "hits": pattern.hits}
+        return {
+            "adaptive": self.adaptive,
+            "extractions": self.extractions,
+            "misses": self.misses,
+            "apps": {app: [describe(p) for p in patterns] for app, patterns in self.patterns.items()},
+            "fallback": [describe(p) for p in self.fallback]
+        }
+
+step_patterns = StepPatternRegistry(STEP_PATTERNS, FALLBACK_PATTERNS)
+
+def extract_steps(text: str, app: str) -> int:
+    """Extract step number using app-specific patterns"""
+    return step_patterns.extract(text, app)
+
+def is_plausible(steps) -> bool:
+    """Whether a step count (from layout or patterns) is worth returning without another OCR pass"""
+    return steps is not None and STEP_MIN_PLAUSIBLE <= steps <= STEP_MAX_PLAUSIBLE
+
+def get_pattern_stats() -> dict:
+    return step_patterns.stats()
@@ -0,0 +1,106 @@
+import re
+import cv2
+import numpy as np
+from decouple import config
+from app.core import metrics
+from app.core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Re-read the box the step count came from when the full-frame pass was unsure about it
+STEP_REFINE_ENABLED = config("STEP_REFINE_ENABLED", cast=bool, default=True)
+# Boxes recognized below this confidence are re-read
+STEP_REFINE_MIN_CONF = config("STEP_REFINE_MIN_CONF", cast=float, default=0.7)
+# Upscale applied to the crop (relative to the original image, not the OCR input)
+STEP_REFINE_SCALE = config("STEP_REFINE_SCALE", cast=float, default=3.5)
+
+DIGIT_ALLOWLIST = '0123456789., '
+# Padding around the box, in box heights
+CROP_PADDING = 0.3
+
+NUMERIC_BOX_RE = re.compile(r'[\d][\d., ]*')
+GROUP_RE = re.compile(r'[., ]')
+
+def _digits(text: str) -> str:
+    return text.replace(',', '').replace('.', '').replace(' ', '')
+
+def is_ambiguous(text: str) -> bool:
+    """
+    Separator that doesn't read as one clean thousands mark: a space ("1 035"), mixed
+    marks ("1.035,2") or a group that isn't 3 digits ("1.03", "10.350").
+    """
+    text = text.strip()
+    separators = set(GROUP_RE.findall(text))
+    if not separators:
+        return False
+    if ' ' in separators or len(separators) > 1:
+        return True
+    groups = GROUP_RE.split(text)
+    return not (1 <= len(groups[0]) <= 2 and all(len(g) == 3 for g in groups[1:]))
+
+def find_step_box(results: list, steps: int):
+    """Index of the purely numeric box that reads as steps, or None"""
+    target = str(steps)
+    for i, (_, text, _) in enumerate(results):
+        text = text.strip()
+        if NUMERIC_BOX_RE.fullmatch(text) and _digits(text) == target:
+            return i
+    return None
+
+def _crop(img: np.ndarray, bbox, scale: float) -> np.ndarray:
+    """Grey crop of the original (BGR) image around an OCR box given in scaled coordinates"""
+    pts = np.asarray(bbox, dtype=np.float32).reshape(-1, 2) / scale
+    x0, y0 = pts.min(axis=0)
+    x1, y1 = pts.max(axis=0)
+    pad = (y1 - y0) * CROP_PADDING
+    height, width = img.shape[:2]
+    x0, y0 = max(int(x0 - pad), 0), max(int(y0 - pad), 0)
+    x1, y1 = min(int(x1 + pad) + 1, width), min(int(y1 + pad) + 1, height)
+    crop = img[y0:y1, x0:x1]
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(crop, None, fx=STEP_REFINE_SCALE, fy=STEP_REFINE_SCALE, interpolation=cv2.INTER_CUBIC)
+
+def refine_step_box(reader, img: np.ndarray, scale: float, results: list, steps: int):
+    """
+    Re-recognize the step candidate's box at STEP_REFINE_SCALE with a digits-only allowlist
+    when its confidence is low or its separator is ambiguous.
+
+    img is the original BGR image and scale the factor the OCR input was resized by.
+    Returns the results with that box replaced, or None when nothing needed (or survived)
+    re-reading.
+    """
+    if not STEP_REFINE_ENABLED or not steps:
+        return None
+    index = find_step_box(results, steps)
+    if index is None:
+        return None
+    bbox, text, conf = results[index]
+    if conf >= STEP_REFINE_MIN_CONF and not is_ambiguous(text):
+        return None
+
+    crop = _crop(img, bbox, scale)
+    if crop.size == 0:
+        return None
+    y_max, x_max = crop.shape[:2]
+    recognized = reader.recognize(crop, horizontal_list=[[0, x_max, 0, y_max]], free_list=[],
+                                  allowlist=DIGIT_ALLOWLIST, reformat=False)
+    if not recognized:
+        metrics.inc("step_refine_total", outcome="empty")
+        return None
+    _, new_text, new_conf = recognized[0]
+    new_text = new_text.strip()
+    new_digits = _digits(new_text)
+
+    # Only trust the re-read if it is a step-sized number and more confident than the original
+    if not (new_digits.isdigit() and 3 <= len(new_digits) <= 5 and new_conf > conf):
+        metrics.inc("step_refine_total", outcome="rejected")
+        logger.info(f"⚠ Step box re-read rejected: {text!r} ({conf:.2f}) -> {new_text!r} ({new_conf:.2f})")
+        return None
+
+    outcome = "confirmed" if new_digits == _digits(text) else "changed"
+    metrics.inc("step_refine_total", outcome=outcome)
+    logger.info(f"🔎 Step box re-read at {STEP_REFINE_SCALE}x: {text!r} ({conf:.2f}) -> {new_text!r} ({new_conf:.2f})")
+    refined = list(results)
+    refined[index] = (bbox, new_text, new_conf)
+    return refined
@@ -0,0 +1,100 @@
+import threading
+import time
+from pathlib import Path
+import cv2
+import numpy as np
+from decouple import config, Csv
+from app.core.logger import setup_logger
+from app.core import metrics
+
+logger = setup_logger(__name__)
+
+WARMUP_ENABLED = config("WARMUP_ENABLED", cast=bool, default=True)
+# Sample screenshots shipped with the image; a synthetic screen is used if none exist
+WARMUP_IMAGES = config("WARMUP_IMAGES", cast=Csv(), default="datasets/Google Fit/google_fit_1122.jpeg,datasets/Samsung Health/2025-11-24_075026_samsung.jpg")
+# Each sample is run at these screen widths so the common tensor shapes are warm
+WARMUP_WIDTHS = config("WARMUP_WIDTHS", cast=Csv(int), default="720,1080,1440")
+
+ready_event = threading.Event()
+state = {
+    "status": "starting",
+    "model_load_seconds": None,
+    "warmup_seconds": None,
+    "warmup_inferences": 0,
+    "error": None
+}
+
+def _synthetic_screen() -> np.ndarray:
+    img = np.full((2400, 1080, 3), 255, np.uint8)
+    for i, line in enumerate(["Today", "10,818 steps", "7,42 km", "Heart Pts 45", "Goal progress 3.011/10.000"]):
+        cv2.putText(img, line, (60, 300 + i * 260), cv2.FONT_HERSHEY_SIMPLEX, 3, (30, 30, 30), 6)
+    return img
+
+def _samples() -> list:
+    samples = []
+    for path in WARMUP_IMAGES:
+        img = cv2.imread(str(Path(path)), cv2.IMREAD_COLOR)
+        if img is None:
+            logger.warning(f"⚠ Warm-up image not found: {path}")
+            continue
+        samples.append(img)
+    return samples or [_synthetic_screen()]
+
+def warm_up_reader(ocr_reader) -> int:
+    """
+    Run every sample at every width through the first OCR stage, the way the first pass
+    of a real report is prepared and read; returns the number of inferences
+    """
+    from app.core.preprocess import OCR_STAGES, prepare_stage
+    from app.core.ocr_processor import read_image
+    count = 0
+    for img in _samples():
+        for width in WARMUP_WIDTHS:
+            scaled = cv2.resize(img, (width, int(img.shape[0] * width / img.shape[1])), interpolation=cv2.INTER_AREA)
+            img_stage, _ = prepare_stage(scaled, OCR_STAGES[0])
+            read_image(ocr_reader, img_stage)
+            count += 1
+    return count
+
+def load_and_warm_up():
+    """Blocking: load the OCR model(s), run warm-up inferences, then mark the service ready"""
+    from app.core.ocr_processor import get_reader
+    from app.core.ocr_pool import ocr_pool
+    from app.core.inference_scheduler import get_scheduler
+    try:
+        state["status"] = "loading_model"
+        started = time.perf_counter()
+        if ocr_pool is not None:
+            # Every process loads and warms up its own reader during start-up,
+            # so in process mode this figure includes the per-process warm-up
+            ocr_pool.warm_up()
+        else:
+            ocr_reader = get_reader()
+        state["model_load_seconds"] = round(time.perf_counter() - started, 3)
+        metrics.set_gauge("ocr_model_load_seconds", state["model_load_seconds"])
+        logger.info(f"✓ OCR model loaded in {state['model_load_seconds']}s")
+
+        if WARMUP_ENABLED and ocr_pool is None:
+            state["status"] = "warming_up"
+            started = time.perf_counter()
+            # Through the batching scheduler when it is on, so its inference thread is warm too
+            state["warmup_inferences"] = warm_up_reader(get_scheduler() or ocr_reader)
+            state["warmup_seconds"] = round(time.perf_counter() - started, 3)
+            metrics.set_gauge("ocr_warmup_seconds", state["warmup_seconds"])
+            metrics.set_gauge("ocr_warmup_inferences", state["warmup_inferences"])
+            logger.info(f"✓ Warm-up done: {state['warmup_inferences']} inferences in {state['warmup_seconds']}s")
+
+        state["status"] = "ready"
+        metrics.set_gauge("ocr_ready", 1)
+        ready_event.set()
+    except Exception as e:
+        state["status"] = "failed"
+        state["error"] = str(e)
+        logger.error(f"❌ OCR model load/warm-up failed: {e}")
+        raise
+
+def is_ready() -> bool:
+    return ready_event.is_set()
+
+def get_readiness() -> dict:
+    return {"ready": is_ready(), **state}
@@ -0,0 +1,259 @@
+import asyncio
+import gzip
+import json
+import time
+import httpx
+from decouple import config
+from app.core import metrics
+from app.core.logger import setup_logger
+from app.core.outbox import OutboxStore, CircuitBreaker, PENDING, DEAD
+
+logger = setup_logger(__name__)
+
+# Concurrent POSTs per environment
+WEBHOOK_CONCURRENCY = config("WEBHOOK_CONCURRENCY", cast=int, default=4)
+WEBHOOK_TIMEOUT = config("WEBHOOK_TIMEOUT", cast=float, default=30.0)
+WEBHOOK_MAX_KEEPALIVE = config("WEBHOOK_MAX_KEEPALIVE", cast=int, default=8)
+# 1 = one POST per result to /api/ocr/result; >1 = up to this many results per POST to WEBHOOK_BATCH_PATH
+WEBHOOK_BATCH_SIZE = config("WEBHOOK_BATCH_SIZE", cast=int, default=1)
+# How long a sender waits for a batch to fill once it holds one result
+WEBHOOK_BATCH_WAIT_MS = config("WEBHOOK_BATCH_WAIT_MS", cast=float, default=200.0)
+WEBHOOK_BATCH_PATH = config("WEBHOOK_BATCH_PATH", default="/api/ocr/results")
+# gzip request bodies (Content-Encoding: gzip); only worth it for batches
+WEBHOOK_GZIP = config("WEBHOOK_GZIP", cast=bool, default=False)
+
+RESULT_PATH = "/api/ocr/result"
+# Idle senders re-check the outbox at least this often (retries coming due)
+POLL_SECONDS = 1.0
+ENVIRONMENTS = ("production", "staging")
+
+def endpoint_for(env: str) -> tuple:
+    """(base_url, api_key) of the Laravel API for an environment"""
+    if env == 'production':
+        api_url = config("LARAVEL_API_URL_PRODUCTION", default=config("LARAVEL_API_URL", default="http://localhost:8003"))
+        api_key = config("LARAVEL_API_KEY_PRODUCTION", default=config("LARAVEL_API_KEY", default=""))
+    else:
+        api_url = config("LARAVEL_API_URL_STAGING", default=config("LARAVEL_API_URL", default="http://localhost:8003"))
+        api_key = config("LARAVEL_API_KEY_STAGING", default=config("LARAVEL_API_KEY", default=""))
+    # Clean URL from any leading/trailing whitespace or '=' characters
+    return api_url.strip().lstrip('=').rstrip('/'), api_key
+
+def environment_of(data) -> str:
+    env = (getattr(data, 'environment', None) or 'staging').lower()
+    return env if env in ENVIRONMENTS else 'staging'
+
+def build_payload(data, result: dict) -> dict:
+    return {
+        "report_id": data.report_id,
+        "user_id": data.user_id,
+        "img_url": data.s3_url,
+        "raw_ocr": result["raw_ocr"],
+        "extracted_data": result["extracted_data"],
+        'app_class': result["app_class"],
+        "processing_time_ms": result["processing_time_ms"]
+    }
+
+def is_retryable(status_code: int) -> bool:
+    """5xx, 408 and 429 are worth retrying; any other 4xx will fail the same way again"""
+    return status_code >= 500 or status_code in (408, 429)
+
+class WebhookDispatcher:
+    """
+    Delivers OCR results to the Laravel API off the OCR workers' path.
+
+    Workers call submit(), which writes the result to the outbox and returns. Per
+    environment, WEBHOOK_CONCURRENCY sender tasks claim due rows through one long-lived
+    keep-alive client and delete them on a 2xx; failures are retried with backoff and
+    jitter until WEBHOOK_MAX_ATTEMPTS, then dead-lettered. A circuit breaker per
+    environment stops senders from spending timeouts on a backend that is down.
+    With WEBHOOK_BATCH_SIZE > 1 a sender collects up to that many results (waiting at
+    most WEBHOOK_BATCH_WAIT_MS) and POSTs them together as {"results": [...]}.
+    """
+
+    def __init__(self, outbox: OutboxStore = None):
+        self.outbox = outbox
+        self.clients = {}
+        self.senders = []
+        self.wakeups = {}
+        self.breakers = {env: CircuitBreaker(env) for env in ENVIRONMENTS}
+        self.sent = {env: 0 for env in ENVIRONMENTS}
+        self.failed = {env: 0 for env in ENVIRONMENTS}
+        self.dead = {env: 0 for env in ENVIRONMENTS}
+        self.requests = {env: 0 for env in ENVIRONMENTS}
+        self.in_flight = 0
+
+    def start(self):
+        if self.outbox is None:
+            self.outbox = OutboxStore()
+        for env in ENVIRONMENTS:
+            base_url, api_key = endpoint_for(env)
+            self.wakeups[env] = asyncio.Event()
+            self.clients[env] = httpx.AsyncClient(
+                base_url=base_url,
+                timeout=WEBHOOK_TIMEOUT,
+                headers={"x-api-key": api_key},
+                limits=httpx.Limits(max_connections=WEBHOOK_CONCURRENCY, max_keepalive_connections=WEBHOOK_MAX_KEEPALIVE)
+            )
+            for i in range(WEBHOOK_CONCURRENCY):
+                self.senders.append(asyncio.create_task(self._sender(env, i + 1)))
+        pending = self.outbox.pending_count()
+        logger.info(f"🚀 Webhook dispatcher started: {WEBHOOK_CONCURRENCY} senders per environment, batch size {WEBHOOK_BATCH_SIZE}, gzip {WEBHOOK_GZIP}, outbox {self.outbox.path} ({pending} pending)")
+
+    async def submit(self, data, result: dict):
+        """Store a result for delivery; returns as soon as it is in the outbox"""
+        env = environment_of(data)
+        self.outbox.add(env, data.report_id, build_payload(data, result))
+        self.wakeups[env].set()
+
+    async def _wait(self, env: str, seconds: float):
+        """Sleep up to `seconds`, or until submit() signals new work"""
+        wakeup = self.wakeups[env]
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=max(0.01, seconds))
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
+
+    async def _next_batch(self, env: str, lease: float) -> list:
+        """Claim up to WEBHOOK_BATCH_SIZE due rows; with batching, wait briefly for a batch to fill"""
+        batch = self.outbox.claim_due(env, max(1, WEBHOOK_BATCH_SIZE), lease)
+        if batch and WEBHOOK_BATCH_SIZE > 1 and len(batch) < WEBHOOK_BATCH_SIZE:
+            deadline = time.monotonic() + WEBHOOK_BATCH_WAIT_MS / 1000
+            while len(batch) < WEBHOOK_BATCH_SIZE and time.monotonic() < deadline:
+                await self._wait(env, deadline - time.monotonic())
+                batch += self.outbox.claim_due(env, WEBHOOK_BATCH_SIZE - len(batch), lease)
+        return batch
+
+    def _request(self, payloads: list) -> tuple:
+        """(path, body bytes, headers) for one POST"""
+        if len(payloads) == 1 and WEBHOOK_BATCH_SIZE <= 1:
+            path, body = RESULT_PATH, payloads[0]
+        else:
+            path, body = WEBHOOK_BATCH_PATH, {"results": payloads}
+        content = json.dumps(body).encode()
+        headers = {"Content-Type": "application/json"}
+        if WEBHOOK_GZIP:
+            content = gzip.compress(content, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        return path, content, headers
+
+    async def deliver(self, env: str, payloads: list) -> tuple:
+        """POST one result or batch; returns (ok, retryable, error)"""
+        path, content, headers = self._request(payloads)
+        report_ids = [p["report_id"] for p in payloads]
+        self.requests[env] += 1
+        try:
+            response = await self.clients[env].post(path, content=content, headers=headers)
+            logger.info(f"✅ Webhook response: {response.status_code} - {response.text[:200]}")
+            if response.is_success:
+                logger.info(f"✓ [{env.upper()}] Sent OCR result for report(s) {report_ids}")
+                return True, False, None
+            logger.warning(f"⚠ [{env.upper()}] Webhook returned non-2xx status {response.status_code} for {report_ids}")
+            return False, is_retryable(response.status_code), f"HTTP {response.status_code}: {response.text[:200]}"
+        except (httpx.ConnectError, httpx.TimeoutException) as e:
+            logger.error(f"🔌 [{env.upper()}] Webhook failed for {report_ids}: {e}")
+            return False, True, f"{type(e).__name__}: {e}"
+        except Exception as e:
+            logger.error(f"❌ [{env.upper()}] Unexpected webhook error for {report_ids}: {e}")
+            return False, True, f"{type(e).__name__}: {e}"
+
+    async def _sender(self, env: str, sender_id: int):
+        breaker = self.breakers[env]
+        # Rows stay leased (invisible to other senders) for a little longer than one request can take
+        lease = WEBHOOK_TIMEOUT + 5
+        while True:
+            if not breaker.allow():
+                await asyncio.sleep(breaker.retry_in() or 0.5)
+                continue
+            batch = await self._next_batch(env, lease)
+            if not batch:
+                breaker.trial_running = False
+                due_at = self.outbox.next_due_at(env)
+                await self._wait(env, min(POLL_SECONDS, due_at - time.time()) if due_at else POLL_SECONDS)
+                continue
+            payloads = [payload for _, payload, _, _ in batch]
+            self.in_flight += 1
+            try:
+                ok, retryable, error = await self.deliver(env, payloads)
+            finally:
+                self.in_flight -= 1
+            if ok:
+                self.outbox.delivered([row[0] for row in batch])
+                breaker.record_success()
+                self.sent[env] += len(batch)
+                metrics.inc("webhook_results_total", len(batch), env=env, outcome="sent")
+                for _, _, _, created_at in batch:
+                    metrics.observe("webhook_delivery_seconds", time.time() - created_at, env=env)
+            else:
+                dead = self.outbox.failed(batch, error, retryable)
+                # A rejected payload says nothing about the backend's health
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                self.failed[env] += len(batch) - dead
+                self.dead[env] += dead
+                if dead:
+                    logger.error(f"❌ [{env.upper()}] {dead} webhook result(s) moved to dead-letter: {error}")
+                    metrics.inc("webhook_results_total", dead, env=env, outcome="dead")
+                if len(batch) > dead:
+                    metrics.inc("webhook_results_total", len(batch) - dead, env=env, outcome="retry")
+            metrics.set_gauge("webhook_circuit_open", int(breaker.state != "closed"), env=env)
+
+    def _due_now(self, env: str) -> bool:
+        due_at = self.outbox.next_due_at(env)
+        return due_at is not None and due_at <= time.time() and self.breakers[env].state == "closed"
+
+    def dead_letters(self, env: str = None, limit: int = 50, offset: int = 0) -> list:
+        return self.outbox.dead_letters(env, limit, offset)
+
+    def replay(self, ids: list = None, env: str = None) -> int:
+        count = self.outbox.replay(ids, env)
+        for wakeup in self.wakeups.values():
+            wakeup.set()
+        logger.info(f"🔁 Replaying {count} dead-lettered webhook result(s)")
+        return count
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """Give due results drain_timeout seconds to go out, then stop senders and close clients"""
+        deadline = time.monotonic() + drain_timeout
+        while time.monotonic() < deadline and (self.in_flight or any(self._due_now(env) for env in ENVIRONMENTS)):
+            await asyncio.sleep(0.1)
+        for sender in self.senders:
+            sender.cancel()
+        self.senders.clear()
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients.clear()
+        left = self.outbox.pending_count()
+        if left:
+            durable = self.outbox.path != ":memory:"
+            logger.warning(f"⚠ Webhook dispatcher stopped with {left} results undelivered" + ("" if durable else " (in-memory outbox, lost)"))
+        self.outbox.close()
+        self.outbox = None
+        logger.info("✓ Webhook dispatcher stopped")
+
+    def stats(self) -> dict:
+        counts = self.outbox.counts() if self.outbox is not None else {}
+        return {
+            "batch_size": WEBHOOK_BATCH_SIZE,
+            "gzip": WEBHOOK_GZIP,
+            "senders_per_environment": WEBHOOK_CONCURRENCY,
+            "outbox": self.outbox.path if self.outbox is not None else None,
+            "environments": {
+                env: {
+                    "pending": counts.get(env, {}).get(PENDING, 0),
+                    "dead_letter": counts.get(env, {}).get(DEAD, 0),
+                    "sent": self.sent[env],
+                    "failed_attempts": self.failed[env],
+                    "dead_lettered": self.dead[env],
+                    "requests": self.requests[env],
+                    "circuit": self.breakers[env].stats()
+                } for env in ENVIRONMENTS
+            }
+        }
+
+webhook_dispatcher = WebhookDispatcher()
+
+def get_webhook_stats() -> dict:
+    return webhook_dispatcher.stats()
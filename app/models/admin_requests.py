@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class WebhookReplayRequest(BaseModel):
+    ids: Optional[List[int]] = None  # empty = every dead-lettered result
+    env: Optional[str] = None  # production or staging
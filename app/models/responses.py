@@ -20,4 +20,5 @@ class AppStatusResponse(BaseModel):
     queue: Dict[str, Any]
     workers: Dict[str, Any]
     processing: Dict[str, Any]
+    cache: Dict[str, Any]
     system: Dict[str, Any]
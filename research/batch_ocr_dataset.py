@@ -1,13 +1,17 @@
 import cv2
 from pathlib import Path
 import pandas as pd
-import easyocr
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.engine_registry import engine_registry
 
 DATASET_DIR = Path('../datasets')
 OUTPUT_FILE = 'ocr_results.xlsx'
 
 print("📦 Loading EasyOCR...")
-reader = easyocr.Reader(['en'], gpu=True)
+reader = engine_registry.acquire('batch_ocr_dataset')
 print("✓ EasyOCR loaded\n")
 
 app_folders = ['Apple Health', 'Google Fit', 'Huawei Health', 'Samsung Health']
@@ -44,6 +48,8 @@ for app_name in app_folders:
         except Exception as e:
             print(f"✗ Error: {e}")
 
+engine_registry.release('batch_ocr_dataset')
+
 print(f"\n💾 Saving to {OUTPUT_FILE}...")
 df = pd.DataFrame(results_list)
 df.to_excel(OUTPUT_FILE, index=False)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Build per-app layout templates for ROI OCR from the labelled datasets.
+
+For every image in datasets/ground_truth.csv the full frame is OCR'd once, the box
+holding the expected step count is located together with the anchor labels around it,
+and that horizontal band is stored in normalized coordinates. Images of the same app
+with similar fingerprints are grouped into layout variants whose bands are merged.
+
+Usage:
+    python research/build_layout_templates.py [--output app/data/layout_templates.json]
+"""
+import argparse
+import csv
+import json
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cv2
+import numpy as np
+from app.core.ocr_processor import get_reader
+from app.core.preprocess import prepare_image
+from app.core.layout_templates import (
+    ANCHOR_KEYWORDS, LAYOUT_ASPECT_TOLERANCE, LAYOUT_TEMPLATES_PATH, aspect_ratio, fingerprint
+)
+
+ROOT = Path(__file__).parent.parent
+# Anchors further than this many step-box heights away are not part of the band
+ANCHOR_RADIUS = 6
+# Vertical padding around the band, as a fraction of image height
+BAND_MARGIN = 0.02
+# Images closer than this (cosine distance) share a layout variant
+CLUSTER_DISTANCE = 0.2
+
+def digits(text: str) -> str:
+    return ''.join(ch for ch in text if ch.isdigit())
+
+def box_extent(bbox):
+    ys = [p[1] for p in bbox]
+    return min(ys), max(ys)
+
+def find_band(results: list, expected: int, app: str, height: int):
+    target = str(expected)
+    step_boxes = [bbox for bbox, text, _ in results if target in digits(text)]
+    if not step_boxes:
+        return None
+    top, bottom = box_extent(step_boxes[0])
+    box_height = max(bottom - top, 1)
+    centre = (top + bottom) / 2
+    for bbox, text, _ in results:
+        if any(k in text.lower() for k in ANCHOR_KEYWORDS.get(app, [])):
+            a_top, a_bottom = box_extent(bbox)
+            if abs((a_top + a_bottom) / 2 - centre) <= ANCHOR_RADIUS * box_height:
+                top, bottom = min(top, a_top), max(bottom, a_bottom)
+    return max(0.0, top / height - BAND_MARGIN), min(1.0, bottom / height + BAND_MARGIN)
+
+def merge_bands(bands: list) -> list:
+    merged = []
+    for y0, y1 in sorted(bands):
+        if merged and y0 <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], y1)
+        else:
+            merged.append([y0, y1])
+    return [(0.0, y0, 1.0, y1) for y0, y1 in merged]
+
+def cluster(samples: list) -> list:
+    """Greedy grouping of one app's samples into layout variants"""
+    variants = []
+    for sample in samples:
+        for variant in variants:
+            centroid = np.mean([s['fingerprint'] for s in variant], axis=0)
+            centroid /= np.linalg.norm(centroid) or 1
+            close = 1.0 - float(np.dot(sample['fingerprint'], centroid)) <= CLUSTER_DISTANCE
+            same_shape = abs(variant[0]['aspect'] - sample['aspect']) / variant[0]['aspect'] <= LAYOUT_ASPECT_TOLERANCE
+            if close and same_shape:
+                variant.append(sample)
+                break
+        else:
+            variants.append([sample])
+    return variants
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', default=LAYOUT_TEMPLATES_PATH)
+    args = parser.parse_args()
+
+    reader = get_reader()
+    samples = defaultdict(list)
+    missed = []
+    with open(ROOT / 'datasets/ground_truth.csv', 'r', encoding='utf-8') as f:
+        rows = [r for r in csv.reader(f) if len(r) >= 3 and r[2].isdigit()]
+
+    for i, (app, fname, expected) in enumerate((r[0], r[1], int(r[2])) for r in rows):
+        img = cv2.imread(str(ROOT / 'datasets' / app / fname), cv2.IMREAD_COLOR)
+        if img is None:
+            missed.append((app, fname, 'unreadable'))
+            continue
+        img_rgb, _ = prepare_image(img)
+        band = find_band(reader.readtext(img_rgb), expected, app, img_rgb.shape[0])
+        status = '✓' if band else '✗'
+        print(f'{i + 1:3d}. {status} {app:16s} {fname:50s} band={band and tuple(round(v, 3) for v in band)}')
+        if band is None:
+            missed.append((app, fname, 'step box not found'))
+            continue
+        samples[app].append({'fingerprint': fingerprint(img), 'aspect': aspect_ratio(img), 'band': band, 'file': fname})
+
+    templates = []
+    for app, app_samples in samples.items():
+        for n, members in enumerate(cluster(app_samples), 1):
+            centroid = np.mean([s['fingerprint'] for s in members], axis=0)
+            centroid /= np.linalg.norm(centroid) or 1
+            spread = max(1.0 - float(np.dot(s['fingerprint'], centroid)) for s in members)
+            # Never reach into another app's samples
+            foreign = [1.0 - float(np.dot(s['fingerprint'], centroid))
+                       for other, others in samples.items() if other != app for s in others]
+            radius = min(spread * 1.5 + 0.02, CLUSTER_DISTANCE)
+            if foreign:
+                radius = min(radius, min(foreign) * 0.9)
+            templates.append({
+                'app': app,
+                'variant': f'v{n}',
+                'aspect': float(np.mean([s['aspect'] for s in members])),
+                'fingerprint': [round(float(v), 5) for v in centroid],
+                'max_distance': round(radius, 4),
+                'regions': merge_bands([s['band'] for s in members]),
+                'samples': [s['file'] for s in members]
+            })
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'created_at': datetime.now().isoformat(), 'templates': templates}, f, indent=2)
+
+    print(f'\n✓ Saved {len(templates)} templates to {output}')
+    for t in templates:
+        coverage = sum(r[3] - r[1] for r in t['regions'])
+        print(f"  {t['app']:16s} {t['variant']:4s} samples={len(t['samples']):3d} radius={t['max_distance']:.3f} area={coverage * 100:.0f}%")
+    if missed:
+        print(f'\n⚠ {len(missed)} images without a template band:')
+        for app, fname, reason in missed:
+            print(f'  {app}/{fname}: {reason}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Build an offline, memory-mappable EasyOCR model bundle.
+
+Loads the stock reader once (downloading the weights into ~/.EasyOCR if needed),
+strips the DataParallel prefixes, and re-saves the un-quantized detector and
+recognizer state dicts in torch's zip format, which torch.load(mmap=True) can map
+directly. A manifest records the versions and sha256 of every file.
+
+Ship the output directory in the image and point OCR_MODEL_BUNDLE_DIR at it.
+
+Usage:
+    python research/build_model_bundle.py --output models/easyocr-en-v1 [--version v1]
+"""
+import argparse
+import json
+import sys
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import easyocr
+import torch
+from app.core.model_bundle import DETECTOR_FILE, MANIFEST_NAME, RECOGNIZER_FILE, sha256_file
+
+# Constructor arguments easyocr.Reader uses for each recognizer generation
+NETWORK_PARAMS = {
+    'easyocr.model.model': {'input_channel': 1, 'output_channel': 512, 'hidden_size': 512},
+    'easyocr.model.vgg_model': {'input_channel': 1, 'output_channel': 256, 'hidden_size': 256},
+}
+
+def plain_state_dict(module) -> OrderedDict:
+    module = getattr(module, "module", module)  # unwrap DataParallel
+    return OrderedDict((k, v.detach().cpu().contiguous()) for k, v in module.state_dict().items())
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--version', default=None)
+    parser.add_argument('--languages', default='en')
+    args = parser.parse_args()
+
+    languages = args.languages.split(',')
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    # CPU + no quantization so the saved weights are the original float32 tensors.
+    # Not through engine_registry: it may itself load from a bundle, this needs the stock weights
+    reader = easyocr.Reader(languages, gpu=False, quantize=False)
+    torch.save(plain_state_dict(reader.detector), output / DETECTOR_FILE)
+    torch.save(plain_state_dict(reader.recognizer), output / RECOGNIZER_FILE)
+
+    recognizer = getattr(reader.recognizer, "module", reader.recognizer)
+    recog_module = type(recognizer).__module__
+    manifest = {
+        'version': args.version or output.name,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'easyocr_version': easyocr.__version__,
+        'torch_version': torch.__version__,
+        'languages': languages,
+        'recog_module': recog_module,
+        'network_params': NETWORK_PARAMS[recog_module],
+        'files': {name: sha256_file(output / name) for name in (DETECTOR_FILE, RECOGNIZER_FILE)}
+    }
+    with open(output / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    size = sum((output / name).stat().st_size for name in manifest['files'])
+    print(f'✓ Bundle {manifest["version"]} written to {output} ({size / 1e6:.1f} MB)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Classify the ground-truth OCR samples in one batch and report label accuracy,
+confusions and the confidence distribution.
+
+Usage:
+    python research/classify_ground_truth.py [--low 0.6]
+"""
+import argparse
+import csv
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.app_classifier import classify_batch
+
+ROOT = Path(__file__).parent.parent
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--low', type=float, default=0.6, help='List samples below this confidence')
+    args = parser.parse_args()
+
+    with open(ROOT / 'datasets' / 'ground_truth.csv') as f:
+        rows = list(csv.DictReader(f))
+    results = classify_batch([row['raw_ocr_sample'] for row in rows])
+
+    per_app = defaultdict(Counter)
+    confusions = Counter()
+    low = []
+    for row, result in zip(rows, results):
+        correct = result.label == row['category']
+        per_app[row['category']]['total'] += 1
+        per_app[row['category']]['correct'] += correct
+        per_app[row['category']]['confidence'] += result.confidence
+        if not correct:
+            confusions[(row['category'], result.label)] += 1
+        if result.confidence < args.low:
+            low.append((row, result))
+
+    print(f'{"App":18s} {"Accuracy":>10s} {"Avg conf":>10s}')
+    print('=' * 40)
+    for app, c in sorted(per_app.items()):
+        print(f'{app:18s} {c["correct"] / c["total"]:9.0%} {c["confidence"] / c["total"]:10.2f}')
+
+    if confusions:
+        print('\nConfusions (expected -> predicted):')
+        for (expected, predicted), count in confusions.most_common():
+            print(f'  {expected} -> {predicted}: {count}')
+
+    print(f'\nBelow confidence {args.low}: {len(low)}')
+    for row, result in low:
+        print(f'  {row["category"]}/{row["file_name"]}: {result.label} {result.confidence:.2f} {result.keywords}')
+
+if __name__ == '__main__':
+    main()
@@ -20,6 +20,8 @@ print('=' * 110)
 correct = 0
 total_time = 0
 results_by_app = defaultdict(lambda: {'correct': 0, 'total': 0, 'failed': []})
+# OCR stage that produced each answer -> [count, correct, total ms]
+stages = defaultdict(lambda: [0, 0, 0])
 
 for i, (category, fname, expected) in enumerate(test_cases, 1):
     url = f'file://datasets/{category}/{fname}'
@@ -38,6 +40,10 @@ for i, (category, fname, expected) in enumerate(test_cases, 1):
         
         results_by_app[app]['total'] += 1
         total_time += time_ms
+        stage = stages[result.get('ocr_stage') or 'none']
+        stage[0] += 1
+        stage[1] += actual == expected
+        stage[2] += time_ms
         
         print(f'{i:3d}. {status} {fname:50s} App: {app:20s} Expected: {expected:6d}, Got: {actual}')
     except Exception as e:
@@ -52,6 +58,10 @@ print(f'Accuracy: {correct/len(test_cases)*100:.1f}%')
 print(f'Avg Time: {total_time/len(test_cases):.0f}ms')
 print(f'Total Time: {total_time/1000:.1f}s')
 
+print(f'\nBY OCR STAGE:')
+for name, (count, ok, ms) in sorted(stages.items(), key=lambda kv: -kv[1][0]):
+    print(f'  {name:10s} {count:4d} images, {ok:4d} correct, avg {ms / count:.0f}ms')
+
 print(f'\n\nRESULTS BY APP:')
 print('-' * 110)
 for app in sorted(results_by_app.keys()):
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Inference throughput per micro-batching setting.
+
+N worker threads submit preprocessed dataset images concurrently, first straight to the
+shared reader (current behaviour), then through InferenceScheduler for every
+(max_batch, max_wait_ms) combination.
+
+Usage:
+    python testing/bench_batching.py --images 24 --workers 4 --batches 1,2,4,8 --waits 10,25,50
+"""
+import argparse
+import glob
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cv2
+from app.core.ocr_processor import get_reader
+from app.core.preprocess import prepare_image
+from app.core.inference_scheduler import InferenceScheduler
+
+def load_images(count: int) -> list:
+    paths = sorted(glob.glob('datasets/*/*.jp*g') + glob.glob('datasets/*/*.png'))
+    images = []
+    for path in paths:
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is not None:
+            images.append(prepare_image(img)[0])
+        if len(images) >= count:
+            break
+    return images
+
+def run(target, images: list, workers: int) -> float:
+    pending = list(images)
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                img = pending.pop()
+            target.readtext(img)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', type=int, default=24)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batches', default='1,2,4,8')
+    parser.add_argument('--waits', default='10,25,50')
+    args = parser.parse_args()
+
+    reader = get_reader()
+    images = load_images(args.images)
+    reader.readtext(images[0])  # warm-up
+
+    print(f'Images: {len(images)} | Workers: {args.workers}')
+    print('=' * 72)
+    elapsed = run(reader, images, args.workers)
+    print(f'{"direct (shared reader)":28s} {elapsed:7.2f}s {len(images) / elapsed:7.2f} img/s')
+
+    for max_batch in (int(b) for b in args.batches.split(',')):
+        for max_wait in (float(w) for w in args.waits.split(',')):
+            scheduler = InferenceScheduler(reader, max_batch=max_batch, max_wait_ms=max_wait)
+            scheduler.start()
+            elapsed = run(scheduler, images, args.workers)
+            stats = scheduler.stats()
+            scheduler.stop()
+            label = f'batch={max_batch} wait={max_wait:.0f}ms'
+            print(f'{label:28s} {elapsed:7.2f}s {len(images) / elapsed:7.2f} img/s  avg batch {stats["avg_batch_size"]}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Download stage benchmark: blocking per-report httpx.get vs shared async client.
+
+Serves a dataset image from a local HTTP stand-in that adds fixed latency (like S3),
+then pushes N reports through W workers in both modes and prints reports/second.
+
+Usage:
+    python testing/bench_download.py --reports 40 --workers 4 --latency-ms 300
+    python testing/bench_download.py --ocr real   # use EasyOCR instead of a simulated inference
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from app.core import downloader
+from app.core.downloader import decode_image, fetch_image
+
+DEFAULT_IMAGE = 'datasets/Google Fit/google_fit_1122.jpeg'
+
+def start_slow_server(image_bytes: bytes, latency_ms: int) -> ThreadingHTTPServer:
+    class SlowHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(latency_ms / 1000)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(image_bytes)))
+            self.end_headers()
+            self.wfile.write(image_bytes)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def make_inference(mode: str, infer_ms: int):
+    """Return a blocking inference function taking (url, img)"""
+    if mode == 'real':
+        from app.core.ocr_processor import process_ocr, get_reader
+        get_reader()
+        return lambda url, img: process_ocr(url, img=img)
+
+    # One shared model: inference is serialized like the single global reader
+    model_lock = threading.Lock()
+
+    def simulated(url, img):
+        with model_lock:
+            time.sleep(infer_ms / 1000)
+    return simulated
+
+async def run_mode(mode: str, url: str, reports: int, workers: int, infer) -> float:
+    queue = asyncio.Queue()
+    for _ in range(reports):
+        queue.put_nowait(url)
+
+    def blocking_job(u):
+        response = httpx.get(u, timeout=30.0)
+        response.raise_for_status()
+        infer(u, decode_image(response.content, u))
+
+    async def worker():
+        while not queue.empty():
+            u = queue.get_nowait()
+            if mode == 'sync':
+                await asyncio.to_thread(blocking_job, u)
+            else:
+                img = await fetch_image(u)
+                await asyncio.to_thread(infer, u, img)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(workers)])
+    elapsed = time.perf_counter() - start
+    await downloader.close_client()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--image', default=DEFAULT_IMAGE)
+    parser.add_argument('--reports', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latency-ms', type=int, default=300)
+    parser.add_argument('--infer-ms', type=int, default=250)
+    parser.add_argument('--ocr', choices=['simulated', 'real'], default='simulated')
+    args = parser.parse_args()
+
+    image_bytes = Path(args.image).read_bytes()
+    server = start_slow_server(image_bytes, args.latency_ms)
+    url = f'http://127.0.0.1:{server.server_port}/report.jpg'
+    infer = make_inference(args.ocr, args.infer_ms)
+
+    print(f'Reports: {args.reports} | Workers: {args.workers} | Latency: {args.latency_ms}ms | OCR: {args.ocr}')
+    print('=' * 70)
+    for mode in ('sync', 'async'):
+        elapsed = asyncio.run(run_mode(mode, url, args.reports, args.workers, infer))
+        print(f'{mode:6s}: {elapsed:6.2f}s total, {args.reports / elapsed:6.2f} reports/s, {elapsed / args.reports * 1000:7.0f}ms/report')
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
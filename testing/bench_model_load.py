@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Startup time, per-process memory and inference: stock EasyOCR loading vs the mmap model bundle.
+
+For each mode, N child processes load the reader at the same time (like the
+OCR_EXECUTOR=process pool) and stay alive while their RSS / PSS / private memory is
+read from /proc. PSS divides shared pages between the processes that map them, so it
+is the number that shows the bundle's weights being shared.
+
+Stock EasyOCR on CPU dynamically quantizes its networks; the bundle keeps the float32
+weights so they stay shared. Once memory is read, the first process OCRs --samples
+cases from datasets/ground_truth.csv alone, so the latency and accuracy cost of
+that difference is reported too.
+
+Usage:
+    python testing/bench_model_load.py --bundle models/easyocr-en-v1 --processes 4 --samples 40
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+from app.core.ocr_processor import get_reader
+reader = get_reader()
+print(json.dumps({{"load_seconds": round(time.perf_counter() - started, 3)}}), flush=True)
+command = sys.stdin.readline()
+if command.startswith("infer "):
+    from app.core.ocr_processor import process_ocr
+    times, correct, cases = [], 0, json.loads(command[len("infer "):])
+    for category, fname, expected in cases:
+        try:
+            result = process_ocr(f"file://datasets/{{category}}/{{fname}}")
+            times.append(result["processing_time_ms"])
+            correct += result["extracted_data"].get("steps") == expected
+        except Exception:
+            pass
+    times.sort()
+    print(json.dumps({{
+        "total": len(cases), "correct": correct,
+        "avg_ms": sum(times) / len(times) if times else 0,
+        "p95_ms": times[int(len(times) * 0.95) - 1] if times else 0
+    }}), flush=True)
+sys.stdin.read()
+"""
+
+def memory_kb(pid: int) -> dict:
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:', 'Private_Clean:', 'Private_Dirty:'):
+                values[parts[0][:-1]] = int(parts[1])
+    return {
+        'rss_mb': values.get('Rss', 0) / 1024,
+        'pss_mb': values.get('Pss', 0) / 1024,
+        'private_mb': (values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)) / 1024
+    }
+
+def load_cases(limit: int) -> list:
+    cases = []
+    with open(ROOT / 'datasets/ground_truth.csv', 'r', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) >= 3 and row[0] and row[1] and row[2]:
+                try:
+                    cases.append((row[0], row[1], int(row[2])))
+                except ValueError:
+                    continue
+    return cases[:limit]
+
+def run_mode(label: str, bundle: str, processes: int, cases: list):
+    env = dict(os.environ, OCR_MODEL_BUNDLE_DIR=bundle, RESULT_CACHE_ENABLED='False', PYTHONUNBUFFERED='1')
+    started = time.perf_counter()
+    children = [
+        subprocess.Popen([sys.executable, '-c', CHILD.format(root=str(ROOT))], env=env, cwd=ROOT,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(processes)
+    ]
+    loads = [json.loads(child.stdout.readline())['load_seconds'] for child in children]
+    wall = time.perf_counter() - started
+    mems = [memory_kb(child.pid) for child in children]
+    for child in children[1:]:
+        child.stdin.close()
+        child.wait()
+    inference = None
+    if cases:
+        children[0].stdin.write(f'infer {json.dumps(cases, separators=(",", ":"))}\n')
+        children[0].stdin.flush()
+        lines = [l for l in iter(children[0].stdout.readline, '') if l.startswith('{')]
+        inference = json.loads(lines[0]) if lines else None
+    children[0].stdin.close()
+    children[0].wait()
+
+    avg = lambda key: sum(m[key] for m in mems) / len(mems)
+    print(f'{label:10s} wall {wall:6.2f}s | load avg {sum(loads) / len(loads):6.2f}s max {max(loads):6.2f}s | '
+          f'RSS {avg("rss_mb"):7.1f} MB  PSS {avg("pss_mb"):7.1f} MB  private {avg("private_mb"):7.1f} MB  (per process)')
+    print(f'{"":10s} total PSS for {processes} processes: {sum(m["pss_mb"] for m in mems):.1f} MB')
+    if inference:
+        accuracy = f"{inference['correct']}/{inference['total']} ({inference['correct'] / inference['total'] * 100:.1f}%)"
+        print(f'{"":10s} inference (1 process): accuracy {accuracy}, avg {inference["avg_ms"]:.0f}ms, p95 {inference["p95_ms"]:.0f}ms')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bundle', required=True, help='Bundle directory built by research/build_model_bundle.py')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--samples', type=int, default=40, help='Ground-truth images to OCR per mode (0 = load/memory only)')
+    args = parser.parse_args()
+
+    cases = load_cases(args.samples) if args.samples > 0 else []
+    print(f'Processes: {args.processes}, inference samples: {len(cases)}')
+    print('=' * 100)
+    run_mode('stock', '', args.processes, cases)
+    run_mode('bundle', args.bundle, args.processes, cases)
+
+if __name__ == '__main__':
+    main()
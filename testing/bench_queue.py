@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Job queue benchmark: in-memory asyncio.Queue vs the SQLite (WAL) durable queue.
+
+Fills each queue with N reports (on top of --backlog already-stored jobs), then drains
+it with W consumer tasks that ack every job. Prints per-operation latency percentiles
+and end-to-end jobs/second.
+
+Usage:
+    python testing/bench_queue.py --jobs 5000 --workers 4 --backlog 5000
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.job_queue import DurableTaskQueue, MemoryTaskQueue, SQLiteJobStore
+from app.core.lanes import FairScheduler
+from app.models.requests import OCRRequest
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+    return f'p50 {pick(0.5):6.3f}ms  p99 {pick(0.99):6.3f}ms  max {samples[-1] * 1000:6.3f}ms'
+
+async def run(queue, jobs: int, workers: int) -> dict:
+    put_times, get_times = [], []
+    start = time.perf_counter()
+    for i in range(jobs):
+        data = OCRRequest(report_id=i, user_id=i % 50, s3_url=f'https://bucket.s3.amazonaws.com/reports/{i}.jpg',
+                          environment='production')
+        t = time.perf_counter()
+        await queue.put(data)
+        put_times.append(time.perf_counter() - t)
+    fill_seconds = time.perf_counter() - start
+
+    async def consumer(count: int):
+        for _ in range(count):
+            t = time.perf_counter()
+            data = await queue.get()
+            queue.ack(data)
+            queue.task_done()
+            get_times.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    share = [jobs // workers + (1 if w < jobs % workers else 0) for w in range(workers)]
+    await asyncio.gather(*(consumer(n) for n in share))
+    drain_seconds = time.perf_counter() - start
+    return {'put': put_times, 'get': get_times, 'fill': fill_seconds, 'drain': drain_seconds}
+
+async def run_with(factory, jobs: int, workers: int) -> dict:
+    # Queues are created inside the running loop
+    return await run(factory(), jobs, workers)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--backlog', type=int, default=5000, help='Jobs already stored (and left) in the SQLite queue')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteJobStore(str(Path(tmp) / 'queue.db'))
+        # Backlog that becomes visible only after the run, so it sits in the table without being drained
+        for i in range(args.backlog):
+            store.put(f'backlog-{i}', '{}')
+        store.conn.execute('UPDATE jobs SET visible_at = visible_at + 86400')
+
+        queues = [
+            ('memory', lambda: MemoryTaskQueue(FairScheduler())),
+            (f'sqlite (+{args.backlog} stored)', lambda: DurableTaskQueue(store, OCRRequest, FairScheduler())),
+        ]
+        results = {}
+        for name, factory in queues:
+            results[name] = asyncio.run(run_with(factory, args.jobs, args.workers))
+        store.close()
+
+    print(f'{args.jobs} jobs, {args.workers} consumers')
+    print('=' * 90)
+    for name, r in results.items():
+        total = r['fill'] + r['drain']
+        print(f'{name}')
+        print(f'  enqueue  {percentiles(r["put"])}')
+        print(f'  dequeue  {percentiles(r["get"])}  (claim + ack)')
+        print(f'  {args.jobs / total:,.0f} jobs/s end to end')
+
+if __name__ == '__main__':
+    main()
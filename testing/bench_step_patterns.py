@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Step extraction cost per report: legacy cascade vs the compiled pattern registry.
+
+The legacy cascade is replayed from the registry itself: every pattern is run in order
+with re.search(pattern_string, text, flags) (module-level cache lookup per call), no
+literal prefilter, and the Google Fit "Heart Pts" pattern in its old `^.*?` form.
+Both paths are checked to return the same counts on every sample.
+
+Usage:
+    python testing/bench_step_patterns.py [--repeat 200]
+"""
+import argparse
+import csv
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.step_patterns import STEP_PATTERNS, FALLBACK_PATTERNS, StepPatternRegistry
+
+LEGACY_FORMS = {r'(\d{3})\s+Heart\s+Pts': r'^.*?(\d{3})\s+Heart\s+Pts'}
+legacy_searches = 0
+
+def legacy_extract(text: str, app: str):
+    global legacy_searches
+    for pattern in STEP_PATTERNS.get(app, []) + FALLBACK_PATTERNS:
+        legacy_searches += 1
+        source = LEGACY_FORMS.get(pattern.regex.pattern, pattern.regex.pattern)
+        m = re.search(source, text, pattern.regex.flags)
+        if m:
+            steps = pattern.normalizer(m.group(1))
+            if steps is not None and steps >= pattern.min_steps:
+                return steps
+    return None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with open(Path(__file__).parent.parent / 'datasets' / 'ground_truth.csv') as f:
+        samples = [(row['raw_ocr_sample'], row['category']) for row in csv.DictReader(f)]
+
+    registry = StepPatternRegistry(STEP_PATTERNS, FALLBACK_PATTERNS, adaptive=False)
+    mismatches = [(app, text[:80]) for text, app in samples if legacy_extract(text, app) != registry.extract(text, app)]
+    if mismatches:
+        print(f'❌ {len(mismatches)} samples differ, e.g. {mismatches[0]}')
+        sys.exit(1)
+
+    print(f'Samples: {len(samples)} | Repeat: {args.repeat}')
+    print('=' * 60)
+    for label, fn in (('legacy cascade', legacy_extract), ('registry', registry.extract)):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for text, app in samples:
+                fn(text, app)
+        elapsed = time.perf_counter() - start
+        print(f'{label:16s} {elapsed / (args.repeat * len(samples)) * 1e6:8.1f} µs/report')
+
+    stats = registry.stats()
+    tried = sum(p['tried'] for ps in list(stats['apps'].values()) + [stats['fallback']] for p in ps)
+    print(f'regex searches per report: legacy {legacy_searches / stats["extractions"]:.1f}, '
+          f'registry {tried / stats["extractions"]:.1f}')
+
+if __name__ == '__main__':
+    main()
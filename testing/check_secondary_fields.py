@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Check the one-pass secondary fields tokenizer against the per-field regexes it replaced.
+
+Runs both on every raw_ocr_sample in datasets/ground_truth.csv (URL and local pipeline
+variants) and, with --fuzz N, on N random strings built from digits, separators and
+units. Prints any difference and the timing of both paths.
+
+Usage:
+    python testing/check_secondary_fields.py [--fuzz 50000]
+"""
+import argparse
+import csv
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.secondary_fields import extract_secondary_fields
+
+def legacy_fields(raw_text: str, local: bool = False) -> dict:
+    """The regex sequence process_ocr / process_ocr_local used to run"""
+    data = {}
+    m = re.search(r'(\d{1,2})\s+(\w+)\s+(\d{4})\s+at\s+(\d{1,2}\.\d{2})', raw_text)
+    if m: data['date'] = f"{m.group(1)} {m.group(2)} {m.group(3)} at {m.group(4)}"
+    m = re.search(r'(\d+[,\.]\d+)\s*km', raw_text)
+    if m: data['distance'] = f"{m.group(1)} km"
+    m = re.search(r'(\d{2}):(\d{2})[:\.?](\d{2})' if local else r'(\d{2}):(\d{2})[:\.]?(\d{2})', raw_text)
+    if m: data['duration'] = f"{m.group(1)}:{m.group(2)}:{m.group(3)}"
+    m = re.search(r'(\d+)\s*(?:ca|kcal)', raw_text, re.I)
+    if m: data['total_calories'] = f"{m.group(1)} kcal"
+    m = re.search(r"(\d+)'(\d+)\"", raw_text)
+    if m: data['avg_pace'] = f"{m.group(1)}'{m.group(2)}\" /km"
+    speeds = re.findall(r'(\d+[,\.]\d+)\s*km', raw_text)
+    if len(speeds) > 1: data['avg_speed'] = f"{speeds[1]} km/h"
+    m = re.search(r'(\d{2,3})\s*(?:deeps|steps)/min', raw_text, re.I)
+    if m: data['avg_cadence'] = f"{m.group(1)} steps/min"
+    m = re.search(r'(\d+)\s*cm', raw_text)
+    if m: data['avg_stride'] = f"{m.group(1)} cm"
+    m = re.search(r'(\d{2,3})\s*bpm', raw_text, re.I)
+    if m: data['avg_heart_rate'] = f"{m.group(1)} bpm"
+    return data
+
+def tokenizer_fields(raw_text: str, local: bool = False) -> dict:
+    if local:
+        return extract_secondary_fields(raw_text, duration_separators=':.?', duration_separator_required=True)
+    return extract_secondary_fields(raw_text)
+
+FUZZ_PIECES = (list('0123456789') * 6 + list(" :.,'\"?") * 3 +
+               ['km', 'KM', 'cm', 'CM', 'kcal', 'Cal', 'ca', 'bpm', 'BPM', 'steps/min', 'deeps/min', ' at ', 'Nov', '2024', '_'])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fuzz', type=int, default=0)
+    args = parser.parse_args()
+
+    with open(Path(__file__).parent.parent / 'datasets' / 'ground_truth.csv') as f:
+        texts = [row['raw_ocr_sample'] for row in csv.DictReader(f)]
+    samples = len(texts)
+    rng = random.Random(0)
+    texts += [''.join(rng.choice(FUZZ_PIECES) for _ in range(rng.randint(1, 40))) for _ in range(args.fuzz)]
+
+    differences = 0
+    for text in texts:
+        for local in (False, True):
+            expected, actual = legacy_fields(text, local), tokenizer_fields(text, local)
+            if expected != actual:
+                differences += 1
+                if differences <= 10:
+                    print(f'❌ {"local" if local else "url"}: {text[:100]!r}\n   regex:     {expected}\n   tokenizer: {actual}')
+
+    with_fields = sum(1 for text in texts[:samples] if legacy_fields(text))
+    print(f'Ground truth samples: {samples} ({with_fields} with secondary fields) | fuzz: {args.fuzz}')
+    print(f'Differences: {differences}')
+
+    for label, fn in (('regex sequence', legacy_fields), ('tokenizer', tokenizer_fields)):
+        start = time.perf_counter()
+        for _ in range(50):
+            for text in texts[:samples]:
+                fn(text)
+        print(f'{label:16s} {(time.perf_counter() - start) / (50 * samples) * 1e6:6.1f} µs/report')
+    sys.exit(1 if differences else 0)
+
+if __name__ == '__main__':
+    main()
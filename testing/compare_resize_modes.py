@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Compare resolution normalization modes on datasets/ground_truth.csv.
+
+Each mode runs in its own process because OCR_RESIZE_MODE is read at import time.
+
+Usage:
+    python testing/compare_resize_modes.py                    # fixed vs adaptive
+    python testing/compare_resize_modes.py fixed adaptive none
+"""
+import csv
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+def load_cases():
+    cases = []
+    with open(ROOT / 'datasets/ground_truth.csv', 'r', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) >= 3 and row[0] and row[1] and row[2]:
+                try:
+                    cases.append((row[0], row[1], int(row[2])))
+                except ValueError:
+                    continue
+    return cases
+
+def run_mode():
+    """Child process: OCR every case with the mode from the environment, print one JSON line"""
+    sys.path.insert(0, str(ROOT))
+    from app.core.ocr_processor import process_ocr, get_reader
+    get_reader()
+
+    cases = load_cases()
+    correct = 0
+    times = []
+    for category, fname, expected in cases:
+        try:
+            result = process_ocr(f'file://datasets/{category}/{fname}')
+            times.append(result['processing_time_ms'])
+            correct += result['extracted_data'].get('steps') == expected
+        except Exception:
+            pass
+    times.sort()
+    print(json.dumps({
+        'total': len(cases),
+        'correct': correct,
+        'avg_ms': sum(times) / len(times) if times else 0,
+        'p95_ms': times[int(len(times) * 0.95) - 1] if times else 0
+    }))
+
+def main(modes):
+    print(f'Comparing resize modes on {len(load_cases())} images: {", ".join(modes)}\n')
+    print(f'{"Mode":10s} {"Accuracy":>16s} {"Avg":>9s} {"P95":>9s}')
+    print('-' * 48)
+    for mode in modes:
+        # Color stage only: the gray stage ignores OCR_RESIZE_MODE and would answer most images first
+        env = dict(os.environ, OCR_RESIZE_MODE=mode, OCR_STAGES='color', RESULT_CACHE_ENABLED='False')
+        proc = subprocess.run(
+            [sys.executable, __file__, '--child'],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        lines = [l for l in proc.stdout.splitlines() if l.startswith('{')]
+        if not lines:
+            print(f'{mode:10s} FAILED: {proc.stderr.strip().splitlines()[-1:]}')
+            continue
+        stats = json.loads(lines[-1])
+        accuracy = f"{stats['correct']}/{stats['total']} ({stats['correct'] / stats['total'] * 100:.1f}%)"
+        print(f"{mode:10s} {accuracy:>16s} {stats['avg_ms']:7.0f}ms {stats['p95_ms']:7.0f}ms")
+
+if __name__ == '__main__':
+    if '--child' in sys.argv:
+        run_mode()
+    else:
+        main(sys.argv[1:] or ['fixed', 'adaptive'])
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Webhook outbox check against a local flaky stand-in for the Laravel API.
+
+Scenarios:
+  flaky     -- 40% of POSTs answer 500; every result must still arrive
+  outage    -- API answers 503 for a while; the circuit opens and caps the attempts
+  rejected  -- API answers 422; results go to the dead-letter store, replay delivers them
+  restart   -- results queued while the API is down survive a dispatcher restart (file outbox)
+
+Backoff and breaker timings are shortened through the environment so it runs in seconds.
+
+Usage:
+    python testing/test_webhook_outbox.py
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PORT = 8765
+os.environ.update({
+    "LARAVEL_API_URL_STAGING": f"http://127.0.0.1:{PORT}",
+    "LARAVEL_API_URL_PRODUCTION": f"http://127.0.0.1:{PORT}",
+    "WEBHOOK_BACKOFF_BASE": "0.05",
+    "WEBHOOK_BACKOFF_MAX": "0.4",
+    "WEBHOOK_MAX_ATTEMPTS": "30",
+    "WEBHOOK_BREAKER_THRESHOLD": "3",
+    "WEBHOOK_BREAKER_COOLDOWN": "0.5",
+    "WEBHOOK_TIMEOUT": "2",
+})
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.outbox import OutboxStore
+from app.core.webhooks import WebhookDispatcher
+from app.models.requests import OCRRequest
+
+class StandIn:
+    """Records delivered report_ids; `mode` decides the answer to each POST"""
+    mode = "ok"
+    fail_rate = 0.0
+    delivered = set()
+    posts = 0
+    lock = threading.Lock()
+
+def start_server() -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with StandIn.lock:
+                StandIn.posts += 1
+                if StandIn.mode == "down":
+                    status = 503
+                elif StandIn.mode == "reject":
+                    status = 422
+                else:
+                    status = 500 if random.random() < StandIn.fail_rate else 200
+                if status == 200:
+                    for result in body.get("results", [body]):
+                        StandIn.delivered.add(result["report_id"])
+            self.send_response(status)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', PORT), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def result_for(i: int) -> tuple:
+    data = OCRRequest(report_id=i, user_id=1, s3_url=f'https://example.com/{i}.jpg', environment='staging')
+    return data, {"raw_ocr": "", "extracted_data": {"steps": 1000 + i}, "app_class": "Google Fit", "processing_time_ms": 1}
+
+async def wait_until(predicate, timeout: float) -> bool:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.05)
+    return predicate()
+
+def reset(mode: str, fail_rate: float = 0.0):
+    with StandIn.lock:
+        StandIn.mode, StandIn.fail_rate, StandIn.posts = mode, fail_rate, 0
+        StandIn.delivered = set()
+
+async def flaky() -> bool:
+    reset("ok", fail_rate=0.4)
+    dispatcher = WebhookDispatcher(OutboxStore(""))
+    dispatcher.start()
+    for i in range(40):
+        await dispatcher.submit(*result_for(i))
+    ok = await wait_until(lambda: len(StandIn.delivered) == 40, 20)
+    await dispatcher.stop()
+    print(f'{"✓" if ok else "❌"} flaky: {len(StandIn.delivered)}/40 delivered in {StandIn.posts} POSTs')
+    return ok
+
+async def outage() -> bool:
+    reset("down")
+    dispatcher = WebhookDispatcher(OutboxStore(""))
+    dispatcher.start()
+    for i in range(20):
+        await dispatcher.submit(*result_for(i))
+    await asyncio.sleep(2.0)
+    posts_while_down = StandIn.posts
+    opened = dispatcher.breakers["staging"].opens > 0
+    StandIn.mode = "ok"
+    ok = await wait_until(lambda: len(StandIn.delivered) == 20, 10)
+    await dispatcher.stop()
+    # 4 senders; without the breaker they would retry every ~0.4s each for 2s
+    passed = ok and opened and posts_while_down < 20
+    print(f'{"✓" if passed else "❌"} outage: circuit opened={opened}, {posts_while_down} POSTs in 2s down, '
+          f'{len(StandIn.delivered)}/20 delivered after recovery')
+    return passed
+
+async def rejected() -> bool:
+    reset("reject")
+    dispatcher = WebhookDispatcher(OutboxStore(""))
+    dispatcher.start()
+    for i in range(5):
+        await dispatcher.submit(*result_for(i))
+    dead = await wait_until(lambda: len(dispatcher.dead_letters()) == 5, 5)
+    StandIn.mode = "ok"
+    replayed = dispatcher.replay(env="staging")
+    ok = await wait_until(lambda: len(StandIn.delivered) == 5, 5)
+    await dispatcher.stop()
+    passed = dead and replayed == 5 and ok
+    print(f'{"✓" if passed else "❌"} rejected: dead-lettered={dead}, replayed {replayed}, {len(StandIn.delivered)}/5 delivered')
+    return passed
+
+async def restart() -> bool:
+    reset("down")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'outbox.db')
+        dispatcher = WebhookDispatcher(OutboxStore(path))
+        dispatcher.start()
+        for i in range(10):
+            await dispatcher.submit(*result_for(i))
+        await asyncio.sleep(0.3)
+        await dispatcher.stop(drain_timeout=0.5)
+        StandIn.mode = "ok"
+        dispatcher = WebhookDispatcher(OutboxStore(path))
+        dispatcher.start()
+        ok = await wait_until(lambda: len(StandIn.delivered) == 10, 10)
+        await dispatcher.stop()
+    print(f'{"✓" if ok else "❌"} restart: {len(StandIn.delivered)}/10 delivered by the next process')
+    return ok
+
+async def main() -> bool:
+    results = [await scenario() for scenario in (flaky, outage, rejected, restart)]
+    return all(results)
+
+if __name__ == '__main__':
+    random.seed(0)
+    server = start_server()
+    passed = asyncio.run(main())
+    server.shutdown()
+    sys.exit(0 if passed else 1)